@@ -1,6 +1,6 @@
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from app.core.llm import client as llm_client
 from app.core.logger import get_logger
 
@@ -20,3 +20,7 @@ class BaseAgent(ABC):
         
     async def generate(self, prompt: str) -> str:
         return await self.llm.generate(prompt)
+
+    async def generate_with_finish(self, prompt: str) -> Tuple[str, bool]:
+        """generate() plus whether the model finished normally (see LLMClient.generate_with_finish)."""
+        return await self.llm.generate_with_finish(prompt)
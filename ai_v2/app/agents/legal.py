@@ -1,19 +1,32 @@
 import json
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from app.agents.base import BaseAgent
 from app.core.utils import extract_json_object
 from app.core.prompts import LEGAL_CONSULTANT_RAG_PROMPT
 from app.mcps.legal import (
-    consult_legal_documents_impl as consult_legal_documents, 
+    retrieve_answerable_chunks,
+    build_legal_context,
     calculate_pit_impl as calculate_pit,
     calculate_corporate_tax_impl as calculate_corporate_tax,
     calculate_vat_impl as calculate_vat
 )
+from app.core.config import settings
 from app.core.logger import get_logger
+from app.services.legal_citation_index import get_legal_citation_index, format_citation_context
+from app.services.legal_answer_cache import answer_with_cache, prompt_version
 
 logger = get_logger(__name__)
 
+NO_LEGAL_MATCH_RESPONSE = (
+    "Chào bạn, hiện tại hệ thống chưa tìm thấy văn bản luật cụ thể nào phù hợp trong cơ sở dữ liệu hiện có "
+    "(ví dụ: Luật Bảo vệ quyền lợi người tiêu dùng, Luật Thương mại...).\n\n"
+    "Để mình hỗ trợ chính xác hơn, bạn có thể cung cấp thêm:\n"
+    "- Bạn cần tư vấn cho trường hợp B2C (khách lẻ) hay B2B (doanh nghiệp)?\n"
+    "- Sản phẩm là hàng nhập khẩu hay sản xuất trong nước?\n\n"
+    "Hoặc nếu bạn có tên văn bản cụ thể, hãy cho mình biết nhé!"
+)
+
 class LegalAgent(BaseAgent):
     """Agent specialized in Legal Consultation & Tax with Deterministic Tool Use."""
     
@@ -106,25 +119,31 @@ class LegalAgent(BaseAgent):
         result_text = ""
         
         try:
+            citation_hits = None
             if tool_name == "consult_legal_documents":
-                # Check for "Not Found" condition BEFORE LLM
-                context_docs = await consult_legal_documents(query=params.get("query"))
-                
-                # OPTIMIZATION: Aggressive check for "No Hit" to skip LLM
-                # If length is small (< 500 chars), it likely contains no real content or just a "not found" message
-                if not context_docs or len(context_docs.strip()) < 500 or "không tìm thấy" in context_docs.lower():
-                    result_text = (
-                        "Chào bạn, hiện tại hệ thống chưa tìm thấy văn bản luật cụ thể nào phù hợp trong cơ sở dữ liệu hiện có "
-                        "(ví dụ: Luật Bảo vệ quyền lợi người tiêu dùng, Luật Thương mại...).\n\n"
-                        "Để mình hỗ trợ chính xác hơn, bạn có thể cung cấp thêm:\n"
-                        "- Bạn cần tư vấn cho trường hợp B2C (khách lẻ) hay B2B (doanh nghiệp)?\n"
-                        "- Sản phẩm là hàng nhập khẩu hay sản xuất trong nước?\n\n"
-                        "Hoặc nếu bạn có tên văn bản cụ thể, hãy cho mình biết nhé!"
-                    )
+                # Citation fast path ("Điều 3 Bộ luật Lao động"): exact provisions, no vector search
+                citation_hits = get_legal_citation_index().lookup(input_message)
+            
+            if citation_hits:
+                logger.info(f"[LegalAgent] Citation lookup hit: {[c['id'] for c in citation_hits[:5]]}")
+                context = format_citation_context(citation_hits)[:settings.LEGAL_CITATION_CONTEXT_CHARS]
+                result_text = await self._answer(
+                    input_message, [c["id"] for c in citation_hits], context, settings.LEGAL_CITATION_CONTEXT_CHARS
+                )
+            
+            elif tool_name == "consult_legal_documents":
+                # Retrieval only; the single LLM call is the synthesis below
+                # Weak retrieval (calibrated distance gate, or known from before): fallback without any LLM call
+                chunks, abstain = await retrieve_answerable_chunks(query=params.get("query"))
+                if abstain:
+                    logger.info(f"[LegalAgent] Abstaining: {abstain}")
+                    result_text = NO_LEGAL_MATCH_RESPONSE
                 else:
-                    # Truncate Context to reduce Latency 
-                    params["context"] = context_docs[:2000] 
-                    result_text = await self._synthesize_rag(input_message, params["context"])
+                    # Whole chunks within the budget to bound prompt size and latency
+                    params["context"] = build_legal_context(chunks, settings.LEGAL_RAG_CONTEXT_CHARS)
+                    result_text = await self._answer(
+                        input_message, [c["id"] for c in chunks], params["context"], settings.LEGAL_RAG_CONTEXT_CHARS
+                    )
             
             elif tool_name == "calculate_pit":
                 result_text = await calculate_pit(gross_salary=params.get("gross_salary",0), dependents=params.get("dependents",0))
@@ -145,9 +164,16 @@ class LegalAgent(BaseAgent):
             "data": {}
         }
 
-    async def _synthesize_rag(self, query: str, context: str) -> str:
+    async def _answer(self, query: str, chunk_ids: List[str], context: str, context_chars: int) -> str:
+        """One RAG synthesis, served from the persistent answer cache when this question met these chunks before."""
+        return await answer_with_cache(
+            query, chunk_ids, prompt_version(LEGAL_CONSULTANT_RAG_PROMPT, context_chars),
+            lambda: self._synthesize_rag(query, context)
+        )
+
+    async def _synthesize_rag(self, query: str, context: str) -> Tuple[str, bool]:
         prompt = LEGAL_CONSULTANT_RAG_PROMPT.format(
             context=context,
             user_query=query
         )
-        return await self.generate(prompt)
+        return await self.generate_with_finish(prompt)
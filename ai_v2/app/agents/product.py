@@ -1,14 +1,19 @@
 import json
 import re
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from app.agents.base import BaseAgent
 from app.core.utils import extract_json_object
 from app.mcps.product import (
     search_semantic_impl, 
+    semantic_search_key,
+    search_cache_version,
+    mark_search_empty,
     get_products_db_impl, 
     get_best_sellers_impl,
     analyze_image_impl
 )
+from app.services.product_indexing import MM_DIMENSION_THRESHOLD
+from app.services.product_name_index import get_product_name_index
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -19,7 +24,7 @@ class ProductAgent(BaseAgent):
     def __init__(self):
         super().__init__("ProductAgent")
     
-    def _extract_price_filters(self, text: str) -> (Optional[float], Optional[float]):
+    def _extract_price_filters(self, text: str) -> Tuple[Optional[float], Optional[float]]:
         text = text.lower().replace(".", "").replace(",", "")
         min_p = None
         max_p = None
@@ -34,6 +39,75 @@ class ProductAgent(BaseAgent):
             
         return min_p, max_p
     
+    def _extract_variant_filters(self, msg_lower: str) -> Tuple[Optional[str], Optional[str]]:
+        """Detect requested color / material keywords."""
+        color_keywords = {
+            r"\bđen\b": "đen",
+            r"\btrắng\b": "trắng", 
+            r"\bxám\b": "xám",
+            r"\bnâu\b": "nâu",
+            r"\bxanh\b": "xanh",
+            r"\bđỏ\b": "đỏ",
+            r"\bvàng\b": "vàng",
+            r"\bhồng\b": "hồng"
+        }
+        
+        requested_color = None
+        for pattern, color_name in color_keywords.items():
+            if re.search(pattern, msg_lower):
+                requested_color = color_name
+                break
+        
+        # Material detection
+        material_keywords = {
+            r"\bgỗ\b": "gỗ",
+            r"\bda\b": "da",
+            r"\blưới\b": "lưới",
+            r"\bvải\b": "vải",
+            r"\bkim loại\b": "kim loại",
+            r"\bnhựa\b": "nhựa"
+        }
+        
+        requested_material = None
+        for pattern, mat_name in material_keywords.items():
+            if re.search(pattern, msg_lower):
+                requested_material = mat_name
+                break
+        
+        return requested_color, requested_material
+    
+    def _extract_dimension_filters(self, msg_lower: str) -> Dict[str, List[Optional[float]]]:
+        """
+        Detect size / load constraints: "rộng dưới 120cm", "cao 75cm", "tải trọng trên 100kg".
+        Sizes are returned in cm (the facet index's unit), load in kg. A bare
+        value means ±10%.
+        """
+        facets = {
+            "rộng": "width", "ngang": "width", "dài": "width",
+            "sâu": "depth", "cao": "height",
+            "tải trọng": "weight_capacity", "chịu lực": "weight_capacity", "chịu tải": "weight_capacity"
+        }
+        pattern = (
+            r"(rộng|ngang|dài|sâu|cao|tải trọng|chịu lực|chịu tải)\s*(?:khoảng\s*)?"
+            r"(dưới|tối đa|nhỏ hơn|không quá|trên|tối thiểu|lớn hơn|từ)?\s*"
+            r"(\d+(?:[.,]\d+)?)\s*(cm|mm|m|kg)?\b"
+        )
+        ranges = {}
+        for word, qualifier, number, unit in re.findall(pattern, msg_lower):
+            value = float(number.replace(",", "."))
+            if unit == "m": value *= 100
+            elif unit == "mm": value /= 10
+            elif not unit and facets[word] != "weight_capacity" and value >= MM_DIMENSION_THRESHOLD:
+                value /= 10  # "rộng dưới 1200": a bare size this large is mm
+            
+            if qualifier in ("dưới", "tối đa", "nhỏ hơn", "không quá"):
+                ranges[facets[word]] = [None, value]
+            elif qualifier:
+                ranges[facets[word]] = [value, None]
+            else:
+                ranges[facets[word]] = [value * 0.9, value * 1.1]
+        return ranges
+    
     def _extract_colors_from_product(self, product: Dict) -> List[str]:
         """Extract colors from product variants."""
         colors = []
@@ -45,6 +119,8 @@ class ProductAgent(BaseAgent):
         return colors
     
     def extract_last_product_id(self, history: str, context: Dict = None, query: str = ""):
+        name_index = get_product_name_index()
+        
         # Try Cache with ENHANCED MATCHING
         if context and "last_products_data" in context:
             all_prods = context["last_products_data"].get("all_products", [])
@@ -69,7 +145,13 @@ class ProductAgent(BaseAgent):
                             logger.info(f"  Position match: #{idx+1} -> '{all_prods[idx].get('name')}'")
                             return all_prods[idx].get('id')
                 
-                # 2. NAME-BASED MATCHING: "Thông tin Eos EC06"
+                # 2. MODEL-CODE MATCHING against the whole catalog: "EC06", "FM-812"
+                code_ids = name_index.lookup_codes(query)
+                if code_ids:
+                    logger.info(f"  Model code match: {code_ids[0]}")
+                    return code_ids[0]
+                
+                # 3. NAME-BASED MATCHING: "Thông tin Eos EC06"
                 stop_words = {'thông', 'tin', 'cho', 'tôi', 'xem', 'về', 'của', 'sản', 'phẩm', 'có', 'gì'}
                 query_words = [w for w in query_lower.split() if len(w) >= 3 and w not in stop_words]
                 
@@ -88,12 +170,18 @@ class ProductAgent(BaseAgent):
                     logger.info(f"  Name match: query contains '{best_match.get('name')}' (score={best_score})")
                     return best_match.get('id')
                 
-                # 3. POSITIONAL FALLBACK
+                # 4. POSITIONAL FALLBACK
                 if "đầu" in query_lower or "first" in query_lower:
                     return all_prods[0].get('id')
                 
                 return all_prods[-1].get('id')
         
+        # No session cache: resolve code/name against the catalog index
+        catalog_id = name_index.resolve(query)
+        if catalog_id:
+            logger.info(f"  Catalog index match: {catalog_id}")
+            return catalog_id
+        
         # Fallback: Try History
         if not history: return None
         ids = re.findall(r"/san-pham/(\d+)", history)
@@ -145,7 +233,15 @@ class ProductAgent(BaseAgent):
                     "agent_response": response_text
                 }
         
-        if re.search(r"(bán chạy|top|hot|phổ biến)", msg_lower):
+        # Exact model code ("EC06", "FM-812") → skip embedding + Chroma entirely
+        code_ids = get_product_name_index().lookup_codes(input_message)
+        
+        if code_ids:
+            tool_name = "get_products_db"
+            params = {"product_ids": code_ids[:8]}
+            logger.info(f"[ProductAgent] Model code fast path: IDs {code_ids[:8]}")
+            
+        elif re.search(r"(bán chạy|top|hot|phổ biến)", msg_lower):
              tool_name = "get_best_sellers"
              params = {"limit": 5}
              
@@ -171,6 +267,15 @@ class ProductAgent(BaseAgent):
              min_p, max_p = self._extract_price_filters(input_message)
              if min_p: params["min_price"] = min_p
              if max_p: params["max_price"] = max_p
+             
+             # Variant facets are applied inside vector search (bitmap pre-filter)
+             req_color, req_material = self._extract_variant_filters(msg_lower)
+             if req_color: params["color"] = req_color
+             if req_material: params["material"] = req_material
+             warranty_m = re.search(r"bảo hành\s*(\d+)\s*tháng", msg_lower)
+             if warranty_m: params["warranty"] = f"{warranty_m.group(1)} tháng"
+             dimensions = self._extract_dimension_filters(msg_lower)
+             if dimensions: params["dimensions"] = dimensions
 
         logger.info("-"*80)
         logger.info("[PRODUCT AGENT] Tool selection")
@@ -184,6 +289,7 @@ class ProductAgent(BaseAgent):
             logger.info("[MCP TOOL] Executing...")
             
             if tool_name == "search_product_vectors":
+                version = search_cache_version()
                 result_str = await search_semantic_impl(**params)
                 data = extract_json_object(result_str)
                 ids = data.get("ids", [])
@@ -191,6 +297,9 @@ class ProductAgent(BaseAgent):
                      detail_str = await get_products_db_impl(product_ids=ids[:8])
                      detail_data = extract_json_object(detail_str)
                      collected_products = detail_data.get("products", [])
+                     if "products" in detail_data and not collected_products:
+                         # Index hits that are no longer active: known-empty until reindex / TTL
+                         mark_search_empty(semantic_search_key(**params), version)
                 
             elif tool_name == "get_best_sellers":
                 result_str = await get_best_sellers_impl(**params)
@@ -241,41 +350,11 @@ class ProductAgent(BaseAgent):
         logger.info("="*80)
 
         # 2.5 VARIANT FILTERING (color/material)
+        # Already applied by the facet index before ranking; this pass only
+        # matters when the facet index is unavailable.
         variant_filtered = False
         if collected_products and tool_name == "search_product_vectors":
-            # Detect color keywords
-            color_keywords = {
-                r"\bđen\b": "đen",
-                r"\btrắng\b": "trắng", 
-                r"\bxám\b": "xám",
-                r"\bnâu\b": "nâu",
-                r"\bxanh\b": "xanh",
-                r"\bđỏ\b": "đỏ",
-                r"\bvàng\b": "vàng",
-                r"\bhồng\b": "hồng"
-            }
-            
-            requested_color = None
-            for pattern, color_name in color_keywords.items():
-                if re.search(pattern, msg_lower):
-                    requested_color = color_name
-                    break
-            
-            # Material detection
-            material_keywords = {
-                r"\bgỗ\b": "gỗ",
-                r"\bda\b": "da",
-                r"\blưới\b": "lưới",
-                r"\bvải\b": "vải",
-                r"\bkim loại\b": "kim loại",
-                r"\bnhựa\b": "nhựa"
-            }
-            
-            requested_material = None
-            for pattern, mat_name in material_keywords.items():
-                if re.search(pattern, msg_lower):
-                    requested_material = mat_name
-                    break
+            requested_color, requested_material = self._extract_variant_filters(msg_lower)
             
             # Filter by variant if color/material specified
             if requested_color or requested_material:
@@ -0,0 +1,11 @@
+import secrets
+from typing import Optional
+from fastapi import Header, HTTPException
+from app.core.config import settings
+
+async def require_admin_key(x_api_key: Optional[str] = Header(None)):
+    """Guard for internal admin endpoints (called by the Node backend)."""
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=503, detail="ADMIN_API_KEY is not configured")
+    if not x_api_key or not secrets.compare_digest(x_api_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid API key")
@@ -0,0 +1,85 @@
+"""
+Bounded in-process LRU cache with TTL for search results.
+
+Entries are tagged with the cache's index version. `bump_version()` is
+called whenever the underlying index changes (reindex, metadata refresh,
+snapshot reload): everything cached so far becomes unreachable at once,
+including results computed concurrently against the old index.
+"""
+import copy
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def normalize_query(text: str) -> str:
+    """Case/whitespace/Unicode-form insensitive cache key for a query."""
+    text = unicodedata.normalize("NFC", text or "").lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_cache_key(**parts: Any) -> str:
+    return json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class SearchCache:
+    def __init__(self, name: str, max_size: int, ttl_seconds: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value (a copy, so callers may mutate it) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, version, value = entry
+            if expires_at < time.time() or version != self.version:
+                del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, version: Optional[int] = None):
+        """Store `value`; pass the version read before computing it to avoid caching stale results."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            version = self.version if version is None else version
+            if version != self.version:
+                return
+            self._entries[key] = (time.time() + self.ttl_seconds, version, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def bump_version(self):
+        """Invalidate everything cached so far (index changed)."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "cache": self.name,
+                "version": self.version,
+                "size": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else 0.0,
+            }
@@ -12,6 +12,7 @@ class Settings(BaseSettings):
     # App
     APP_ENV: str = "local"
     APP_BASE_URL: str = "http://localhost:8000"
+    ADMIN_API_KEY: Optional[str] = None
     
     # Database
     DB_MYSQL_HOST: str = "localhost"
@@ -33,6 +34,91 @@ class Settings(BaseSettings):
     CHROMA_PRODUCT_DIR: str = str(Path(__file__).parent.parent.parent / "chroma_db_product")
     CHROMA_LEGAL_DIR: str = str(Path(__file__).parent.parent.parent / "chroma_db_legal")
     EMBEDDING_MODEL: str = "intfloat/multilingual-e5-small"
+    # Ingestion-time vectors keyed by (model, sha256(text)); empty string disables
+    EMBEDDING_CACHE_PATH: str = str(Path(__file__).parent.parent.parent / "embedding_cache.sqlite3")
+    # Bulk ingestion: encoder processes (1 = in-process) and padded tokens per batch
+    EMBEDDING_WORKERS: int = 1
+    EMBEDDING_BATCH_TOKENS: int = 8192
+    # "chroma" or "mmap" (serve searches from scripts/export_mmap_store.py output). With mmap every
+    # product write (webhook reindex, metadata refresh) re-exports the whole collection; legal
+    # snapshots are served as exported until re-exported and reloaded
+    VECTOR_BACKEND: str = "chroma"
+    # Quantized mmap exports: exact rescoring of n_results * factor candidates
+    VECTOR_RESCORE_FACTOR: int = 4
+    # Chunk corpus (citation lookups: "Điều 3 Bộ luật Lao động")
+    LEGAL_DOCUMENTS_JSON: str = str(Path(__file__).parent.parent.parent / "scripts" / "legal_documents.json")
+    # Streaming corpus (NDJSON + offset index) written by parse_to_json; preferred over the JSON once present
+    LEGAL_CORPUS_DIR: str = str(Path(__file__).parent.parent.parent / "scripts" / "legal_corpus")
+    # Chunks embedded and upserted per window (and per checkpoint) when ingesting a streamed corpus
+    LEGAL_INGEST_WINDOW: int = 2000
+    LEGAL_CITATION_CONTEXT_CHARS: int = 6000
+    # Retrieved-chunk context packed into the LegalAgent synthesis prompt (whole chunks only)
+    LEGAL_RAG_CONTEXT_CHARS: int = 2000
+    # Abstain (fallback answer, no LLM call) on weak retrieval. Thresholds come from the artifact of
+    # scripts/calibrate_legal_abstention.py; the values below apply without one (None = check off)
+    LEGAL_ABSTAIN_ENABLED: bool = True
+    RETRIEVAL_CALIBRATION_PATH: str = str(Path(__file__).parent.parent.parent / "retrieval_calibration.json")
+    LEGAL_ABSTAIN_MAX_DISTANCE: Optional[float] = None
+    LEGAL_ABSTAIN_MIN_MARGIN: Optional[float] = None
+    LEGAL_ABSTAIN_MIN_RERANK: Optional[float] = None
+    # Query term coverage (BM25 index) is only judged on a weak vector match: abstain when the top
+    # distance exceeds WEAK_DISTANCE and coverage is below MIN_COVERAGE (needs both)
+    LEGAL_ABSTAIN_WEAK_DISTANCE: Optional[float] = None
+    LEGAL_ABSTAIN_MIN_COVERAGE: Optional[float] = None
+    # Persistent legal answers keyed by question + retrieved chunk ids + prompt + model, dropped when the
+    # corpus version changes; LRU-capped. Empty path disables
+    LEGAL_ANSWER_CACHE_PATH: str = str(Path(__file__).parent.parent.parent / "legal_answer_cache.sqlite3")
+    LEGAL_ANSWER_CACHE_MAX_ENTRIES: int = 5000
+    # scripts/parse_to_json.py: page-parallel PDF workers, per-file text/chunk cache (content hash)
+    LEGAL_PARSE_WORKERS: int = 4
+    LEGAL_PARSE_CACHE_DIR: str = str(Path(__file__).parent.parent.parent / "legal_parse_cache")
+    # Threads for parallel fan-out over per-law legal shards
+    LEGAL_SHARD_WORKERS: int = 8
+    # Two-stage legal retrieval: candidate articles, then clauses inside them
+    LEGAL_HIERARCHICAL_SEARCH: bool = True
+    LEGAL_ARTICLE_CANDIDATES: int = 8
+    LEGAL_ARTICLE_SUMMARY_CHARS: int = 800
+    # Hybrid legal retrieval: BM25 (scripts/build_legal_bm25.py) + vectors, merged by RRF
+    LEGAL_HYBRID_SEARCH: bool = True
+    LEGAL_HYBRID_DEPTH: int = 20
+    LEGAL_RRF_K: int = 60
+    # Optional cross-encoder rerank of LEGAL_RERANK_CANDIDATES retrieved chunks (CPU)
+    LEGAL_RERANK_ENABLED: bool = False
+    LEGAL_RERANK_MODEL: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    LEGAL_RERANK_CANDIDATES: int = 20
+    # Skip reranking when retrieval + expected scoring time would exceed this
+    LEGAL_RERANK_BUDGET_MS: float = 800
+    LEGAL_RERANK_CACHE_SIZE: int = 20000
+    # Near-duplicate chunk merging at ingestion (MinHash/LSH over syllable shingles)
+    LEGAL_DEDUP_ENABLED: bool = True
+    LEGAL_DEDUP_THRESHOLD: float = 0.9
+    LEGAL_DEDUP_NUM_PERM: int = 128
+    LEGAL_DEDUP_BANDS: int = 32
+    LEGAL_DEDUP_MIN_CHARS: int = 80
+    # Search result cache (per process), invalidated on reindex / reload
+    SEARCH_CACHE_SIZE: int = 1024
+    SEARCH_CACHE_TTL_SECONDS: int = 600
+    # Known-empty lookups (no product match, legal abstention) per query + filters; short TTL, bumped with the above
+    NEGATIVE_CACHE_SIZE: int = 2048
+    NEGATIVE_CACHE_TTL_SECONDS: int = 120
+    
+    # Payroll PIT batch endpoint (POST /api/v2/tax/pit/batch)
+    TAX_BATCH_MAX_ROWS: int = 50000
+    
+    # Catalog indexes (model code / name lookup)
+    PRODUCT_INDEX_REFRESH_SECONDS: int = 600
+    # Weight of price rank vs vector rank for budget/premium queries
+    PRODUCT_PRICE_RANK_WEIGHT: float = 0.5
+    
+    # Near-real-time reindex (POST /api/v2/index/products)
+    PRODUCT_REINDEX_DEBOUNCE_SECONDS: float = 2.0
+    PRODUCT_REINDEX_MAX_BATCH: int = 64
+    # Retry delay after a failed batch, doubled per consecutive failure up to the max
+    PRODUCT_REINDEX_RETRY_SECONDS: float = 5.0
+    PRODUCT_REINDEX_RETRY_MAX_SECONDS: float = 300.0
+    # Streaming ingestion (embed_products_to_vectordb.py --from-db): products per batch, batches queued per stage
+    PRODUCT_PIPELINE_BATCH_SIZE: int = 64
+    PRODUCT_PIPELINE_QUEUE_SIZE: int = 4
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,145 @@
+"""
+Persistent embedding cache for the ingestion scripts.
+
+Vectors are stored in SQLite keyed by (model name, SHA-256 of the exact text
+that was encoded), so re-running ingestion only encodes new or changed
+texts; everything else is read back as float32 blobs. The cache is shared
+by the legal and product pipelines (same encoder settings).
+
+`changed_rows` diffs a corpus against a collection so only new or changed
+ids are upserted; `changed_positions` does the same for one window of a
+streamed corpus.
+"""
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# SQLite's default host-parameter limit is 999 on older builds
+_LOOKUP_BATCH = 900
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str, model_name: str):
+        self.path = Path(path)
+        self.model_name = model_name
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL, text_hash TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, text_hash)) WITHOUT ROWID"
+            )
+            self._conn.commit()
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, dim, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})",
+                    [self.model_name, *batch],
+                ).fetchall()
+                for h, dim, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    if len(vector) == dim:
+                        found[h] = vector
+        return found
+
+    def put_many(self, items: Sequence[Tuple[str, Sequence[float]]]):
+        rows = []
+        for h, vector in items:
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((self.model_name, h, len(vector), vector.tobytes()))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE model = ?", [self.model_name]
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def encode_with_cache(
+    texts: Sequence[str],
+    encode: Callable[[List[str]], Sequence[Sequence[float]]],
+    cache: Optional["EmbeddingCache"],
+) -> Tuple[List[List[float]], Dict[str, int]]:
+    """
+    Embeddings for `texts` in order, calling `encode` only on texts missing
+    from the cache (each distinct text once). Returns (vectors, {"hits", "encoded"}).
+    """
+    if cache is None:
+        vectors = [list(map(float, v)) for v in encode(list(texts))] if texts else []
+        return vectors, {"hits": 0, "encoded": len(texts)}
+
+    hashes = [text_hash(t) for t in texts]
+    found = cache.get_many(hashes)
+    missing: Dict[str, str] = {}
+    for h, t in zip(hashes, texts):
+        if h not in found and h not in missing:
+            missing[h] = t
+    if missing:
+        encoded = encode(list(missing.values()))
+        fresh = list(zip(missing.keys(), encoded))
+        cache.put_many(fresh)
+        found.update((h, np.asarray(v, dtype=np.float32)) for h, v in fresh)
+
+    hits = sum(1 for h in hashes if h not in missing)
+    return [found[h].tolist() for h in hashes], {"hits": hits, "encoded": len(missing)}
+
+
+def changed_rows(collection, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[dict]):
+    """(positions whose stored document/metadata differ or are missing, stored ids not in `ids`)."""
+    stored = collection.get(include=["documents", "metadatas"])
+    current = {i: (d, m) for i, d, m in zip(stored["ids"], stored["documents"], stored["metadatas"])}
+    changed = [n for n, i in enumerate(ids) if current.get(i) != (documents[n], metadatas[n])]
+    keep = set(ids)
+    return changed, [i for i in current if i not in keep]
+
+
+def changed_positions(collection, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[dict]) -> List[int]:
+    """Positions whose stored document/metadata differ or are missing, looking up only `ids`."""
+    stored = collection.get(ids=list(ids), include=["documents", "metadatas"]) if ids else {"ids": []}
+    current = {i: (d, m) for i, d, m in zip(stored["ids"], stored.get("documents") or [], stored.get("metadatas") or [])}
+    return [n for n, i in enumerate(ids) if current.get(i) != (documents[n], metadatas[n])]
+
+
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Shared cache for the configured model (None when EMBEDDING_CACHE_PATH is empty)."""
+    global _cache
+    if not settings.EMBEDDING_CACHE_PATH:
+        return None
+    if _cache is None:
+        _cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_MODEL)
+        logger.info(f"Embedding cache: {_cache.path} ({_cache.count()} vectors for {settings.EMBEDDING_MODEL})")
+    return _cache
@@ -0,0 +1,37 @@
+from typing import List
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+_encoder = None
+
+def get_encoder():
+    """Shared SentenceTransformer instance (one model load per process)."""
+    global _encoder
+    if _encoder is None:
+        from sentence_transformers import SentenceTransformer
+        logger.info(f"Loading embedding model: {settings.EMBEDDING_MODEL}")
+        _encoder = SentenceTransformer(settings.EMBEDDING_MODEL)
+    return _encoder
+
+def encode_query(text: str, encoder=None) -> List[float]:
+    """E5 query embedding (normalized)."""
+    encoder = encoder or get_encoder()
+    return encoder.encode([f"query: {text}"], normalize_embeddings=True).tolist()[0]
+
+def encode_texts(texts: List[str], batch_size: int = 32, encoder=None) -> List[List[float]]:
+    """Document embeddings, same settings as the ingestion scripts."""
+    if not texts:
+        return []
+    encoder = encoder or get_encoder()
+    return encoder.encode(texts, batch_size=batch_size, show_progress_bar=False).tolist()
+
+def encode_texts_cached(texts: List[str], batch_size: int = 32, encoder=None):
+    """encode_texts through the persistent embedding cache. Returns (vectors, {"hits", "encoded"})."""
+    from app.core.embedding_cache import encode_with_cache, get_embedding_cache
+    return encode_with_cache(
+        texts,
+        lambda missing: encode_texts(missing, batch_size=batch_size, encoder=encoder or get_encoder()),
+        get_embedding_cache(),
+    )
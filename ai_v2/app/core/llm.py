@@ -1,4 +1,5 @@
 
+from typing import Tuple
 import google.generativeai as genai
 from app.core.config import settings
 from app.core.logger import get_logger
@@ -15,7 +16,12 @@ class LLMClient:
             self.model = None
 
     async def generate(self, prompt: str, temperature: float = None) -> str:
-        if not self.model: return "Server config error: No API Key."
+        text, _ = await self.generate_with_finish(prompt, temperature)
+        return text
+
+    async def generate_with_finish(self, prompt: str, temperature: float = None) -> Tuple[str, bool]:
+        """(text, complete): complete only when the model stopped normally (not token limit / safety / error)."""
+        if not self.model: return "Server config error: No API Key.", False
         
         try:
             config = genai.GenerationConfig(
@@ -24,16 +30,17 @@ class LLMClient:
             )
             response = await self.model.generate_content_async(prompt, generation_config=config)
             
-            # Debug logging
+            complete = False
             if hasattr(response, 'candidates') and response.candidates:
                 finish_reason = response.candidates[0].finish_reason
                 logger.info(f"LLM Finish Reason: {finish_reason}")
-                if finish_reason != 1:  # 1 = STOP (normal completion)
+                complete = finish_reason == 1  # 1 = STOP (normal completion)
+                if not complete:
                     logger.warning(f"LLM finished with reason: {finish_reason} (not STOP)")
             
-            return response.text
+            return response.text, complete
         except Exception as e:
             logger.error(f"LLM generate error: {e}")
-            return f"Error: {e}"
+            return f"Error: {e}", False
 
 client = LLMClient()
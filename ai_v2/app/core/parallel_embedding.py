@@ -0,0 +1,189 @@
+"""
+Batched, optionally process-parallel document encoding for bulk ingestion.
+
+`plan_batches` sorts texts by length and packs them so that
+(batch size x longest text) stays under a token budget: short clauses go
+in large batches, long articles in small ones, with little padding.
+
+With workers > 1 the batches go to a spawn-based process pool. Each worker
+is pinned to its own share of the CPUs (sched_setaffinity) and sets torch
+and OpenMP threads to that share, so workers do not oversubscribe cores.
+`iter_encoded` yields results as batches finish, cache hits first. The
+caller stays the single writer to the vector store and to the embedding
+cache.
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.embedding_cache import EmbeddingCache, text_hash
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Rough XLM-R tokens per character for Vietnamese text
+TOKENS_PER_CHAR = 0.3
+MAX_BATCH = 256
+MAX_SEQ_TOKENS = 512
+
+Batch = List[int]
+
+
+def plan_batches(texts: Sequence[str], token_budget: int, fixed_size: Optional[int] = None) -> List[Batch]:
+    """Positions grouped into batches: fixed size, or length-sorted and packed under token_budget."""
+    if fixed_size:
+        return [list(range(i, min(i + fixed_size, len(texts)))) for i in range(0, len(texts), fixed_size)]
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i] or ""))
+    batches, current, longest = [], [], 0
+    for i in order:
+        tokens = min(MAX_SEQ_TOKENS, max(1, int(len(texts[i] or "") * TOKENS_PER_CHAR)))
+        if current and (max(longest, tokens) * (len(current) + 1) > token_budget or len(current) >= MAX_BATCH):
+            batches.append(current)
+            current, longest = [], 0
+        current.append(i)
+        longest = max(longest, tokens)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def core_shares(workers: int) -> List[List[int]]:
+    """Disjoint contiguous CPU sets, one per worker, covering the usable CPUs."""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    workers = max(1, min(workers, len(cpus)))
+    bounds = np.linspace(0, len(cpus), workers + 1).astype(int)
+    return [cpus[bounds[w]:bounds[w + 1]] for w in range(workers)]
+
+
+# --- Worker process ---
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, shares) -> None:
+    global _worker_model
+    cores = shares.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    threads = str(len(cores))
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = threads
+    import torch
+    torch.set_num_threads(len(cores))
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_batch(positions: Batch, texts: List[str]) -> Tuple[Batch, np.ndarray]:
+    vectors = _worker_model.encode(texts, batch_size=len(texts), show_progress_bar=False)
+    return positions, np.asarray(vectors, dtype=np.float32)
+
+
+class EmbeddingPool:
+    """Process pool of pinned encoder workers (use as a context manager)."""
+
+    def __init__(self, workers: int, model_name: Optional[str] = None):
+        self.shares = core_shares(workers)
+        self.workers = len(self.shares)
+        ctx = get_context("spawn")
+        queue = ctx.Queue()
+        for share in self.shares:
+            queue.put(share)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(model_name or settings.EMBEDDING_MODEL, queue),
+        )
+        logger.info(f"Embedding pool: {self.workers} workers x {len(self.shares[0])} cores")
+
+    def map_unordered(self, jobs: Sequence[Tuple[Batch, List[str]]]) -> Iterator[Tuple[Batch, np.ndarray]]:
+        # Bounded in-flight work keeps memory flat on large corpora
+        pending, jobs = set(), list(jobs)
+        window = self.workers * 2
+        while jobs or pending:
+            while jobs and len(pending) < window:
+                pending.add(self._executor.submit(_encode_batch, *jobs.pop(0)))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- Driver ---
+
+def iter_encoded(
+    texts: Sequence[str],
+    encoder=None,
+    cache: Optional[EmbeddingCache] = None,
+    workers: int = 1,
+    batch_size: Optional[int] = None,
+    token_budget: Optional[int] = None,
+) -> Iterator[Tuple[Batch, List[List[float]], int]]:
+    """
+    Yield (positions, vectors, encoded_count) as batches complete: cached
+    texts first in one block, then newly encoded batches, which are added to
+    the cache here (single writer).
+    """
+    positions = list(range(len(texts)))
+    if cache is not None:
+        hashes = [text_hash(t) for t in texts]
+        found = cache.get_many(hashes)
+        hits = [i for i in positions if hashes[i] in found]
+        if hits:
+            yield hits, [found[hashes[i]].tolist() for i in hits], 0
+        positions = [i for i in positions if hashes[i] not in found]
+    if not positions:
+        return
+
+    todo = [texts[i] for i in positions]
+    batches = plan_batches(todo, token_budget or settings.EMBEDDING_BATCH_TOKENS, batch_size)
+    jobs = [([positions[j] for j in batch], [todo[j] for j in batch]) for batch in batches]
+
+    def finished(batch: Batch, vectors: np.ndarray):
+        if cache is not None:
+            cache.put_many([(hashes[i], v) for i, v in zip(batch, vectors)])
+        return batch, vectors.tolist(), len(batch)
+
+    if workers > 1 and len(jobs) > 1:
+        with EmbeddingPool(workers) as pool:
+            for batch, vectors in pool.map_unordered(jobs):
+                yield finished(batch, vectors)
+        return
+
+    if encoder is None:
+        from app.core.embeddings import get_encoder
+        encoder = get_encoder()
+    for batch, batch_texts in jobs:
+        vectors = encoder.encode(batch_texts, batch_size=len(batch_texts), show_progress_bar=False)
+        yield finished(batch, np.asarray(vectors, dtype=np.float32))
+
+
+class Throughput:
+    """Progress line with chunks/sec for the ingestion logs."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.encoded = 0
+        self.started = time.perf_counter()
+
+    def add(self, count: int, encoded: int = 0) -> str:
+        self.done += count
+        self.encoded += encoded
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (f"{self.done}/{self.total} chunks ({self.encoded} encoded), "
+                f"{self.done / elapsed:.1f} chunks/s, {self.encoded / elapsed:.1f} encoded/s")
@@ -1,7 +1,15 @@
 import json
 import re
+import unicodedata
 from typing import Any, Dict
 
+def normalize_text(text: str) -> str:
+    """Lowercase, strip Vietnamese diacritics and collapse punctuation to spaces."""
+    text = (text or "").lower().replace("đ", "d")
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return re.sub(r"[^a-z0-9\-]+", " ", text).strip()
+
 def extract_json_object(text: str) -> Dict[str, Any]:
     """
     Robustly extract the first valid JSON object from a string.
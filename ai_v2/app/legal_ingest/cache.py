@@ -0,0 +1,70 @@
+"""
+Per-file cache for legal document parsing.
+
+Parsed text is keyed by the SHA-256 of the file bytes (and PARSER_VERSION);
+chunks additionally by filename, doc name, length limits and
+CHUNKER_VERSION, since those change ids and boundaries. Entries are small
+JSON files under one directory, so a re-run only parses and chunks files
+that are new or whose bytes changed.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.legal_ingest.chunker import CHUNKER_VERSION
+from app.legal_ingest.parser import PARSER_VERSION
+
+_READ_BLOCK = 1 << 20
+
+
+def file_hash(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunks_key(content_hash: str, filename: str, doc_name: str, max_article_length: int, max_clause_length: int) -> str:
+    params = [content_hash, filename, doc_name, max_article_length, max_clause_length, CHUNKER_VERSION]
+    return hashlib.sha256(json.dumps(params, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    def __init__(self, root):
+        self.root = Path(root)
+        (self.root / "text").mkdir(parents=True, exist_ok=True)
+        (self.root / "chunks").mkdir(parents=True, exist_ok=True)
+
+    def _read(self, path: Path) -> Optional[Any]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path: Path, value: Any):
+        # Write-then-rename so an interrupted run never leaves a truncated entry
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _text_path(self, content_hash: str) -> Path:
+        return self.root / "text" / f"{content_hash}.v{PARSER_VERSION}.json"
+
+    def get_text(self, content_hash: str) -> Optional[str]:
+        entry = self._read(self._text_path(content_hash))
+        return entry.get("text") if isinstance(entry, dict) else None
+
+    def put_text(self, content_hash: str, text: str):
+        self._write(self._text_path(content_hash), {"text": text})
+
+    def get_chunks(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self._read(self.root / "chunks" / f"{key}.json")
+        return entry.get("chunks") if isinstance(entry, dict) else None
+
+    def put_chunks(self, key: str, chunks: List[Dict[str, Any]]):
+        self._write(self.root / "chunks" / f"{key}.json", {"chunks": chunks})
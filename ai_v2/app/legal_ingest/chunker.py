@@ -0,0 +1,212 @@
+"""
+Structure-aware chunking of parsed legal text (Chương / Điều / Khoản / Điểm).
+
+An article that fits max_article_length is one chunk. Longer articles are
+split into clauses ("1.", "2.", ...), and clauses over max_clause_length into
+points ("a)", "b)", ...). A clause without points is split on line
+boundaries into parts. Text before the first article is the "Dẫn nhập" chunk
+of "Phần mở đầu".
+
+Chunk ids are '<file stem>_D<article>_K<n>[_P<point or part>]' with n
+counting chunks within the file, so ids stay stable while the file does.
+"""
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.legal_ingest.parser import extract_doc_name, extract_metadata_from_filename, guess_law_name_from_filename
+
+# Bump when chunk boundaries or chunk fields change (invalidates cached chunks)
+CHUNKER_VERSION = 1
+KEYWORDS_PER_CHUNK = 5
+
+PREAMBLE_CHAPTER = "Phần mở đầu"
+PREAMBLE_ARTICLE = "Dẫn nhập"
+POINT_LETTERS = "abcdđeghiklmnopqrstuvxy"
+# Largest jump between consecutive article numbers (repealed articles leave gaps)
+MAX_ARTICLE_GAP = 5
+
+_CHAPTER_RE = re.compile(r"^Chương\s+([IVXLC]+|\d+)\b\.?\s*(.*)$")
+_ARTICLE_RE = re.compile(r"^Điều\s+(\d+)([a-z]?)\s*\.\s*(.*)$")
+_CLAUSE_RE = re.compile(r"^(\d+)\s*\.\s+\S")
+_POINT_RE = re.compile(r"^([a-zđ])\s*\)\s*")
+_NOTE_MARKER_RE = re.compile(r"(?<=[^\W\d])\d+$|\s*\[\d+\]$")
+_WORD_RE = re.compile(r"\w+")
+_KEYWORD_STOPWORDS = {
+    "điều", "khoản", "điểm", "luật", "được", "những", "trong", "theo", "định", "thực", "hiện",
+    "trường", "hợp", "không", "ngày", "tháng",
+}
+
+
+def _file_stem(filename: str) -> str:
+    return re.sub(r"\W", "_", Path(filename).stem).strip("_")
+
+
+def _strip_note_marker(heading: str) -> str:
+    """'ĐIỀU KHOẢN THI HÀNH3' / '...THI HÀNH[48]' -> 'ĐIỀU KHOẢN THI HÀNH' (VBHN footnote markers)."""
+    return _NOTE_MARKER_RE.sub("", heading).strip()
+
+
+def extract_keywords(text: str, limit: int = KEYWORDS_PER_CHUNK) -> List[str]:
+    words = [w for w in _WORD_RE.findall(text.lower()) if len(w) >= 4 and w not in _KEYWORD_STOPWORDS]
+    return [w for w, _ in Counter(words).most_common(limit)]
+
+
+def _split_numbered(lines: List[str], pattern: re.Pattern, labels) -> Tuple[List[str], List[Tuple[str, List[str]]]]:
+    """(lines before the first item, [(label, item lines)]) for items numbered in sequence."""
+    head: List[str] = []
+    items: List[Tuple[str, List[str]]] = []
+    expected = iter(labels)
+    want = next(expected, None)
+    for line in lines:
+        match = pattern.match(line.strip())
+        if match and want is not None and match.group(1) == want:
+            items.append((want, [line]))
+            want = next(expected, None)
+        elif items:
+            items[-1][1].append(line)
+        else:
+            head.append(line)
+    return head, items
+
+
+def _split_by_length(lines: List[str], max_length: int) -> List[str]:
+    parts, current = [], []
+    for line in lines:
+        if current and sum(len(l) + 1 for l in current) + len(line) > max_length:
+            parts.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    if current:
+        parts.append("\n".join(current).strip())
+    return [p for p in parts if p]
+
+
+class LegalDocumentChunker:
+    def chunk_document(
+        self,
+        text: str,
+        filename: str,
+        max_article_length: int = 2000,
+        max_clause_length: int = 1000,
+        doc_name: Optional[str] = None,
+        source_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        doc_name = doc_name or extract_doc_name(text) or guess_law_name_from_filename(filename)
+        base = {
+            "doc_name": doc_name,
+            "doc_type": "Luật" if doc_name.startswith("Luật") else "Văn bản",
+            "source_id": source_id or extract_metadata_from_filename(filename)["source_id"],
+            "effective_date": None,
+            "status": "active",
+        }
+        stem = _file_stem(filename)
+        chunks: List[Dict[str, Any]] = []
+
+        def emit(article: Dict[str, Any], body: str, clause: str = "", point: str = "", part: str = ""):
+            clause_label = f"Khoản {clause}" if clause else ""
+            heading = f"Luật: {doc_name}. {article['chapter']}. {article['label']}"
+            heading += f": {article['title']}." if article["title"] else "."
+            if clause:
+                heading += f" {clause_label}."
+            if point:
+                heading += f" Điểm {point}."
+            suffix = f"_P{point or part}" if (point or part) else ""
+            chunks.append({
+                "id": f"{stem}_D{article['number']}_K{len(chunks) + 1}{suffix}",
+                "text_for_embedding": f"{heading} {body}",
+                "metadata": {
+                    **base,
+                    "chapter": article["chapter"],
+                    "article": article["label"],
+                    "article_title": article["title"],
+                    "clause": clause_label,
+                    "point": point,
+                    "keywords": extract_keywords(body),
+                    "filename": filename,
+                },
+                "original_text": body,
+            })
+
+        for article in self._articles(text):
+            body = "\n".join(article["lines"]).strip()
+            if not body:
+                continue
+            if len(body) <= max_article_length or article["number"] == "0":
+                emit(article, body)
+                continue
+            head, clauses = _split_numbered(article["lines"][1:], _CLAUSE_RE, (str(n) for n in range(1, 1000)))
+            if not clauses:
+                for n, part in enumerate(_split_by_length(article["lines"], max_article_length)):
+                    emit(article, part, part=str(n))
+                continue
+            # Article heading and intro sentence travel with the first clause
+            clauses[0] = (clauses[0][0], [article["lines"][0], *head, *clauses[0][1]])
+            for clause, lines in clauses:
+                self._emit_clause(emit, article, clause, lines, max_clause_length)
+        return chunks
+
+    @staticmethod
+    def _emit_clause(emit, article, clause: str, lines: List[str], max_clause_length: int):
+        body = "\n".join(lines).strip()
+        if len(body) <= max_clause_length:
+            emit(article, body, clause=clause)
+            return
+        head, points = _split_numbered(lines, _POINT_RE, POINT_LETTERS)
+        if points:
+            points[0] = (points[0][0], [*head, *points[0][1]])
+            for point, point_lines in points:
+                emit(article, "\n".join(point_lines).strip(), clause=clause, point=point)
+            return
+        for n, part in enumerate(_split_by_length(lines, max_clause_length)):
+            emit(article, part, clause=clause, part=str(n))
+
+    @staticmethod
+    def _next_article(match: re.Match, last_number: int) -> bool:
+        # Numbers go up in small steps ("Điều 4a" may follow "Điều 4"); a quoted
+        # "Điều 68." inside an amendment note is body text
+        number = int(match.group(1))
+        if number == last_number:
+            return bool(match.group(2))
+        return last_number < number <= last_number + MAX_ARTICLE_GAP
+
+    @classmethod
+    def _articles(cls, text: str) -> List[Dict[str, Any]]:
+        """Articles in order, each {"number", "label", "title", "chapter", "lines"}; preamble first."""
+        lines = text.split("\n")
+        chapter = PREAMBLE_CHAPTER
+        current = {"number": "0", "label": PREAMBLE_ARTICLE, "title": "", "chapter": chapter, "lines": []}
+        articles = [current]
+        last_number = 0
+        i = 0
+        while i < len(lines):
+            line = lines[i].strip()
+            chapter_match = _CHAPTER_RE.match(line)
+            article_match = _ARTICLE_RE.match(line)
+            if chapter_match:
+                # Title: rest of the line plus following upper-case lines (PDF wraps headings)
+                title = [chapter_match.group(2).strip()]
+                while i + 1 < len(lines):
+                    follower = lines[i + 1].strip()
+                    if follower and (follower != follower.upper() or _ARTICLE_RE.match(follower)):
+                        break
+                    title.append(follower)
+                    i += 1
+                title = _strip_note_marker(" ".join(t for t in title if t))
+                chapter = f"Chương {chapter_match.group(1)}" + (f": {title}" if title else "")
+            elif article_match and cls._next_article(article_match, last_number):
+                last_number = int(article_match.group(1))
+                number = article_match.group(1) + article_match.group(2)
+                current = {
+                    "number": number,
+                    "label": f"Điều {number}",
+                    "title": _strip_note_marker(article_match.group(3).strip().rstrip(".")),
+                    "chapter": chapter,
+                    "lines": [f"Điều {number}."],
+                }
+                articles.append(current)
+            else:
+                current["lines"].append(lines[i])
+            i += 1
+        return articles
@@ -0,0 +1,279 @@
+"""
+Streaming on-disk format for the legal chunk corpus.
+
+A corpus is a directory:
+
+    manifest.json   counts, checksum, parse metadata, documents, skipped files
+    chunks.ndjson   one compact JSON chunk per line, in document order
+    chunks.idx      "<id>\\t<offset>\\t<length>" per line (byte offsets into chunks.ndjson)
+
+CorpusWriter appends chunks as they are produced and publishes the three
+files atomically on close (manifest last), so a crashed parse leaves the
+previous corpus intact. Readers stream chunks with constant memory, start
+at any position, and fetch single chunks by id through the offset index.
+
+The old monolithic legal_documents.json is still readable (JsonCorpus, held
+in memory) so existing deployments keep working until they re-parse.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from app.core.config import settings
+
+CORPUS_FORMAT = "legal-chunks-ndjson"
+CORPUS_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+CHUNKS_FILE = "chunks.ndjson"
+INDEX_FILE = "chunks.idx"
+
+
+class CorpusWriter:
+    """Use as a context manager; chunks land in *.tmp files until close()."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._chunks = open(self.path / f"{CHUNKS_FILE}.tmp", "wb")
+        self._index = open(self.path / f"{INDEX_FILE}.tmp", "w", encoding="utf-8")
+        self._digest = hashlib.sha256()
+        self._offset = 0
+        self._ids = set()
+        self.count = 0
+
+    def _check_id(self, chunk_id: str):
+        if "\t" in chunk_id or "\n" in chunk_id:
+            raise ValueError(f"Chunk id with tab or newline: {chunk_id!r}")
+        if chunk_id in self._ids:
+            raise ValueError(f"Duplicate chunk id: {chunk_id}")
+
+    def write(self, chunk: Dict[str, Any]):
+        chunk_id = chunk["id"]
+        self._check_id(chunk_id)
+        self._ids.add(chunk_id)
+        line = json.dumps(chunk, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        self._chunks.write(line)
+        self._digest.update(line)
+        self._index.write(f"{chunk_id}\t{self._offset}\t{len(line)}\n")
+        self._offset += len(line)
+        self.count += 1
+
+    def write_many(self, chunks: List[Dict[str, Any]]):
+        """All or nothing: ids are checked before any chunk is written."""
+        ids = [c["id"] for c in chunks]
+        for chunk_id in ids:
+            self._check_id(chunk_id)
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate chunk ids within one document")
+        for chunk in chunks:
+            self.write(chunk)
+
+    def close(self, metadata: Optional[Dict[str, Any]] = None, documents: Optional[List] = None,
+              skipped_files: Optional[List] = None) -> Dict[str, Any]:
+        """Publish the corpus; returns the manifest."""
+        self._chunks.close()
+        self._index.close()
+        manifest = {
+            "format": CORPUS_FORMAT,
+            "format_version": CORPUS_FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "chunks": self.count,
+            "bytes": self._offset,
+            "sha256": self._digest.hexdigest(),
+            "metadata": metadata or {},
+            "documents": documents or [],
+            "skipped_files": skipped_files or [],
+        }
+        os.replace(self.path / f"{CHUNKS_FILE}.tmp", self.path / CHUNKS_FILE)
+        os.replace(self.path / f"{INDEX_FILE}.tmp", self.path / INDEX_FILE)
+        tmp = self.path / f"{MANIFEST_FILE}.tmp"
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path / MANIFEST_FILE)
+        return manifest
+
+    def abort(self):
+        self._chunks.close()
+        self._index.close()
+        for name in (CHUNKS_FILE, INDEX_FILE):
+            (self.path / f"{name}.tmp").unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        # A successful `with` block still needs close(metadata=...) from the caller
+        if exc_type is not None:
+            self.abort()
+        elif not self._chunks.closed:
+            self.close()
+
+
+class NdjsonCorpus:
+    def __init__(self, path):
+        self.path = Path(path)
+        if self.path.name == MANIFEST_FILE:
+            self.path = self.path.parent
+        self.manifest = json.loads((self.path / MANIFEST_FILE).read_text(encoding="utf-8"))
+        if self.manifest.get("format") != CORPUS_FORMAT:
+            raise ValueError(f"{self.path} is not a {CORPUS_FORMAT} corpus")
+        self._offsets: Optional[Dict[str, Tuple[int, int]]] = None
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the chunk content changes (checkpoints are tied to it)."""
+        return self.manifest["sha256"]
+
+    def __len__(self) -> int:
+        return self.manifest["chunks"]
+
+    def _index_rows(self) -> Iterator[Tuple[str, int, int]]:
+        with open(self.path / INDEX_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                chunk_id, offset, length = line.rstrip("\n").split("\t")
+                yield chunk_id, int(offset), int(length)
+
+    def ids(self) -> Iterator[str]:
+        """Chunk ids in corpus order, without reading the chunks."""
+        return (chunk_id for chunk_id, _, _ in self._index_rows())
+
+    def iter_chunks(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """Chunks from position `start` on, one line in memory at a time."""
+        offset = 0
+        if start:
+            row = next((r for n, r in enumerate(self._index_rows()) if n == start), None)
+            if row is None:
+                return
+            offset = row[1]
+        with open(self.path / CHUNKS_FILE, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                yield json.loads(line)
+
+    def get(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """One chunk by id (offset index loaded on first use)."""
+        if self._offsets is None:
+            self._offsets = {chunk_id: (offset, length) for chunk_id, offset, length in self._index_rows()}
+        entry = self._offsets.get(chunk_id)
+        if entry is None:
+            return None
+        with open(self.path / CHUNKS_FILE, "rb") as f:
+            f.seek(entry[0])
+            return json.loads(f.read(entry[1]))
+
+
+class JsonCorpus:
+    """Read-only view of a legacy legal_documents.json (loaded whole)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._chunks = data.get("chunks", [])
+        self._by_id = {c["id"]: c for c in self._chunks}
+        self.manifest = {
+            "format": "legal-documents-json",
+            "chunks": len(self._chunks),
+            "metadata": data.get("metadata", {}),
+            "documents": data.get("documents", []),
+            "skipped_files": data.get("skipped_files", []),
+        }
+        self._version = _file_version(self.path)
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def ids(self) -> Iterator[str]:
+        return (c["id"] for c in self._chunks)
+
+    def iter_chunks(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        return iter(self._chunks[start:])
+
+    def get(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(chunk_id)
+
+
+Corpus = Union[NdjsonCorpus, JsonCorpus]
+
+
+def _file_version(path: Path) -> str:
+    stat = path.stat()
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def default_corpus_path() -> Path:
+    """LEGAL_CORPUS_DIR once parse_to_json has written it, else the legacy JSON."""
+    corpus_dir = Path(settings.LEGAL_CORPUS_DIR)
+    if (corpus_dir / MANIFEST_FILE).exists():
+        return corpus_dir
+    return Path(settings.LEGAL_DOCUMENTS_JSON)
+
+
+def open_corpus(path=None) -> Corpus:
+    """A corpus directory (or its manifest.json), or a legacy .json file."""
+    path = Path(path) if path else default_corpus_path()
+    if path.is_dir() or path.name == MANIFEST_FILE:
+        return NdjsonCorpus(path)
+    return JsonCorpus(path)
+
+
+def corpus_version(path=None) -> str:
+    """`version` of the corpus at `path` without loading its chunks; "" when there is none."""
+    path = Path(path) if path else default_corpus_path()
+    try:
+        if path.is_dir() or path.name == MANIFEST_FILE:
+            return NdjsonCorpus(path).version
+        return _file_version(path)
+    except (OSError, ValueError, KeyError):
+        return ""
+
+
+def corpus_stamp(path=None) -> str:
+    """Size + mtime of the corpus manifest (or legacy file): a stat call, changes whenever the corpus is rewritten."""
+    path = Path(path) if path else default_corpus_path()
+    if path.is_dir():
+        path = path / MANIFEST_FILE
+    try:
+        return f"{path}:{_file_version(path)}"
+    except OSError:
+        return ""
+
+
+def load_chunks(path=None) -> List[Dict[str, Any]]:
+    """Every chunk in memory, for corpus-wide indexes (BM25, citations, reports)."""
+    return list(open_corpus(path).iter_chunks())
+
+
+class IngestCheckpoint:
+    """
+    Corpus position up to which ingestion into one target finished, tied to
+    the corpus version and the ingestion parameters: a different corpus or
+    different parameters start from 0.
+    """
+
+    def __init__(self, path, corpus_version: str, params: Optional[Dict[str, Any]] = None):
+        self.path = Path(path)
+        self.key = {"corpus_version": corpus_version, "params": params or {}}
+
+    def load(self) -> int:
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return 0
+        return int(state.get("position", 0)) if state.get("key") == self.key else 0
+
+    def save(self, position: int):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"key": self.key, "position": position, "saved_at": datetime.now().isoformat()}),
+                       encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
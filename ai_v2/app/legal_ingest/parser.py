@@ -0,0 +1,174 @@
+"""
+Text extraction for Vietnamese legal documents: PDF via PyMuPDF, DOCX via
+python-docx.
+
+Large PDFs are extracted page-parallel. Page ranges go to a spawn-based
+process pool that is reused across files; each worker opens the file itself
+(fitz documents cannot be pickled) and returns the text of its pages, which
+is joined back in page order.
+
+parse_file raises ValueError for files that should be skipped (corrupt,
+encrypted, scanned without a text layer, unsupported format).
+"""
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Bump when extraction or cleaning changes (invalidates cached text)
+PARSER_VERSION = 1
+# Below this many pages the pool costs more than it saves
+PARALLEL_MIN_PAGES = 16
+# Page ranges per worker (smaller ranges balance uneven pages better)
+RANGES_PER_WORKER = 2
+
+_DOC_TYPES = ("BỘ LUẬT", "LUẬT", "NGHỊ ĐỊNH", "NGHỊ QUYẾT", "THÔNG TƯ", "QUYẾT ĐỊNH")
+_NUMBERED_TYPES = ("NGHỊ ĐỊNH", "NGHỊ QUYẾT", "THÔNG TƯ", "QUYẾT ĐỊNH")
+_DOC_NUMBER_RE = re.compile(r"Số\s*:\s*([\w/.\-]+)", re.IGNORECASE)
+_PAGE_NUMBER_RE = re.compile(r"^\s*\d{1,4}\s*$")
+_VBHN_RE = re.compile(r"(\d+)-vbhn", re.IGNORECASE)
+_LEADING_NUMBER_RE = re.compile(r"^(\d+)")
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[str]:
+    import fitz
+    with fitz.open(path) as doc:
+        return [doc[i].get_text("text") for i in range(start, stop)]
+
+
+def clean_text(text: str) -> str:
+    """NFC, no page-number lines or trailing spaces, at most one blank line in a row."""
+    text = unicodedata.normalize("NFC", text.replace("\r\n", "\n").replace("\r", "\n"))
+    lines = [line.rstrip() for line in text.split("\n") if not _PAGE_NUMBER_RE.match(line)]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _title_case(text: str) -> str:
+    return " ".join(word.capitalize() for word in text.split())
+
+
+def extract_doc_name(text: str) -> Optional[str]:
+    """'Bộ Luật Lao Động', 'Nghị Định 123/2020/NĐ-CP', ... from the document heading."""
+    lines = [line.strip() for line in text[:5000].split("\n")]
+    for i, line in enumerate(lines):
+        doc_type = next((t for t in _DOC_TYPES if line == t), None)
+        if doc_type is None:
+            continue
+        if doc_type in _NUMBERED_TYPES:
+            number = _DOC_NUMBER_RE.search(text[:5000])
+            return f"{_title_case(doc_type)} {number.group(1).rstrip('.')}" if number else None
+        subject = []
+        for follower in lines[i + 1:i + 4]:
+            if not follower or follower != follower.upper():
+                break
+            subject.append(follower)
+        if subject:
+            return _title_case(f"{doc_type} {' '.join(subject)}")
+    return None
+
+
+def guess_law_name_from_filename(filename: str) -> str:
+    """Fallback doc_name when the heading cannot be read."""
+    match = _VBHN_RE.search(filename)
+    if match:
+        return f"Văn Bản Hợp Nhất {match.group(1)}/VBHN-VPQH"
+    return "Văn Bản Pháp Luật"
+
+
+def extract_metadata_from_filename(path) -> Dict[str, str]:
+    """source_id: the number before '-VBHN' ('..._22-VBHN-VPQH.pdf' -> '22'), else the leading number."""
+    name = Path(path).name
+    match = _VBHN_RE.search(name) or _LEADING_NUMBER_RE.match(name)
+    return {"source_id": match.group(1) if match else Path(path).stem}
+
+
+class LegalDocumentParser:
+    """Use as a context manager (or call close()) when workers > 1."""
+
+    def __init__(self, workers: int = 1):
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    extract_doc_name = staticmethod(extract_doc_name)
+    guess_law_name_from_filename = staticmethod(guess_law_name_from_filename)
+    extract_metadata_from_filename = staticmethod(extract_metadata_from_filename)
+
+    def parse_file(self, path) -> str:
+        path = Path(path)
+        suffix = path.suffix.lower()
+        if suffix == ".pdf":
+            text = self.parse_pdf(path)
+        elif suffix == ".docx":
+            text = self.parse_docx(path)
+        elif suffix == ".doc":
+            raise ValueError("Legacy .doc format is not supported, convert it to .docx")
+        else:
+            raise ValueError(f"Unsupported file type: {suffix}")
+        return clean_text(text)
+
+    def parse_pdf(self, path: Path) -> str:
+        import fitz
+        try:
+            with fitz.open(str(path)) as doc:
+                if doc.needs_pass:
+                    raise ValueError("Encrypted PDF")
+                page_count = doc.page_count
+                if self.workers == 1 or page_count < PARALLEL_MIN_PAGES:
+                    pages = [page.get_text("text") for page in doc]
+                else:
+                    pages = None
+        except RuntimeError as e:  # fitz.FileDataError and older PyMuPDF open errors
+            raise ValueError(f"Corrupted PDF: {e}")
+
+        if pages is None:
+            pages = self._parse_pages_parallel(path, page_count)
+        if not any(page.strip() for page in pages):
+            raise ValueError(f"No text layer in {page_count} pages (scanned PDF?)")
+        return "\n".join(pages)
+
+    def _parse_pages_parallel(self, path: Path, page_count: int) -> List[str]:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+            logger.info(f"PDF parse pool: {self.workers} workers")
+        step = -(-page_count // (self.workers * RANGES_PER_WORKER))
+        futures = [
+            self._executor.submit(_extract_pages, str(path), start, min(start + step, page_count))
+            for start in range(0, page_count, step)
+        ]
+        return [page for future in futures for page in future.result()]
+
+    def parse_docx(self, path: Path) -> str:
+        import docx
+        from docx.table import Table
+        from docx.text.paragraph import Paragraph
+        try:
+            document = docx.Document(str(path))
+        except Exception as e:  # zipfile.BadZipFile, KeyError, lxml errors
+            raise ValueError(f"Corrupted DOCX: {e}")
+        # Body order, so heading tables stay at the top instead of after the last article
+        lines = []
+        for child in document.element.body.iterchildren():
+            tag = child.tag.rsplit("}", 1)[-1]
+            if tag == "p":
+                lines.append(Paragraph(child, document).text)
+            elif tag == "tbl":
+                for row in Table(child, document).rows:
+                    lines.append(" | ".join(cell.text.strip() for cell in row.cells))
+        return "\n".join(lines)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,73 @@
+"""
+Parse + chunk one legal document with the per-file cache, timing each stage.
+"""
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.legal_ingest.cache import ParseCache, chunks_key, file_hash
+from app.legal_ingest.chunker import LegalDocumentChunker
+from app.legal_ingest.parser import LegalDocumentParser
+
+# Shorter text is a scan or a corrupt file
+MIN_TEXT_LENGTH = 100
+
+
+def process_file(
+    path: Path,
+    parser: LegalDocumentParser,
+    chunker: LegalDocumentChunker,
+    cache: Optional[ParseCache],
+    max_article_length: int,
+    max_clause_length: int,
+) -> Dict[str, Any]:
+    """
+    {"doc_name", "source_id", "text_length", "chunks", "cached", "timing"};
+    raises ValueError when the file should be skipped.
+    """
+    started = time.perf_counter()
+    content_hash = file_hash(path)
+    hashed = time.perf_counter()
+
+    text = cache.get_text(content_hash) if cache else None
+    text_cached = text is not None
+    if text is None:
+        text = parser.parse_file(path)
+        if len(text) < MIN_TEXT_LENGTH:
+            raise ValueError(f"Text too short ({len(text)} chars)")
+        if cache:
+            cache.put_text(content_hash, text)
+    parsed = time.perf_counter()
+
+    doc_name = parser.extract_doc_name(text) or parser.guess_law_name_from_filename(path.name)
+    source_id = parser.extract_metadata_from_filename(path).get("source_id", "")
+    key = chunks_key(content_hash, path.name, doc_name, max_article_length, max_clause_length)
+    chunks = cache.get_chunks(key) if cache else None
+    chunks_cached = chunks is not None
+    if chunks is None:
+        chunks = chunker.chunk_document(
+            text,
+            filename=path.name,
+            max_article_length=max_article_length,
+            max_clause_length=max_clause_length,
+            doc_name=doc_name,
+            source_id=source_id,
+        )
+        if cache:
+            cache.put_chunks(key, chunks)
+    done = time.perf_counter()
+
+    return {
+        "doc_name": doc_name,
+        "source_id": source_id,
+        "sha256": content_hash,
+        "text_length": len(text),
+        "chunks": chunks,
+        "cached": text_cached and chunks_cached,
+        "timing": {
+            "hash_seconds": round(hashed - started, 4),
+            "parse_seconds": round(parsed - hashed, 4),
+            "chunk_seconds": round(done - parsed, 4),
+            "total_seconds": round(done - started, 4),
+        },
+    }
@@ -1,71 +1,91 @@
 
 from fastmcp import FastMCP
-from typing import Annotated, Optional, Dict, Any, List
-from app.services.legal_vector_service import get_legal_vector_service
+from typing import Annotated, Optional, Dict, Any, List, Tuple
+from app.core.cache import make_cache_key, normalize_query
+from app.services.legal_vector_service import legal_index, negative_cache
 from app.core.logger import get_logger
 from app.core.llm import client as llm_client
 from app.core.prompts import LEGAL_CONSULTANT_RAG_PROMPT
+from app.services.legal_answer_cache import answer_with_cache, prompt_version
+from app.services.retrieval_gate import LEGAL_COLLECTION, get_retrieval_gate
+from app.services.personal_income_tax import compute_pit, pit_batch
 
 logger = get_logger(__name__)
 
 mcp = FastMCP("legal_domain")
 
 # --- IMPLEMENTATION ---
-async def consult_legal_documents_impl(query: str, doc_type: str = None) -> str:
-    service = get_legal_vector_service()
-    results = service.search(query=query, top_k=5, doc_type=doc_type)
+LEGAL_NOT_FOUND = "Xin lỗi, không tìm thấy văn bản pháp luật liên quan."
+
+async def retrieve_legal_chunks_impl(query: str, doc_type: str = None, top_k: int = 5) -> List[Dict[str, Any]]:
+    """Retrieval only (no LLM): chunks best first as {"id", "text", "metadata", "distance"[, "rrf_score", "rerank_score"]}."""
+    with legal_index.acquire() as service:
+        return service.search(query=query, top_k=top_k, doc_type=doc_type)
+
+async def retrieve_answerable_chunks(
+    query: str, doc_type: str = None, top_k: int = 5
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    (chunks, None) to answer from, or ([], reason) when retrieval is empty or
+    below the abstention gate. Such questions are remembered (negative cache,
+    short TTL, dropped on reindex) and short-circuit before embedding.
+    """
+    key = make_cache_key(q=normalize_query(query), doc_type=doc_type, top_k=top_k)
+    known = negative_cache.get(key)
+    if known is not None:
+        return [], f"known unanswerable ({known})"
+    version = negative_cache.version
     
-    if not results:
-        return "Xin lỗi, không tìm thấy văn bản pháp luật liên quan."
-        
-    # Build Context
+    results = await retrieve_legal_chunks_impl(query, doc_type, top_k)
+    abstain = get_retrieval_gate().check(LEGAL_COLLECTION, results)
+    if abstain:
+        negative_cache.set(key, abstain, version)
+        return [], abstain
+    return results, None
+
+def build_legal_context(chunks: List[Dict[str, Any]], max_chars: Optional[int] = None) -> str:
+    """RAG context block. With max_chars, whole chunks are packed until the next one would not fit."""
     context_text = ""
-    for r in results:
+    for r in chunks:
         meta = r.get("metadata", {})
-        context_text += f"\n---\nNguồn: {meta.get('doc_name')} - {meta.get('article_title')}\nNội dung: {r.get('text')}\n"
+        block = f"\n---\nNguồn: {meta.get('doc_name')} - {meta.get('article_title')}\n"
+        if meta.get("citations"):
+            # Merged near-duplicate: same provision in several documents
+            block += f"Cùng nội dung tại: {meta['citations']}\n"
+        block += f"Nội dung: {r.get('text')}\n"
+        if max_chars is not None and len(context_text) + len(block) > max_chars:
+            if not context_text:
+                # Best chunk alone is over budget: keep its head rather than nothing
+                context_text = block[:max_chars]
+            break
+        context_text += block
+    return context_text
+
+async def consult_legal_documents_impl(query: str, doc_type: str = None) -> str:
+    """Retrieval + one RAG generation (MCP one-shot; LegalAgent synthesizes from retrieve_legal_chunks_impl)."""
+    results, abstain = await retrieve_answerable_chunks(query, doc_type)
+    if abstain:
+        logger.info(f"Legal abstention ({abstain}): {query}")
+        return LEGAL_NOT_FOUND
         
     # Rag Generation
     prompt = LEGAL_CONSULTANT_RAG_PROMPT.format(
-        context=context_text,
+        context=build_legal_context(results),
         user_query=query
     )
     
-    return await llm_client.generate(prompt)
+    return await answer_with_cache(
+        query, [r["id"] for r in results], prompt_version(LEGAL_CONSULTANT_RAG_PROMPT, None),
+        lambda: llm_client.generate_with_finish(prompt)
+    )
 
 async def calculate_pit_impl(gross_salary: float, dependents: int = 0) -> str:
     """Simple PIT Calculator (2025 rule estimate)"""
-    # Constants
-    BASE_SALARY = 1800000 
-    REGION_MIN = 4680000 # Region I
-    SELF_DEDUCTION = 11000000
-    DEPENDENT_DEDUCTION = 4400000
-    
-    # Insurance (10.5% capped)
-    insurance_base = min(gross_salary, 20 * BASE_SALARY)
-    bhxh = insurance_base * 0.08
-    bhyt = insurance_base * 0.015
-    bhtn_base = min(gross_salary, 20 * REGION_MIN)
-    bhtn = bhtn_base * 0.01
-    total_insurance = bhxh + bhyt + bhtn
-    
-    # Taxable
-    total_deduction = SELF_DEDUCTION + (dependents * DEPENDENT_DEDUCTION) + total_insurance
-    taxable_income = max(0, gross_salary - total_deduction)
-    
-    # Progressive Tax
-    tax = 0
-    income = taxable_income / 1000000 
-    
-    if income <= 5: tax = income * 0.05
-    elif income <= 10: tax = income * 0.10 - 0.25
-    elif income <= 18: tax = income * 0.15 - 0.75
-    elif income <= 32: tax = income * 0.20 - 1.65
-    elif income <= 52: tax = income * 0.25 - 3.25
-    elif income <= 80: tax = income * 0.30 - 5.85
-    else: tax = income * 0.35 - 9.85
-    
-    tax_amount = max(0, tax * 1000000)
-    net_salary = gross_salary - total_insurance - tax_amount
+    result = compute_pit([gross_salary], [dependents])
+    total_insurance = float(result["insurance"][0])
+    taxable_income = float(result["taxable_income"][0])
+    tax_amount = float(result["pit"][0])
+    net_salary = float(result["net_salary"][0])
     
     return f"""
     Kết quả tính thuế thu nhập cá nhân (PIT):
@@ -78,6 +98,14 @@ async def calculate_pit_impl(gross_salary: float, dependents: int = 0) -> str:
     => Lương Net thực nhận: {net_salary:,.0f} VND
     """
 
+def calculate_pit_batch_impl(
+    gross_salaries: List[float],
+    dependents: Optional[List[int]] = None,
+    employee_ids: Optional[List[Any]] = None
+) -> Dict[str, Any]:
+    """PIT for a whole payroll (see pit_batch). Raises ValueError on invalid rows."""
+    return pit_batch(gross_salaries, dependents, employee_ids)
+
 async def calculate_corporate_tax_impl(revenue: float, expenses: float) -> str:
     """Simple Corporate Income Tax (CIT) Calculator (Standard 20%)"""
     profit = revenue - expenses
@@ -128,6 +156,14 @@ async def consult_legal_documents(
 ) -> str:
     return await consult_legal_documents_impl(query, doc_type)
 
+@mcp.tool(description="Retrieve Vietnamese legal provisions (chunks with metadata and distances), no generated answer")
+async def retrieve_legal_documents(
+    query: Annotated[str, "Legal question"],
+    doc_type: Annotated[Optional[str], "Filter by doc type"] = None,
+    top_k: Annotated[int, "Number of chunks"] = 5
+) -> List[Dict[str, Any]]:
+    return await retrieve_legal_chunks_impl(query, doc_type, top_k)
+
 @mcp.tool(description="Calculate Personal Income Tax (VN) - Thuế TNCN")
 async def calculate_pit(
     gross_salary: Annotated[float, "Gross salary (VND)"],
@@ -135,6 +171,14 @@ async def calculate_pit(
 ) -> str:
     return await calculate_pit_impl(gross_salary, dependents)
 
+@mcp.tool(description="Calculate Personal Income Tax (VN) for a whole payroll - per employee results and totals")
+async def calculate_pit_batch(
+    gross_salaries: Annotated[List[float], "Gross salary of each employee (VND)"],
+    dependents: Annotated[Optional[List[int]], "Dependents of each employee (default 0)"] = None,
+    employee_ids: Annotated[Optional[List[str]], "Employee ids, same order (default row numbers)"] = None
+) -> Dict[str, Any]:
+    return calculate_pit_batch_impl(gross_salaries, dependents, employee_ids)
+
 @mcp.tool(description="Calculate Corporate Income Tax (VP) - Thuế TNDN")
 async def calculate_corporate_tax(
     revenue: Annotated[float, "Total Revenue"],
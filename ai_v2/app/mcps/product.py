@@ -2,7 +2,9 @@ from fastmcp import FastMCP
 from typing import Annotated, Optional, Dict, Any, List
 import json
 import aiomysql
-from app.services.product_vector_service import get_product_vector_service
+from app.core.cache import make_cache_key, normalize_query
+from app.services.product_vector_service import get_product_vector_service, negative_cache, product_index
+from app.services.product_facet_index import get_product_facet_index
 from app.core.db import get_db_conn
 from app.core.logger import get_logger
 
@@ -13,29 +15,90 @@ mcp = FastMCP("product_domain")
 
 # --- IMPLEMENTATION ---
 
+def semantic_search_key(
+    query: str,
+    limit: int = 15,
+    min_price: float = None,
+    max_price: float = None,
+    color: str = None,
+    material: str = None,
+    warranty: str = None,
+    dimensions: Dict[str, Any] = None
+) -> str:
+    """Negative-cache key of a search_semantic_impl call (same arguments)."""
+    return make_cache_key(
+        q=normalize_query(query), limit=limit, min_price=min_price, max_price=max_price,
+        color=color, material=material, warranty=warranty, dimensions=dimensions
+    )
+
+def search_cache_version() -> int:
+    """Negative cache version to read before a search whose emptiness may be recorded."""
+    return negative_cache.version
+
+def mark_search_empty(key: str, version: int):
+    """
+    Record a search whose ids all failed hydration (inactive/removed products)
+    as known-empty, unless the index changed since `version` was read.
+    """
+    negative_cache.set(key, True, version)
+
 async def search_semantic_impl(
     query: str, 
     limit: int = 15,
     min_price: float = None,
-    max_price: float = None
+    max_price: float = None,
+    color: str = None,
+    material: str = None,
+    warranty: str = None,
+    dimensions: Dict[str, Any] = None
 ) -> str:
-    """Search for product IDs using vector embeddings."""
+    """
+    Search for product IDs using vector embeddings.
+    color/material/warranty (substring terms) and dimensions
+    ({"width": [min, max], ...}) are resolved through the variant facet
+    index BEFORE ranking, so only matching products are scored.
+    """
     logger.info(f"Searching semantic vectors for: {query}")
-    vector_service = get_product_vector_service()
-    if not vector_service:
+    if not get_product_vector_service():
         return json.dumps({"status": "no_service", "ids": []})
+    
+    # Known-empty (same query and filters came back empty recently): skip embedding and search
+    empty_key = semantic_search_key(query, limit, min_price, max_price, color, material, warranty, dimensions)
+    if negative_cache.get(empty_key):
+        logger.info(f"Negative cache hit: {query}")
+        return json.dumps({"status": "no_results", "ids": []})
+    version = negative_cache.version
         
     try:
+        # Facet pre-filter (exact, no over-fetch)
+        allowed_ids = None
+        facet_index = get_product_facet_index()
+        if len(facet_index):
+            allowed = facet_index.filter(
+                terms={"color": color, "material": material, "warranty": warranty},
+                ranges={k: tuple(v) for k, v in (dimensions or {}).items()}
+            )
+            if allowed is not None:
+                if allowed:
+                    allowed_ids = sorted(allowed)
+                    logger.info(f"Facet filter: {len(allowed_ids)} candidate products")
+                else:
+                    # Keep previous behaviour: an unsatisfiable facet filter does not empty the search
+                    logger.info("Facet filter matched 0 products, searching without it")
+        
         # Search with limit (default 15)
-        # Vector service accepts price_min/max
-        results = vector_service.search_products(
-            query=query, 
-            top_k=limit,
-            price_min=min_price,
-            price_max=max_price
-        )
+        # Vector service accepts price_min/max; pin the snapshot during the query (hot reload safe)
+        with product_index.acquire() as vector_service:
+            results = vector_service.search_products(
+                query=query, 
+                top_k=limit,
+                price_min=min_price,
+                price_max=max_price,
+                product_ids=allowed_ids
+            )
         
         if not results:
+            negative_cache.set(empty_key, True, version)
             return json.dumps({"status": "no_results", "ids": []})
             
         ids = [r["product_id"] for r in results if r.get("product_id")]
@@ -149,9 +212,13 @@ async def search_product_vectors(
     query: Annotated[str, "Search query"],
     limit: Annotated[int, "Max IDs to return (default 15)"] = 15,
     min_price: Annotated[Optional[float], "Minimum price"] = None,
-    max_price: Annotated[Optional[float], "Maximum price"] = None
+    max_price: Annotated[Optional[float], "Maximum price"] = None,
+    color: Annotated[Optional[str], "Variant color, e.g. 'đen'"] = None,
+    material: Annotated[Optional[str], "Variant material, e.g. 'gỗ'"] = None,
+    warranty: Annotated[Optional[str], "Warranty, e.g. '24 tháng'"] = None,
+    dimensions: Annotated[Optional[Dict[str, List[Optional[float]]]], "Ranges for width/depth/height/weight_capacity, e.g. {'width': [null, 120]}"] = None
 ) -> str:
-    return await search_semantic_impl(query, limit, min_price, max_price)
+    return await search_semantic_impl(query, limit, min_price, max_price, color, material, warranty, dimensions)
 
 @mcp.tool(description="Get full product details (Brand, Category, Variants, Rating) from DB")
 async def get_products_db(
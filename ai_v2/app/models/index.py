@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+class ProductIndexRequest(BaseModel):
+    upsert: List[int] = []
+    delete: List[int] = []
+
+class ProductMetadataRequest(BaseModel):
+    product_ids: Optional[List[int]] = None  # None refreshes the whole catalog
+
+class IndexReloadRequest(BaseModel):
+    store: Literal["product", "legal"]
+    version: Optional[str] = None  # snapshot name; None re-reads CURRENT
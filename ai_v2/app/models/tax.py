@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional, Union
+
+class PitBatchRow(BaseModel):
+    employee_id: Optional[Union[str, int]] = None
+    gross_salary: float = Field(ge=0)
+    dependents: int = Field(default=0, ge=0)
+
+class PitBatchRequest(BaseModel):
+    rows: List[PitBatchRow]
@@ -0,0 +1,79 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from app.core.auth import require_admin_key
+from app.models.index import ProductIndexRequest, ProductMetadataRequest, IndexReloadRequest
+from app.services.product_indexing import build_volatile_updates, fetch_products_for_indexing
+from app.services.product_reindex_queue import get_product_reindex_queue
+from app.services.product_vector_service import (
+    get_product_vector_service, product_index,
+    search_cache as product_search_cache, negative_cache as product_negative_cache
+)
+from app.services.legal_vector_service import (
+    legal_index, search_cache as legal_search_cache, negative_cache as legal_negative_cache
+)
+from app.services.legal_reranker import score_cache as legal_rerank_cache
+from app.services.legal_answer_cache import get_legal_answer_cache
+from app.services.retrieval_gate import reload_retrieval_gate
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter(prefix="/index", dependencies=[Depends(require_admin_key)])
+
+REGISTRIES = {"product": product_index, "legal": legal_index}
+
+@router.post("/products", status_code=202)
+async def index_products(request: ProductIndexRequest):
+    """Queue products for re-embedding (upsert) or removal (delete)."""
+    logger.info(f"[INDEX] Product reindex requested: upsert={request.upsert} delete={request.delete}")
+    return get_product_reindex_queue().submit(upsert=request.upsert, delete=request.delete)
+
+@router.get("/products/status")
+async def index_products_status():
+    """Queue depth and lag of the product reindex worker."""
+    return get_product_reindex_queue().stats()
+
+@router.post("/products/metadata")
+async def refresh_product_metadata(request: ProductMetadataRequest):
+    """
+    Re-read price / rating / stock from MySQL into the served snapshot (no
+    re-embedding). Runs in the server so its result caches are invalidated.
+    """
+    if get_product_vector_service() is None:
+        raise HTTPException(status_code=503, detail="Product vector service unavailable")
+    products = await fetch_products_for_indexing(request.product_ids)
+    with product_index.acquire() as vector_service:
+        updated = await asyncio.to_thread(vector_service.update_product_metadata, build_volatile_updates(products))
+    logger.info(f"[INDEX] Product metadata refreshed: {updated}/{len(products)} products")
+    return {"products": len(products), "updated": updated}
+
+@router.post("/reload")
+async def reload_index(request: IndexReloadRequest):
+    """Open and warm a snapshot off the event loop, then swap it in without downtime."""
+    logger.info(f"[INDEX] Reload requested: store={request.store} version={request.version}")
+    try:
+        result = await REGISTRIES[request.store].reload(request.version)
+        if request.store == "legal":
+            # Abstention thresholds are recalibrated alongside legal snapshots
+            reload_retrieval_gate()
+        return result
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"[INDEX] Reload of {request.store} failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+
+@router.get("/status")
+async def index_status():
+    """Served snapshot version, in-flight references and result cache stats per store."""
+    caches = {"product": product_search_cache, "legal": legal_search_cache}
+    negative = {"product": product_negative_cache, "legal": legal_negative_cache}
+    status = {
+        name: {**registry.stats(), "cache": caches[name].stats(), "negative_cache": negative[name].stats()}
+        for name, registry in REGISTRIES.items()
+    }
+    status["legal"]["rerank_cache"] = legal_rerank_cache.stats()
+    answer_cache = get_legal_answer_cache()
+    status["legal"]["answer_cache"] = answer_cache.stats() if answer_cache else None
+    return status
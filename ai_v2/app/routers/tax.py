@@ -0,0 +1,75 @@
+import csv
+import io
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import ValidationError
+from app.core.auth import require_admin_key
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.mcps.legal import calculate_pit_batch_impl
+from app.models.tax import PitBatchRequest
+from app.services.personal_income_tax import PIT_BATCH_AMOUNTS
+
+logger = get_logger(__name__)
+router = APIRouter(prefix="/tax", dependencies=[Depends(require_admin_key)])
+
+CSV_COLUMNS = ["employee_id", "dependents", "bracket", *PIT_BATCH_AMOUNTS]
+
+def _columns_from_csv(text: str) -> Dict[str, List[Any]]:
+    """employee_id (optional), gross_salary, dependents (optional) columns of a payroll CSV."""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or "gross_salary" not in reader.fieldnames:
+        raise ValueError("CSV header must include gross_salary (optional: employee_id, dependents)")
+    has_ids = "employee_id" in reader.fieldnames
+    ids, gross, dependents = [], [], []
+    for n, row in enumerate(reader, 1):
+        try:
+            gross.append(float(row["gross_salary"]))
+            dependents.append(int(row.get("dependents") or 0))
+        except (TypeError, ValueError):
+            raise ValueError(f"Row {n}: gross_salary / dependents is not a number")
+        ids.append(row.get("employee_id"))
+    return {"gross_salaries": gross, "dependents": dependents, "employee_ids": ids if has_ids else None}
+
+def _columns_from_json(body: bytes) -> Dict[str, List[Any]]:
+    rows = PitBatchRequest.model_validate_json(body).rows
+    return {
+        "gross_salaries": [r.gross_salary for r in rows],
+        "dependents": [r.dependents for r in rows],
+        "employee_ids": [r.employee_id for r in rows] if any(r.employee_id is not None for r in rows) else None,
+    }
+
+def _to_csv(result: Dict[str, Any]) -> str:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    writer.writerows(result["results"])
+    writer.writerow({"employee_id": "TOTAL", **result["totals"]})
+    return out.getvalue()
+
+@router.post("/pit/batch")
+async def pit_batch(request: Request, format: str = "json"):
+    """
+    PIT for a payroll. Body: JSON {"rows": [{"employee_id", "gross_salary", "dependents"}]}
+    or text/csv with the same columns. ?format=csv returns CSV with a TOTAL row.
+    """
+    body = await request.body()
+    try:
+        if "csv" in request.headers.get("content-type", ""):
+            columns = _columns_from_csv(body.decode("utf-8-sig"))
+        else:
+            columns = _columns_from_json(body)
+        if len(columns["gross_salaries"]) > settings.TAX_BATCH_MAX_ROWS:
+            raise ValueError(f"At most {settings.TAX_BATCH_MAX_ROWS} rows per batch")
+        result = calculate_pit_batch_impl(**columns)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=jsonable_encoder(e.errors(include_url=False, include_input=False)))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"[TAX] PIT batch: {result['count']} rows, total PIT {result['totals']['pit']:,.0f} VND")
+    if format == "csv":
+        return Response(content=_to_csv(result), media_type="text/csv")
+    return result
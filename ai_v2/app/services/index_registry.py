@@ -0,0 +1,185 @@
+"""
+Versioned vector index snapshots with hot reload.
+
+Snapshot layout under a store's base directory (e.g. CHROMA_PRODUCT_DIR):
+
+    <base>/snapshots/<version>/   one ChromaDB directory per build
+    <base>/CURRENT                name of the snapshot to serve
+
+A base directory without CURRENT is served as-is (version "base"), which
+keeps existing deployments working. `reload()` opens and warms the new
+snapshot in a worker thread, then swaps the reference in one step. Requests
+hold a reference via `acquire()`; the previous snapshot is released once the
+last in-flight request using it finishes.
+
+The registry lives in one process: POST /index/reload swaps the snapshot of
+the worker that receives it only. Run the API with a single worker (the
+default `uvicorn main:app`), or restart every worker after publishing.
+Snapshot names are restricted to [\w.-]+ and must resolve to a directory
+directly under <base>/snapshots.
+"""
+import asyncio
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+BASE_VERSION = "base"
+_VERSION_RE = re.compile(r"[\w.-]+")
+
+
+def snapshot_dir(base_dir: str, version: str) -> Path:
+    """<base>/snapshots/<version>; ValueError for names that would resolve anywhere else."""
+    if not _VERSION_RE.fullmatch(version) or version in (".", ".."):
+        raise ValueError(f"Invalid snapshot version: {version!r}")
+    root = (Path(base_dir) / "snapshots").resolve()
+    path = (root / version).resolve()
+    if path.parent != root:
+        raise ValueError(f"Snapshot {version!r} resolves outside {root}")
+    return path
+
+
+def snapshot_path(base_dir: str, version: Optional[str] = None) -> Tuple[str, str]:
+    """Resolve (version, path) for a snapshot; version=None follows CURRENT."""
+    base = Path(base_dir)
+    if version is None:
+        current = base / "CURRENT"
+        version = current.read_text(encoding="utf-8").strip() if current.exists() else BASE_VERSION
+    if version == BASE_VERSION:
+        return version, str(base)
+    path = snapshot_dir(base_dir, version)
+    if not path.exists():
+        raise FileNotFoundError(f"Index snapshot not found: {path}")
+    return version, str(path)
+
+
+def publish_snapshot(base_dir: str, version: str):
+    """Point CURRENT at `version` so restarts and reloads pick it up."""
+    snapshot_dir(base_dir, version)
+    current = Path(base_dir) / "CURRENT"
+    tmp = current.with_suffix(".tmp")
+    tmp.write_text(version, encoding="utf-8")
+    tmp.replace(current)
+
+
+class _Handle:
+    def __init__(self, service: Any, version: str):
+        self.service = service
+        self.version = version
+        self.refs = 0
+        self.retired = False
+        self.loaded_at = time.time()
+
+
+class IndexRegistry:
+    """Holds the live snapshot of one vector store and swaps it atomically."""
+
+    def __init__(
+        self,
+        name: str,
+        base_dir: str,
+        factory: Callable[[str], Any],
+        warmup: Optional[Callable[[Any], None]] = None,
+        on_swap: Optional[Callable[[], None]] = None,
+    ):
+        self.name = name
+        self.base_dir = base_dir
+        self._factory = factory
+        self._warmup = warmup
+        self._on_swap = on_swap
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._handle: Optional[_Handle] = None
+        self._retired: List[_Handle] = []
+        self.generation = 0
+
+    def _open(self, version: Optional[str]) -> _Handle:
+        version, path = snapshot_path(self.base_dir, version)
+        started = time.time()
+        service = self._factory(path)
+        if self._warmup:
+            try:
+                self._warmup(service)
+            except Exception as e:
+                logger.warning(f"[{self.name}] Warmup of snapshot '{version}' failed: {e}")
+        logger.info(f"[{self.name}] Snapshot '{version}' ready in {time.time() - started:.2f}s")
+        return _Handle(service, version)
+
+    def current(self) -> Optional[Any]:
+        """Live service (lazy first load). Prefer acquire() inside request handling."""
+        if self._handle is None:
+            with self._reload_lock:
+                if self._handle is None:
+                    handle = self._open(None)
+                    with self._lock:
+                        self._handle = handle
+                        self.generation += 1
+        return self._handle.service
+
+    @contextmanager
+    def acquire(self):
+        """Pin the current snapshot for the duration of a request."""
+        self.current()
+        with self._lock:
+            handle = self._handle
+            handle.refs += 1
+        try:
+            yield handle.service
+        finally:
+            with self._lock:
+                handle.refs -= 1
+                if handle.retired and handle.refs == 0:
+                    self._release(handle)
+
+    def _release(self, handle: _Handle):
+        """Called with self._lock held once a retired snapshot has no readers."""
+        if handle in self._retired:
+            self._retired.remove(handle)
+        close = getattr(handle.service, "close", None)
+        if close:
+            try:
+                close()
+            except Exception as e:
+                logger.warning(f"[{self.name}] Closing snapshot '{handle.version}' failed: {e}")
+        logger.info(f"[{self.name}] Released snapshot '{handle.version}'")
+
+    def reload_sync(self, version: Optional[str] = None) -> Dict[str, Any]:
+        """Open + warm a snapshot, then swap it in. Blocking; see reload()."""
+        with self._reload_lock:
+            handle = self._open(version)
+            with self._lock:
+                old, self._handle = self._handle, handle
+                self.generation += 1
+                if old is not None:
+                    old.retired = True
+                    if old.refs == 0:
+                        self._release(old)
+                    else:
+                        self._retired.append(old)
+            if version is not None and version != BASE_VERSION:
+                publish_snapshot(self.base_dir, version)
+        if self._on_swap:
+            self._on_swap()
+        return self.stats()
+
+    async def reload(self, version: Optional[str] = None) -> Dict[str, Any]:
+        """Hot reload without blocking the event loop; in-flight requests keep their snapshot."""
+        return await asyncio.to_thread(self.reload_sync, version)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            handle = self._handle
+            return {
+                "store": self.name,
+                "version": handle.version if handle else None,
+                "generation": self.generation,
+                "loaded_at": handle.loaded_at if handle else None,
+                "active_refs": handle.refs if handle else 0,
+                "retired_pending": [{"version": h.version, "refs": h.refs} for h in self._retired],
+            }
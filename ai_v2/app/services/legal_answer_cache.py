@@ -0,0 +1,153 @@
+"""
+Persistent cache of synthesized legal answers.
+
+An answer depends only on the question, the chunks it was generated from,
+the prompt and the model, so the key is sha256 over (normalized question,
+sorted chunk ids, prompt version, model). Entries also record the corpus
+version they were produced under; a lookup under another version misses,
+and the first write under a new version deletes the old entries. Only
+complete answers are stored (finish reason STOP: no truncated, blocked or
+failed generations). Rows live in SQLite (survives restarts) and are
+LRU-evicted beyond max_entries.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from app.core.cache import normalize_query
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.services.legal_vector_service import served_corpus_version
+
+logger = get_logger(__name__)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question: str) -> str:
+    """normalize_query plus punctuation folded away ("...?" and "..." share answers)."""
+    return " ".join(_PUNCTUATION_RE.sub(" ", normalize_query(question)).split())
+
+
+def prompt_version(template: str, *params: Any) -> str:
+    """Short digest of a prompt template and whatever else shapes the prompt (context budget)."""
+    return hashlib.sha256(json.dumps([template, *params], ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class LegalAnswerCache:
+    def __init__(self, path: str, max_entries: int):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._current_version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY, corpus_version TEXT NOT NULL, answer TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(question: str, chunk_ids: Sequence[str], prompt_key: str, model: str) -> str:
+        parts = [normalize_question(question), sorted(chunk_ids), prompt_key, model]
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str, corpus_version: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer FROM answers WHERE key = ? AND corpus_version = ?", [key, corpus_version]
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", [time.time(), key])
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, corpus_version: str, answer: str):
+        if not answer:
+            return
+        now = time.time()
+        with self._lock:
+            if corpus_version != self._current_version:
+                dropped = self._conn.execute(
+                    "DELETE FROM answers WHERE corpus_version != ?", [corpus_version]
+                ).rowcount
+                if dropped:
+                    logger.info(f"Legal answer cache: dropped {dropped} answers of older corpus versions")
+                self._current_version = corpus_version
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, corpus_version, answer, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [key, corpus_version, answer, now, now],
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used LIMIT ?)", [excess]
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {"entries": entries, "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[LegalAnswerCache] = None
+
+
+def get_legal_answer_cache() -> Optional[LegalAnswerCache]:
+    """Shared cache (None when LEGAL_ANSWER_CACHE_PATH is empty)."""
+    global _cache
+    if not settings.LEGAL_ANSWER_CACHE_PATH:
+        return None
+    if _cache is None:
+        _cache = LegalAnswerCache(settings.LEGAL_ANSWER_CACHE_PATH, settings.LEGAL_ANSWER_CACHE_MAX_ENTRIES)
+        logger.info(f"Legal answer cache: {_cache.path} ({_cache.stats()['entries']} answers)")
+    return _cache
+
+
+async def answer_with_cache(
+    question: str,
+    chunk_ids: Sequence[str],
+    prompt_key: str,
+    generate: Callable[[], Awaitable[Tuple[str, bool]]],
+) -> str:
+    """
+    The answer stored for the same question, chunks, prompt version and
+    model, or the text of `generate()` -> (text, complete), stored when complete.
+    """
+    cache = get_legal_answer_cache()
+    if cache is None:
+        answer, _ = await generate()
+        return answer
+    key = cache.make_key(question, chunk_ids, prompt_key, f"{settings.GEMINI_MODEL}@{settings.LLM_TEMPERATURE}")
+    version = served_corpus_version()
+    answer = cache.get(key, version)
+    if answer is not None:
+        logger.info(f"Legal answer cache hit: {question[:80]}")
+        return answer
+    answer, complete = await generate()
+    if complete:
+        cache.put(key, version, answer)
+    else:
+        logger.info(f"Legal answer not cached (incomplete generation): {question[:80]}")
+    return answer
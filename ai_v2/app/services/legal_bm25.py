@@ -0,0 +1,273 @@
+"""
+BM25 inverted index over legal chunks (lexical side of hybrid retrieval).
+
+Statutory terms ("người đại diện theo pháp luật", "thuế thu nhập cá nhân")
+are multi-syllable words that Vietnamese writes with spaces, so documents
+are tokenized into syllables plus adjacent-syllable bigrams: a bigram hit
+("đại_diện") scores a phrase match, the unigram keeps partial matches.
+
+The index is built offline from `legal_documents.json` (article title,
+original_text and keywords), saved as a single `.npz` of plain arrays (no
+pickle) and loaded at startup. Per-posting BM25 weights are precomputed, so a query is a few
+array slices and one `np.add.at`. The filterable chunk metadata
+(source_id, article_key, is_boilerplate, kw_* ...) is stored as columns so
+the same `where` conditions as the vector search apply.
+"""
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.logger import get_logger
+from app.services.legal_indexing import build_chunk_metadata
+
+logger = get_logger(__name__)
+
+BM25_DIRNAME = "bm25"
+BM25_FILENAME = "legal_bm25.npz"
+BM25_FORMAT = 1
+
+# Chunk metadata kept as filter columns (plus every kw_* flag)
+FILTER_COLUMNS = ("source_id", "article_key", "doc_type", "status", "doc_name", "is_boilerplate")
+
+# Question phrasing that never occurs in statute text
+QUERY_STOPWORDS = {
+    "gì", "nào", "thế", "sao", "bao", "nhiêu", "không", "hỏi", "ạ", "vậy",
+    "cho", "tôi", "mình", "em", "anh", "chị", "xin", "hãy", "có", "là", "được",
+}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def bm25_path(base_dir: str) -> Path:
+    return Path(base_dir) / BM25_DIRNAME / BM25_FILENAME
+
+
+def tokenize(text: str, drop: Iterable[str] = ()) -> List[str]:
+    """Lowercased syllables plus "a_b" bigrams of adjacent syllables."""
+    drop = set(drop)
+    syllables = [s for s in _WORD.findall(unicodedata.normalize("NFC", text or "").lower()) if s not in drop]
+    return syllables + [f"{a}_{b}" for a, b in zip(syllables, syllables[1:])]
+
+
+def tokenize_query(text: str) -> List[str]:
+    return tokenize(text, drop=QUERY_STOPWORDS)
+
+
+def chunk_lexical_text(chunk: Dict[str, Any]) -> str:
+    """Article title (original_text starts at "Điều N." without it), text, keywords."""
+    meta = chunk.get("metadata", {})
+    keywords = meta.get("keywords") or []
+    if isinstance(keywords, (list, tuple)):
+        keywords = " ; ".join(str(k) for k in keywords)
+    return f"{meta.get('article_title') or ''}\n{chunk.get('original_text') or ''}\n{keywords}"
+
+
+class LegalBM25Index:
+    def __init__(
+        self,
+        ids: np.ndarray,
+        vocab: np.ndarray,
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        weights: np.ndarray,
+        columns: Dict[str, np.ndarray],
+    ):
+        self.ids = ids
+        self.vocab = vocab
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+        self.columns = columns
+        self._term_ids = {str(t): i for i, t in enumerate(vocab)}
+        self._rows: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- Build / persist ---
+
+    @classmethod
+    def build(cls, chunks: Iterable[Dict[str, Any]], k1: float = 1.2, b: float = 0.75) -> "LegalBM25Index":
+        """
+        One pass over a chunk stream: postings, document lengths and filter
+        columns are accumulated per chunk, no chunk is held.
+        """
+        ids: List[str] = []
+        lengths = array("f")
+        postings: Dict[str, Tuple[array, array]] = {}
+        values: Dict[str, List[Any]] = {name: [] for name in FILTER_COLUMNS}
+        keyword_rows: Dict[str, List[int]] = {}
+        for doc, chunk in enumerate(chunks):
+            tf = Counter(tokenize(chunk_lexical_text(chunk)))
+            for term, count in tf.items():
+                plist = postings.get(term)
+                if plist is None:
+                    plist = postings[term] = (array("i"), array("f"))
+                plist[0].append(doc)
+                plist[1].append(count)
+            lengths.append(sum(tf.values()))
+            ids.append(chunk["id"])
+            meta = build_chunk_metadata(chunk)
+            for name in FILTER_COLUMNS:
+                values[name].append(meta.get(name))
+            for name, flag in meta.items():
+                if name.startswith("kw_"):
+                    rows = keyword_rows.setdefault(name, [])
+                    if flag:
+                        rows.append(doc)
+
+        n_docs = len(ids)
+        lengths = np.frombuffer(lengths, dtype=np.float32) if n_docs else np.zeros(0, dtype=np.float32)
+        avg_len = float(lengths.mean()) if n_docs else 1.0
+        vocab = sorted(postings)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        docs, weights = [], []
+        for i, term in enumerate(vocab):
+            rows = np.frombuffer(postings[term][0], dtype=np.int32)
+            tf = np.frombuffer(postings[term][1], dtype=np.float32)
+            idf = np.log(1.0 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = k1 * (1.0 - b + b * lengths[rows] / avg_len)
+            docs.append(rows)
+            weights.append((idf * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32))
+            offsets[i + 1] = offsets[i] + len(rows)
+
+        columns = {}
+        for name, column in values.items():
+            if name == "is_boilerplate":
+                columns[name] = np.array([bool(v) for v in column], dtype=bool)
+            else:
+                columns[name] = np.array(["" if v is None else str(v) for v in column])
+        for name in sorted(keyword_rows):
+            column = np.zeros(n_docs, dtype=bool)
+            column[keyword_rows[name]] = True
+            columns[name] = column
+
+        return cls(
+            ids=np.array(ids),
+            vocab=np.array(vocab),
+            offsets=offsets,
+            docs=np.concatenate(docs) if docs else np.zeros(0, dtype=np.int32),
+            weights=np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32),
+            columns=columns,
+        )
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            format=np.array(BM25_FORMAT),
+            ids=self.ids,
+            vocab=self.vocab,
+            offsets=self.offsets,
+            docs=self.docs,
+            weights=self.weights,
+            **{f"col_{name}": values for name, values in self.columns.items()},
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "LegalBM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format"]) != BM25_FORMAT:
+                raise ValueError(f"Unsupported BM25 index format in {path}")
+            return cls(
+                ids=data["ids"],
+                vocab=data["vocab"],
+                offsets=data["offsets"],
+                docs=data["docs"],
+                weights=data["weights"],
+                columns={k[4:]: data[k] for k in data.files if k.startswith("col_")},
+            )
+
+    # --- Query ---
+
+    def _mask(self, conditions: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Row mask for flat {field: {"$eq"|"$in": v}} conditions; None if a field or operator is not indexed."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for condition in conditions:
+            (field, spec), = condition.items()
+            column = self.columns.get(field)
+            if column is None or not isinstance(spec, dict):
+                return None
+            for op, operand in spec.items():
+                if column.dtype == bool:
+                    operand = [bool(v) for v in operand] if op == "$in" else bool(operand)
+                else:
+                    operand = [str(v) for v in operand] if op == "$in" else str(operand)
+                if op == "$eq":
+                    mask &= column == operand
+                elif op == "$in":
+                    mask &= np.isin(column, operand)
+                else:
+                    return None
+        return mask
+
+    def search(self, query: str, n: int, conditions: Optional[List[Dict[str, Any]]] = None) -> Optional[List[Tuple[str, float]]]:
+        """
+        Top-n (chunk id, BM25 score) for `query`, best first. Returns None
+        when a condition cannot be evaluated here (caller skips lexical).
+        """
+        mask = self._mask(conditions or [])
+        if mask is None:
+            return None
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize_query(query)):
+            i = self._term_ids.get(term)
+            if i is None:
+                continue
+            start, end = self.offsets[i], self.offsets[i + 1]
+            np.add.at(scores, self.docs[start:end], self.weights[start:end])
+        scores[~mask] = 0.0
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > n:
+            hits = hits[np.argpartition(-scores[hits], n - 1)[:n]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(str(self.ids[r]), float(scores[r])) for r in hits]
+
+
+    def coverage(self, query: str, chunk_ids: Sequence[str]) -> List[Optional[float]]:
+        """
+        IDF-weighted share of the query's terms found in each chunk (None if
+        the chunk is not indexed). Terms the corpus never uses weigh the
+        most, so off-topic questions score low against any chunk.
+        """
+        rows = self._row_numbers(chunk_ids)
+        covered = np.zeros(len(rows), dtype=np.float64)
+        total = 0.0
+        n_docs = len(self.ids)
+        for term in set(tokenize_query(query)):
+            i = self._term_ids.get(term)
+            postings = self.docs[self.offsets[i]:self.offsets[i + 1]] if i is not None else self.docs[:0]
+            weight = float(np.log(1.0 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5)))
+            total += weight
+            if len(postings):
+                covered += weight * np.isin(rows, postings)
+        if total == 0.0:
+            return [None] * len(rows)
+        return [float(c / total) if row >= 0 else None for c, row in zip(covered, rows)]
+
+    def column_values(self, name: str, chunk_ids: Sequence[str]) -> List[Optional[str]]:
+        """Filter column `name` for each chunk (None if the chunk is not indexed)."""
+        column = self.columns[name]
+        return [str(column[row]) if row >= 0 else None for row in self._row_numbers(chunk_ids)]
+
+    def _row_numbers(self, chunk_ids: Sequence[str]) -> np.ndarray:
+        """Row of each chunk id, -1 if not indexed."""
+        if self._rows is None:
+            self._rows = {str(chunk_id): row for row, chunk_id in enumerate(self.ids)}
+        return np.array([self._rows.get(str(i), -1) for i in chunk_ids], dtype=np.int64)
+
+
+def load_bm25_index(base_dir: str) -> Optional[LegalBM25Index]:
+    """Index saved next to a legal snapshot, or None if it was never built."""
+    path = bm25_path(base_dir)
+    if not path.exists():
+        return None
+    index = LegalBM25Index.load(path)
+    logger.info(f"Legal BM25 index: {len(index)} chunks, {len(index.vocab)} terms")
+    return index
@@ -0,0 +1,191 @@
+"""
+Structured citation index for legal provisions.
+
+Citation-style questions ("Điều 3 Bộ luật Lao động", "khoản 2 điều 48 luật
+doanh nghiệp", "điểm a khoản 1 điều 219 BLLĐ") name the provision exactly, so
+they are answered from dict lookups on (source_id, article, clause, point)
+built from the chunk corpus instead of embedding + vector search. The
+law is resolved from the question by alias phrase match, then by fuzzy
+(character-trigram) match to tolerate typos and missing words.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.logger import get_logger
+from app.core.utils import normalize_text
+from app.legal_ingest.corpus import default_corpus_path, open_corpus
+
+logger = get_logger(__name__)
+
+FUZZY_LAW_MIN_DICE = 0.75
+
+# Extra names people use for a law (normalized, no diacritics), by source_id
+LAW_ALIASES = {
+    "125": ["bo luat lao dong", "luat lao dong", "blld"],
+    "22": ["luat thue thu nhap doanh nghiep", "thue thu nhap doanh nghiep", "thue tndn", "luat tndn"],
+    "103": ["luat thue thu nhap ca nhan", "thue thu nhap ca nhan", "thue tncn", "luat tncn"],
+    "134": ["luat dau tu"],
+    "67": ["luat doanh nghiep", "ldn"],
+    "123": ["nghi dinh 123", "nd 123"],
+}
+
+ARTICLE_RE = re.compile(r"điều\s+(\d+)")
+CLAUSE_RE = re.compile(r"khoản\s+(\d+)")
+POINT_RE = re.compile(r"điểm\s+([a-zđ])\b")
+
+Key = Tuple[str, int, Optional[int], Optional[str]]
+
+
+def _number(label: str) -> Optional[int]:
+    m = re.search(r"\d+", label or "")
+    return int(m.group()) if m else None
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: str, b: str) -> float:
+    ga, gb = _trigrams(a), _trigrams(b)
+    return 2 * len(ga & gb) / (len(ga) + len(gb)) if ga and gb else 0.0
+
+
+def parse_citation(text: str) -> Optional[Dict]:
+    """{"article": 48, "clause": 2, "point": "a"} or None if no article is cited."""
+    lower = (text or "").lower()
+    article = ARTICLE_RE.search(lower)
+    if not article:
+        return None
+    clause = CLAUSE_RE.search(lower)
+    point = POINT_RE.search(lower)
+    return {
+        "article": int(article.group(1)),
+        "clause": int(clause.group(1)) if clause else None,
+        "point": point.group(1) if point and clause else None,
+    }
+
+
+class LegalCitationIndex:
+    def __init__(self):
+        self._chunks: Dict[Key, List[Dict]] = defaultdict(list)
+        self._articles: Dict[Tuple[str, int], List[Dict]] = defaultdict(list)
+        self._article_sources: Dict[int, set] = defaultdict(set)
+        self._aliases: List[Tuple[str, str]] = []  # (normalized alias, source_id), longest first
+        self.doc_names: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._articles.values())
+
+    def build(self, chunks: Iterable[Dict]):
+        fresh = LegalCitationIndex()
+        for chunk in chunks:
+            meta = chunk.get("metadata", {})
+            source_id = str(meta.get("source_id") or "")
+            article = _number(meta.get("article"))
+            if not source_id or article is None:
+                continue
+            fresh.doc_names.setdefault(source_id, meta.get("doc_name", source_id))
+            entry = {
+                "id": chunk["id"],
+                "text": chunk.get("original_text") or chunk.get("text_for_embedding", ""),
+                "metadata": meta,
+            }
+            clause = _number(meta.get("clause"))
+            point = (meta.get("point") or "").lower() or None
+            fresh._articles[(source_id, article)].append(entry)
+            fresh._article_sources[article].add(source_id)
+            if clause is not None:
+                fresh._chunks[(source_id, article, clause, None)].append(entry)
+                if point:
+                    fresh._chunks[(source_id, article, clause, point)].append(entry)
+
+        aliases = set()
+        for source_id, doc_name in fresh.doc_names.items():
+            name = normalize_text(doc_name)
+            aliases.add((name, source_id))
+            # "luat doanh nghiep 2020" -> "luat doanh nghiep"
+            aliases.add((re.sub(r"(\s+\d+)+$", "", name), source_id))
+            for alias in LAW_ALIASES.get(source_id, []):
+                aliases.add((alias, source_id))
+        fresh._aliases = sorted(aliases, key=lambda a: -len(a[0]))
+        self.__dict__.update(fresh.__dict__)
+
+    def resolve_law(self, text: str) -> Optional[str]:
+        """source_id of the law named in `text` (exact alias, else fuzzy)."""
+        query = f" {normalize_text(text)} "
+        for alias, source_id in self._aliases:
+            if f" {alias} " in query:
+                return source_id
+
+        # Fuzzy: compare each alias with query windows of the same word count
+        tokens = query.split()
+        best, best_score = None, FUZZY_LAW_MIN_DICE
+        for alias, source_id in self._aliases:
+            width = len(alias.split())
+            if width < 2:
+                continue
+            for i in range(len(tokens) - width + 1):
+                score = _dice(alias, " ".join(tokens[i:i + width]))
+                if score > best_score:
+                    best, best_score = source_id, score
+        return best
+
+    def lookup(self, text: str) -> Optional[List[Dict]]:
+        """
+        Exact provisions cited in `text`, or None when the question is not a
+        resolvable citation (no article, unknown law, ambiguous article).
+        """
+        citation = parse_citation(text)
+        if not citation:
+            return None
+        article = citation["article"]
+        source_id = self.resolve_law(text)
+        if source_id is None:
+            # No law named: only unambiguous if a single law has this article
+            sources = self._article_sources.get(article, set())
+            if len(sources) != 1:
+                return None
+            source_id = next(iter(sources))
+
+        if citation["clause"] is not None:
+            key = (source_id, article, citation["clause"], citation["point"])
+            hits = self._chunks.get(key)
+            if not hits and citation["point"]:
+                hits = self._chunks.get((source_id, article, citation["clause"], None))
+            if hits:
+                return hits
+        return self._articles.get((source_id, article)) or None
+
+
+def format_citation_context(chunks: List[Dict]) -> str:
+    """Context block for synthesis, same shape as the vector search context."""
+    context = ""
+    for chunk in chunks:
+        meta = chunk["metadata"]
+        location = ", ".join(p for p in [
+            f"{meta.get('article')}. {meta.get('article_title') or ''}".strip(" ."),
+            meta.get("clause") or "",
+            f"Điểm {meta['point']}" if meta.get("point") else "",
+        ] if p)
+        context += f"\n---\nNguồn: {meta.get('doc_name')} - {location}\nNội dung: {chunk['text']}\n"
+    return context
+
+
+_index: Optional[LegalCitationIndex] = None
+
+
+def get_legal_citation_index() -> LegalCitationIndex:
+    """Lazily built from the chunk corpus (LEGAL_CORPUS_DIR, else LEGAL_DOCUMENTS_JSON; empty if missing)."""
+    global _index
+    if _index is None:
+        index = LegalCitationIndex()
+        path = default_corpus_path()
+        if path.exists():
+            index.build(open_corpus(path).iter_chunks())
+            logger.info(f"Legal citation index built: {len(index)} chunks, {len(index.doc_names)} laws")
+        else:
+            logger.warning(f"Legal citation index: {path} not found")
+        _index = index
+    return _index
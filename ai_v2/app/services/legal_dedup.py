@@ -0,0 +1,229 @@
+"""
+Near-duplicate chunk removal for the legal corpus (MinHash + LSH).
+
+Consolidated (VBHN) texts and amending laws repeat the same provisions, so
+the same clause is embedded several times and fills the top-k with copies.
+Before ingestion every chunk gets a MinHash signature over syllable
+shingles of its text (the "Điều N." heading is ignored); LSH banding finds
+candidate pairs, and pairs whose exact shingle Jaccard reaches the
+threshold are merged into clusters.
+
+Only copies within one document (same source_id) are dropped: a cluster
+keeps one canonical chunk per source_id, the longest, so every law still
+holds its provisions for doc_type / source filters and per-source shards.
+Each canonical lists the citations of the whole cluster in `citations`
+("; "-separated, its own first, so a provision repeated across laws
+cites them all) and the ids it absorbed in `duplicate_ids`.
+
+plan_duplicates works in one pass over a chunk stream and returns the ids to
+drop plus the metadata to add; apply_plan applies it to a (second) stream.
+"""
+import re
+import unicodedata
+import zlib
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_HEADING = re.compile(r"^\s*điều\s+\d+\s*\.?", re.IGNORECASE)
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+SHINGLE_SIZE = 3
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Syllable n-grams of a chunk's content (heading stripped)."""
+    text = _HEADING.sub("", unicodedata.normalize("NFC", text or "").lower(), count=1)
+    words = _WORD.findall(text)
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, int(_MERSENNE), size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE), size=num_perm, dtype=np.uint64)
+
+    def signature(self, items: Set[str]) -> np.ndarray:
+        if not items:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in items], dtype=np.uint64)
+        permuted = ((hashes[:, None] * self._a + self._b) % _MERSENNE) & _MAX_HASH
+        return permuted.min(axis=0)
+
+
+def citation(metadata: Dict[str, Any]) -> str:
+    """"Bộ Luật Lao Động, Điều 78, Khoản 1" style label of a chunk."""
+    parts = [metadata.get("doc_name"), metadata.get("article"), metadata.get("clause")]
+    if metadata.get("point"):
+        parts.append(f"Điểm {metadata['point']}")
+    return ", ".join(str(p) for p in parts if p)
+
+
+def plan_duplicates(
+    chunks: Iterable[Dict[str, Any]],
+    threshold: float = 0.9,
+    num_perm: int = 128,
+    bands: int = 32,
+    min_chars: int = 80,
+    load_text: Optional[Callable[[str], str]] = None,
+) -> Dict[str, Any]:
+    """
+    One pass over `chunks` (any iterable) that keeps per chunk only its
+    signature and ranking fields. Chunks shorter than `min_chars` are never
+    merged: a few shingles give no reliable similarity. With `load_text`
+    (chunk id -> original_text, e.g. random access into the corpus) candidate
+    pairs are re-read for the exact Jaccard check instead of holding every
+    shingle set in memory.
+
+    Returns {"drop": ids to skip, "merged": {canonical id: metadata additions}, "report"}.
+    """
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+    rows = num_perm // bands
+    hasher = MinHasher(num_perm)
+
+    ids: List[str] = []
+    sources: List[str] = []
+    lengths: List[int] = []
+    citations: List[str] = []
+    kept_shingles: Optional[List[Set[str]]] = [] if load_text is None else None
+    buckets: Dict[Tuple[int, bytes], List[int]] = {}
+    for i, chunk in enumerate(chunks):
+        text = chunk.get("original_text") or ""
+        meta = chunk.get("metadata", {})
+        ids.append(chunk["id"])
+        sources.append(str(meta.get("source_id")))
+        lengths.append(len(text))
+        citations.append(citation(meta))
+        items = shingles(text)
+        if kept_shingles is not None:
+            kept_shingles.append(items)
+        if len(text.strip()) < min_chars:
+            continue
+        sig = hasher.signature(items)
+        for band in range(bands):
+            buckets.setdefault((band, sig[band * rows:(band + 1) * rows].tobytes()), []).append(i)
+
+    @lru_cache(maxsize=1024)
+    def shingles_of(i: int) -> FrozenSet[str]:
+        return frozenset(kept_shingles[i] if kept_shingles is not None else shingles(load_text(ids[i])))
+
+    parent = list(range(len(ids)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked, candidate_pairs = set(), 0
+    for members in buckets.values():
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                pair = (members[x], members[y])
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                candidate_pairs += 1
+                if jaccard(shingles_of(pair[0]), shingles_of(pair[1])) >= threshold:
+                    parent[find(pair[1])] = find(pair[0])
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(ids)):
+        clusters.setdefault(find(i), []).append(i)
+
+    report_clusters, drop, merged = [], set(), {}
+    for members in clusters.values():
+        if len(members) == 1:
+            continue
+        by_source: Dict[str, List[int]] = {}
+        for i in members:
+            by_source.setdefault(sources[i], []).append(i)
+        for group in by_source.values():
+            canonical = min(group, key=lambda i: (-lengths[i], i))
+            others = [i for i in group if i != canonical]
+            elsewhere = [i for i in members if sources[i] != sources[canonical]]
+            drop.update(ids[i] for i in others)
+            report_clusters.append({
+                "canonical": ids[canonical],
+                "duplicates": [ids[i] for i in others],
+                "citations": [citations[i] for i in [canonical] + others + elsewhere],
+                "cross_law": bool(elsewhere),
+            })
+            merged[ids[canonical]] = {
+                "citations": "; ".join(dict.fromkeys(citations[i] for i in [canonical] + others + elsewhere)),
+                "duplicate_ids": [ids[i] for i in others],
+            }
+
+    report = {
+        "input_chunks": len(ids),
+        "output_chunks": len(ids) - len(drop),
+        "removed": len(drop),
+        "clusters": report_clusters,
+        "candidate_pairs": candidate_pairs,
+        "threshold": threshold,
+        "num_perm": num_perm,
+        "bands": bands,
+        "min_chars": min_chars,
+    }
+    return {"drop": drop, "merged": merged, "report": report}
+
+
+def apply_plan(chunks: Iterable[Dict[str, Any]], plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Kept chunks in corpus order; canonical chunks get `citations` and `duplicate_ids`."""
+    for chunk in chunks:
+        if chunk["id"] in plan["drop"]:
+            continue
+        extra = plan["merged"].get(chunk["id"])
+        if extra:
+            chunk = {**chunk, "metadata": {**chunk.get("metadata", {}), **extra}}
+        yield chunk
+
+
+def deduplicate_chunks(
+    chunks: List[Dict[str, Any]],
+    threshold: float = 0.9,
+    num_perm: int = 128,
+    bands: int = 32,
+    min_chars: int = 80,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """(kept chunks in corpus order, report) for an in-memory chunk list."""
+    plan = plan_duplicates(chunks, threshold=threshold, num_perm=num_perm, bands=bands, min_chars=min_chars)
+    return list(apply_plan(chunks, plan)), plan["report"]
+
+
+def plan_for_ingestion(
+    chunks: Iterable[Dict[str, Any]], load_text: Optional[Callable[[str], str]] = None
+) -> Dict[str, Any]:
+    """plan_duplicates with the LEGAL_DEDUP_* settings (empty plan when disabled)."""
+    if not settings.LEGAL_DEDUP_ENABLED:
+        count = sum(1 for _ in chunks)
+        report = {"input_chunks": count, "output_chunks": count, "removed": 0, "clusters": []}
+        return {"drop": set(), "merged": {}, "report": report}
+    return plan_duplicates(
+        chunks,
+        threshold=settings.LEGAL_DEDUP_THRESHOLD,
+        num_perm=settings.LEGAL_DEDUP_NUM_PERM,
+        bands=settings.LEGAL_DEDUP_BANDS,
+        min_chars=settings.LEGAL_DEDUP_MIN_CHARS,
+        load_text=load_text,
+    )
+
+
+def dedup_for_ingestion(chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """deduplicate_chunks with the LEGAL_DEDUP_* settings (pass-through when disabled)."""
+    plan = plan_for_ingestion(chunks)
+    return list(apply_plan(chunks, plan)), plan["report"]
@@ -0,0 +1,190 @@
+"""
+Legal chunk indexing helpers shared by the ingestion scripts and the service.
+
+Noise and keyword classifications that search used to apply in Python
+after over-fetching are computed once here and stored as boolean metadata:
+
+    is_boilerplate     preamble ("Dẫn nhập", "Phần mở đầu") and
+                       entry-into-force articles ("hiệu lực thi hành", ...)
+    kw_<slug>          chunk mentions an indexed keyword (e.g. kw_bao_hanh)
+
+Search pushes them down as `where` filters and fetches exactly top_k.
+Collections ingested this way carry LEGAL_SCHEMA_KEY in their metadata;
+older collections keep the over-fetch + Python filtering path.
+
+Chunks are written to one shard collection per law (source_id), not to
+the main collection (which only carries the schema marker): a question
+naming a law searches that law's shard, any other question the shards of
+its candidate articles' laws, or all shards in parallel.
+
+A second, coarser level has one record per article (ARTICLE_COLLECTION):
+title plus condensed clause text for the vector, full article text as the
+document. Search picks candidate articles first and ranks clauses only
+inside them (`article_key` metadata on every chunk links the two levels).
+"""
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+LEGAL_SCHEMA_KEY = "legal_schema"
+LEGAL_SCHEMA_VERSION = 2
+SHARD_PREFIX = "legal_shard_"
+ARTICLE_COLLECTION = "legal_articles"
+
+# Query keywords that gate results to chunks mentioning them
+INDEXED_KEYWORDS = ["bảo hành"]
+
+_BOILERPLATE_ARTICLE = ("dẫn nhập",)
+_BOILERPLATE_CHAPTER = ("phần mở đầu",)
+_BOILERPLATE_TITLE = ("hiệu lực thi hành", "điều khoản thi hành")
+
+
+def shard_collection_name(source_id: str) -> str:
+    """Per-law collection name: "125" -> "legal_shard_125"."""
+    return SHARD_PREFIX + re.sub(r"[^A-Za-z0-9_-]+", "_", str(source_id)).strip("_")
+
+
+def article_key(metadata: Dict[str, Any]) -> str:
+    """Parent article of a chunk: "125:Điều 3"."""
+    return f"{metadata.get('source_id', '')}:{metadata.get('article', '')}"
+
+
+def keyword_flag(keyword: str) -> str:
+    """Metadata field for a keyword: "bảo hành" -> "kw_bao_hanh"."""
+    text = unicodedata.normalize("NFD", keyword.lower()).replace("đ", "d")
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    return "kw_" + re.sub(r"[^a-z0-9]+", "_", text).strip("_")
+
+
+def is_boilerplate(metadata: Dict[str, Any]) -> bool:
+    chapter = str(metadata.get("chapter") or "").lower()
+    article = str(metadata.get("article") or "").lower()
+    article_title = str(metadata.get("article_title") or "").lower()
+    if any(p in article for p in _BOILERPLATE_ARTICLE) or any(p in chapter for p in _BOILERPLATE_CHAPTER):
+        return True
+    return any(p in article_title or p in article for p in _BOILERPLATE_TITLE)
+
+
+def chunk_document(chunk: Dict[str, Any]) -> str:
+    """Stored document text (what search returns to the agents)."""
+    return chunk.get("text_for_embedding") or chunk.get("original_text") or ""
+
+
+def build_chunk_metadata(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Chroma-compatible metadata (scalars only) plus the index-time flags."""
+    source = chunk.get("metadata", {})
+    metadata: Dict[str, Any] = {}
+    for key, value in source.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(v) for v in value)
+        metadata[key] = value
+
+    metadata["is_boilerplate"] = is_boilerplate(source)
+    metadata["article_key"] = article_key(source)
+    haystack = " ".join([
+        chunk.get("original_text") or "",
+        chunk.get("text_for_embedding") or "",
+        str(metadata.get("keywords", "")),
+    ]).lower()
+    for keyword in INDEXED_KEYWORDS:
+        metadata[keyword_flag(keyword)] = keyword in haystack
+    return metadata
+
+
+_ENUMERATOR = re.compile(r"^(điều\s+\d+\s*\.?|\d+\s*\.|[a-zđ]\s*\))\s*", re.IGNORECASE)
+
+
+def _first_sentence(text: str) -> str:
+    """Lead sentence of a clause, without "Điều 3." / "1." / "a)" enumerators."""
+    text = " ".join((text or "").split())
+    while True:
+        stripped = _ENUMERATOR.sub("", text, count=1)
+        if stripped == text:
+            break
+        text = stripped
+    m = re.search(r"^(.+?[.;:])(\s|$)", text)
+    return m.group(1) if m else text
+
+
+def iter_article_records(
+    chunks: Iterable[Dict[str, Any]],
+    summary_chars: int = 800,
+    load_text: Optional[Callable[[str], str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    One record per article from its clause chunks (pass the full corpus):
+    `text_for_embedding` is the title plus the first sentence of each clause
+    (bounded by summary_chars), `text` the full article, `metadata` the
+    article fields with flags OR-ed over its clauses.
+
+    A clause of an article may appear anywhere in the stream, so every
+    record waits for the end of it. One pass keeps per article only its
+    fields, flags, summary and clause ids; with `load_text` (chunk id ->
+    original_text, random access into the corpus) the article text is
+    re-read while the records are yielded instead of being held.
+    """
+    articles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for chunk in chunks:
+        meta = chunk.get("metadata", {})
+        key = article_key(meta)
+        article = articles.get(key)
+        if article is None:
+            article = articles[key] = {
+                "metadata": {
+                    "article_key": key,
+                    "source_id": str(meta.get("source_id", "")),
+                    "doc_name": meta.get("doc_name", ""),
+                    "doc_type": meta.get("doc_type", ""),
+                    "status": meta.get("status", ""),
+                    "chapter": meta.get("chapter", ""),
+                    "article": meta.get("article", ""),
+                    "article_title": meta.get("article_title", ""),
+                    "clause_count": 0,
+                    "is_boilerplate": True,
+                    **{keyword_flag(k): False for k in INDEXED_KEYWORDS},
+                },
+                "summary": "",
+                "summary_full": False,
+                "clauses": [],
+            }
+        metadata = article["metadata"]
+        flags = build_chunk_metadata(chunk)
+        metadata["clause_count"] += 1
+        metadata["is_boilerplate"] = metadata["is_boilerplate"] and flags["is_boilerplate"]
+        for keyword in INDEXED_KEYWORDS:
+            flag = keyword_flag(keyword)
+            metadata[flag] = metadata[flag] or flags[flag]
+
+        text = chunk.get("original_text", "")
+        if not article["summary_full"]:
+            sentence = _first_sentence(text)
+            if len(article["summary"]) + len(sentence) > summary_chars:
+                article["summary_full"] = True
+            else:
+                article["summary"] += sentence + " "
+        article["clauses"].append(chunk["id"] if load_text is not None else text)
+
+    for key, article in articles.items():
+        metadata = article["metadata"]
+        header = f"Luật: {metadata['doc_name']}. {metadata['chapter']}. {metadata['article']}: {metadata['article_title']}."
+        clauses = article["clauses"]
+        yield {
+            "id": key,
+            "text_for_embedding": f"{header} {article['summary'].strip()}".strip(),
+            "text": "\n".join(load_text(c) for c in clauses) if load_text is not None else "\n".join(clauses),
+            "metadata": metadata,
+        }
+
+
+def build_article_records(chunks: List[Dict[str, Any]], summary_chars: int = 800) -> List[Dict[str, Any]]:
+    """iter_article_records for an in-memory chunk list."""
+    return list(iter_article_records(chunks, summary_chars))
+
+
+def query_keyword_flags(query: str) -> List[str]:
+    """Keyword flags a query must match (keyword gating)."""
+    q = query.lower()
+    return [keyword_flag(k) for k in INDEXED_KEYWORDS if k in q]
@@ -0,0 +1,108 @@
+"""
+Optional cross-encoder rerank stage for legal retrieval (LEGAL_RERANK_ENABLED).
+
+Retrieval over-fetches LEGAL_RERANK_CANDIDATES chunks; a local CPU
+cross-encoder scores every (query, chunk) pair in one `predict` call and
+the best top_k are kept. Scores are cached per (query hash, chunk id) and
+dropped whenever the legal index changes.
+
+The stage is skipped (retrieval order kept) when the time already spent
+plus the expected scoring cost of the uncached pairs would exceed the
+search's latency budget. The cost per pair is a moving average of
+observed batches.
+"""
+import hashlib
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import SearchCache, make_cache_key, normalize_query
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Smoothing of the per-pair cost estimate
+COST_EWMA_ALPHA = 0.3
+
+# (query hash, chunk id) -> score; bumped with the legal search cache
+score_cache = SearchCache("legal_rerank", settings.LEGAL_RERANK_CACHE_SIZE, settings.SEARCH_CACHE_TTL_SECONDS)
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+
+
+class LegalReranker:
+    def __init__(self, model_name: str, max_length: int = 512):
+        from sentence_transformers import CrossEncoder
+        logger.info(f"Loading rerank model: {model_name}")
+        self.model_name = model_name
+        self._model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+        self.ms_per_pair: Optional[float] = None
+
+    def estimate_ms(self, pairs: int) -> float:
+        """Expected scoring time; 0 until a batch has been timed."""
+        return (self.ms_per_pair or 0.0) * pairs
+
+    def rerank(
+        self,
+        query: str,
+        hits: List[Dict[str, Any]],
+        top_k: int,
+        budget_ms: Optional[float] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        `hits` re-sorted by cross-encoder score (`rerank_score` added), cut to
+        top_k. Returns None when scoring would not fit in `budget_ms`.
+        """
+        qh = query_hash(query)
+        version = score_cache.version
+        scores: Dict[str, float] = {}
+        pending = []
+        for hit in hits:
+            cached = score_cache.get(make_cache_key(q=qh, id=hit["id"]))
+            if cached is None:
+                pending.append(hit)
+            else:
+                scores[hit["id"]] = cached
+
+        if pending:
+            if budget_ms is not None and self.estimate_ms(len(pending)) > budget_ms:
+                logger.info(f"Rerank skipped: {len(pending)} pairs ~{self.estimate_ms(len(pending)):.0f}ms > {budget_ms:.0f}ms left")
+                return None
+            started = time.perf_counter()
+            predicted = self._model.predict(
+                [(query, hit["text"]) for hit in pending],
+                batch_size=max(len(pending), 1),
+                show_progress_bar=False,
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            per_pair = elapsed / len(pending)
+            self.ms_per_pair = per_pair if self.ms_per_pair is None else (
+                COST_EWMA_ALPHA * per_pair + (1 - COST_EWMA_ALPHA) * self.ms_per_pair
+            )
+            for hit, score in zip(pending, predicted):
+                scores[hit["id"]] = float(score)
+                score_cache.set(make_cache_key(q=qh, id=hit["id"]), float(score), version)
+
+        ranked = sorted(hits, key=lambda hit: -scores[hit["id"]])[:top_k]
+        return [{**hit, "rerank_score": scores[hit["id"]]} for hit in ranked]
+
+
+_reranker: Optional[LegalReranker] = None
+_load_failed = False
+
+
+def get_legal_reranker() -> Optional[LegalReranker]:
+    """Shared cross-encoder, or None when reranking is disabled or the model failed to load."""
+    global _reranker, _load_failed
+    if not settings.LEGAL_RERANK_ENABLED or _load_failed:
+        return None
+    if _reranker is None:
+        try:
+            _reranker = LegalReranker(settings.LEGAL_RERANK_MODEL)
+        except Exception as e:
+            logger.error(f"Rerank model unavailable, reranking disabled: {e}")
+            _load_failed = True
+            return None
+    return _reranker
@@ -1,24 +1,114 @@
 
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
 from pathlib import Path
 import chromadb
-from sentence_transformers import SentenceTransformer
 from app.core.config import settings
+from app.core.embeddings import encode_texts_cached, get_encoder
+from app.core.cache import SearchCache, make_cache_key, normalize_query
+from app.core.embedding_cache import changed_positions, get_embedding_cache, text_hash
+from app.core.parallel_embedding import Throughput, iter_encoded
+from app.legal_ingest.corpus import IngestCheckpoint, corpus_stamp, corpus_version
+from app.services.index_registry import IndexRegistry
+from app.services.mmap_vector_store import open_search_index
+from app.services.legal_indexing import (
+    LEGAL_SCHEMA_KEY,
+    LEGAL_SCHEMA_VERSION,
+    SHARD_PREFIX,
+    ARTICLE_COLLECTION,
+    iter_article_records,
+    build_chunk_metadata,
+    chunk_document,
+    is_boilerplate,
+    query_keyword_flags,
+    shard_collection_name,
+)
+from app.services.legal_citation_index import get_legal_citation_index
+from app.services.legal_bm25 import LegalBM25Index, bm25_path, load_bm25_index
+from app.services.legal_reranker import get_legal_reranker, score_cache as rerank_score_cache
 
 logger = logging.getLogger(__name__)
 
+WARMUP_QUERIES = ["thuế thu nhập cá nhân", "người đại diện theo pháp luật"]
+
+# Formatted results per (query, filters, top_k); bumped on ingestion and reload
+search_cache = SearchCache("legal_search", settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL_SECONDS)
+# Questions (query + filters) retrieval could not answer: empty or gated by the abstention check
+negative_cache = SearchCache("legal_negative", settings.NEGATIVE_CACHE_SIZE, settings.NEGATIVE_CACHE_TTL_SECONDS)
+
+_corpus_version: Optional[Tuple[str, str]] = None  # (corpus_stamp, corpus_version)
+
+def _invalidate_caches():
+    """Legal index changed: drop cached results and rerank scores."""
+    global _corpus_version
+    search_cache.bump_version()
+    negative_cache.bump_version()
+    rerank_score_cache.bump_version()
+    _corpus_version = None
+
+def served_corpus_version() -> str:
+    """
+    Served snapshot + chunk corpus checksum: persistent answers are only
+    valid for this value. Checked on every call (a stat of the corpus
+    manifest), so a corpus rewritten by another process is noticed; the
+    checksum itself is only re-read when the stat changes.
+    """
+    global _corpus_version
+    stamp = corpus_stamp()
+    if _corpus_version is None or _corpus_version[0] != stamp:
+        _corpus_version = (stamp, corpus_version())
+    return f"{legal_index.stats()['version']}:{_corpus_version[1]}"
+
+# Chunk filters that also exist on article records
+ARTICLE_FILTER_FIELDS = {"doc_type", "status", "source_id", "doc_name", "is_boilerplate"}
+
+def _condition(field: str, value: Any) -> Dict[str, Any]:
+    """Chroma condition for one where_clause entry: scalars become $eq, operator dicts and $and/$or pass through."""
+    if field.startswith("$") or (isinstance(value, dict) and value and all(k.startswith("$") for k in value)):
+        return {field: value}
+    return {field: {"$eq": value}}
+
+def _and(conditions: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+# Parallel fan-out over per-law shards (Chroma queries release the GIL)
+_shard_pool = ThreadPoolExecutor(max_workers=settings.LEGAL_SHARD_WORKERS, thread_name_prefix="legal-shard")
+
 class LegalVectorService:
     """Service to manage legal documents in ChromaDB"""
     
-    def __init__(self):
-        self.chroma_path = Path(settings.CHROMA_LEGAL_DIR)
+    def __init__(self, path: Optional[str] = None):
+        self.chroma_path = Path(path or settings.CHROMA_LEGAL_DIR)
         self._client = chromadb.PersistentClient(path=str(self.chroma_path))
         self._collection = self._client.get_or_create_collection(
             "legal_documents",
             metadata={"description": "Vietnamese legal documents"}
         )
-        self._model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        self._search_index = open_search_index(str(self.chroma_path), self._collection, settings.VECTOR_BACKEND)
+        self._shards = self._open_shards()
+        self._load_articles()
+        self._lexical = load_bm25_index(str(self.chroma_path))
+        self._model = get_encoder()
+
+    def _open_shards(self) -> Dict[str, Any]:
+        """source_id -> search index of each per-law shard collection."""
+        shards = {}
+        for entry in self._client.list_collections():
+            name = getattr(entry, "name", entry)
+            if not name.startswith(SHARD_PREFIX):
+                continue
+            collection = self._client.get_collection(name)
+            source_id = (collection.metadata or {}).get("source_id", name[len(SHARD_PREFIX):])
+            shards[str(source_id)] = open_search_index(str(self.chroma_path), collection, settings.VECTOR_BACKEND)
+        if shards:
+            logger.info(f"Legal shards: {sorted(shards)}")
+        return shards
         
     def search(
         self,
@@ -26,8 +116,17 @@ class LegalVectorService:
         top_k: int = 5,
         filters: Optional[Dict[str, Any]] = None,
         doc_type: Optional[str] = None,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        latency_budget_ms: Optional[float] = None
     ) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        cache_key = make_cache_key(
+            q=normalize_query(query), top_k=top_k, filters=filters, doc_type=doc_type, status=status
+        )
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        version = search_cache.version
         
         # Add E5 prefix for consistent retrieval
         query_text = f"query: {query}"
@@ -38,13 +137,212 @@ class LegalVectorService:
         if doc_type: where_clause["doc_type"] = doc_type
         if filters: where_clause.update(filters)
         
+        # Over-fetch candidates for the optional cross-encoder stage
+        reranker = get_legal_reranker()
+        fetch_k = max(top_k, settings.LEGAL_RERANK_CANDIDATES) if reranker else top_k
+        if self.flags_indexed:
+            formatted_results = self._search_flagged(query, query_embedding, where_clause, fetch_k)
+        else:
+            formatted_results = self._search_legacy(query, query_embedding, where_clause, fetch_k)
+        
+        if reranker and len(formatted_results) > 1:
+            budget = settings.LEGAL_RERANK_BUDGET_MS if latency_budget_ms is None else latency_budget_ms
+            reranked = reranker.rerank(
+                query, formatted_results, top_k,
+                budget_ms=budget - (time.perf_counter() - started) * 1000
+            )
+            if reranked is None:
+                # Retrieval order only: serve it, but don't cache it
+                return self._with_coverage(query, formatted_results[:top_k])
+            formatted_results = reranked
+        formatted_results = self._with_coverage(query, formatted_results[:top_k])
+        
+        if formatted_results:
+            search_cache.set(cache_key, formatted_results, version)
+        return formatted_results
+
+    def _with_coverage(self, query: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Annotate hits with lexical_coverage (abstention signal) when the BM25 index is loaded."""
+        if self._lexical is not None and results:
+            coverage = self._lexical.coverage(query, [r["id"] for r in results])
+            for result, value in zip(results, coverage):
+                result["lexical_coverage"] = value
+        return results
+
+    @property
+    def flags_indexed(self) -> bool:
+        """Collection was ingested with is_boilerplate / kw_* metadata."""
+        meta = self._collection.metadata or {}
+        return int(meta.get(LEGAL_SCHEMA_KEY, 0)) >= LEGAL_SCHEMA_VERSION
+
+    def _search_flagged(self, query, query_embedding, where_clause, top_k) -> List[Dict[str, Any]]:
+        """
+        Noise and keyword gating pushed down as filters. With the BM25 index
+        loaded, vector and lexical top-LEGAL_HYBRID_DEPTH are merged by RRF.
+        """
+        conditions = [_condition(k, v) for k, v in where_clause.items()]
+        conditions.append({"is_boilerplate": {"$eq": False}})
+        conditions += [{flag: {"$eq": True}} for flag in query_keyword_flags(query)]
+        
+        source_id = get_legal_citation_index().resolve_law(query)
+        hybrid = self._lexical is not None and settings.LEGAL_HYBRID_SEARCH
+        depth = max(top_k, settings.LEGAL_HYBRID_DEPTH) if hybrid else top_k
+
+        vector_hits = self._search_vectors(query_embedding, conditions, source_id, depth)
+        if not hybrid:
+            return vector_hits
+        lexical_conditions = list(conditions)
+        if source_id in self._shards:
+            lexical_conditions.append({"source_id": {"$eq": source_id}})
+        lexical_hits = self._lexical.search(query, depth, lexical_conditions)
+        if lexical_hits is None:
+            return vector_hits[:top_k]
+        return self._fuse(vector_hits, lexical_hits, top_k)
+
+    def _search_vectors(self, query_embedding, conditions, source_id, top_k) -> List[Dict[str, Any]]:
+        shard = self._shards.get(source_id)
+        if shard is not None:
+            logger.info(f"Legal search routed to shard {source_id}")
+
+        # Chunks live in the law shards only; the main collection serves unsharded (legacy) stores
+        indexes = [shard] if shard is not None else list(self._shards.values()) or [self._search_index]
+
+        # Two-stage: candidate articles, then clauses inside them only
+        if self._article_index is not None and settings.LEGAL_HIERARCHICAL_SEARCH:
+            keys = self._candidate_articles(query_embedding, conditions, source_id)
+            if keys:
+                conditions = conditions + [{"article_key": {"$in": keys}}]
+                if shard is None and self._shards:
+                    # Only the shards of the laws the candidate articles belong to
+                    sources = {key.split(":", 1)[0] or "unknown" for key in keys}
+                    indexes = [self._shards[s] for s in sorted(sources) if s in self._shards] or indexes
+
+        if len(indexes) == 1:
+            return self._query_chunks(indexes[0], query_embedding, conditions, top_k)
+        # Several laws: query their shards in parallel, merge by distance
+        merged = [
+            hit for hits in _shard_pool.map(
+                lambda index: self._query_chunks(index, query_embedding, conditions, top_k), indexes
+            )
+            for hit in hits
+        ]
+        merged.sort(key=lambda hit: hit["distance"])
+        return merged[:top_k]
+
+    def _fuse(self, vector_hits, lexical_hits, top_k) -> List[Dict[str, Any]]:
+        """
+        Reciprocal rank fusion: score = sum of 1 / (LEGAL_RRF_K + rank).
+        Lexical-only hits are fetched by id and carry distance None.
+        """
+        k = settings.LEGAL_RRF_K
+        scores: Dict[str, float] = defaultdict(float)
+        for rank, hit in enumerate(vector_hits):
+            scores[hit["id"]] += 1.0 / (k + rank + 1)
+        for rank, (chunk_id, _) in enumerate(lexical_hits):
+            scores[chunk_id] += 1.0 / (k + rank + 1)
+        ranked = sorted(scores, key=lambda i: -scores[i])[:top_k]
+
+        by_id = {hit["id"]: hit for hit in vector_hits}
+        missing = [i for i in ranked if i not in by_id]
+        for collection, ids in self._chunk_locations(missing):
+            fetched = collection.get(ids=ids, include=["documents", "metadatas"])
+            for i, text, meta in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+                by_id[i] = {"id": i, "text": text, "metadata": meta, "distance": None}
+        return [{**by_id[i], "rrf_score": scores[i]} for i in ranked if i in by_id]
+
+    def _chunk_locations(self, chunk_ids: List[str]) -> List[Tuple[Any, List[str]]]:
+        """(collection, ids) holding each chunk: its law shard (source_id from the BM25 columns)."""
+        if not chunk_ids:
+            return []
+        if not self._shards:
+            return [(self._collection, chunk_ids)]
+        by_source = defaultdict(list)
+        for chunk_id, source_id in zip(chunk_ids, self._lexical.column_values("source_id", chunk_ids)):
+            by_source[source_id or "unknown"].append(chunk_id)
+        return [
+            (self._client.get_collection(shard_collection_name(source_id)), ids)
+            for source_id, ids in by_source.items() if source_id in self._shards
+        ]
+
+    def _candidate_articles(self, query_embedding, conditions, source_id) -> List[str]:
+        """Stage 1: article_keys of the best-matching articles."""
+        article_conditions = [
+            c for c in conditions
+            if next(iter(c)) in ARTICLE_FILTER_FIELDS or next(iter(c)).startswith("kw_")
+        ]
+        if source_id in self._article_sources:
+            article_conditions.append({"source_id": {"$eq": source_id}})
+        results = self._article_index.query(
+            query_embeddings=[query_embedding],
+            n_results=settings.LEGAL_ARTICLE_CANDIDATES,
+            where=_and(article_conditions),
+            include=["metadatas"]
+        )
+        return list(results["ids"][0]) if results["ids"] else []
+
+    def _query_chunks(self, index, query_embedding, conditions, top_k) -> List[Dict[str, Any]]:
+        results = index.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k,
+            where=_and(conditions),
+            include=["documents", "metadatas", "distances"]
+        )
+        if not results["ids"]:
+            return []
+        return [
+            {
+                "id": results["ids"][0][i],
+                "text": results["documents"][0][i],
+                "metadata": results["metadatas"][0][i],
+                "distance": results["distances"][0][i]
+            }
+            for i in range(len(results["ids"][0]))
+        ]
+
+    # --- Parent articles (in-memory) ---
+
+    def _load_articles(self):
+        """Article-level index plus article_key -> full text/metadata store."""
+        self._article_index = None
+        self._parents: Dict[str, Dict[str, Any]] = {}
+        self._article_sources = set()
+        names = {getattr(c, "name", c) for c in self._client.list_collections()}
+        if ARTICLE_COLLECTION not in names:
+            return
+        collection = self._client.get_collection(ARTICLE_COLLECTION)
+        stored = collection.get(include=["documents", "metadatas"])
+        for key, text, meta in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+            self._parents[key] = {"text": text, "metadata": meta}
+            self._article_sources.add(str(meta.get("source_id", "")))
+        self._article_index = open_search_index(str(self.chroma_path), collection, settings.VECTOR_BACKEND)
+        logger.info(f"Legal article level: {len(self._parents)} articles")
+
+    def parent_article(self, key: str) -> Optional[Dict[str, Any]]:
+        """Full article for an article_key (no vector query)."""
+        return self._parents.get(key)
+
+    def widen_to_articles(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace clause hits by their parent articles (deduplicated, best distance first)."""
+        widened, seen = [], set()
+        for r in results:
+            key = r["metadata"].get("article_key")
+            parent = self._parents.get(key)
+            if parent is None:
+                widened.append(r)
+            elif key not in seen:
+                seen.add(key)
+                widened.append({"id": key, "text": parent["text"], "metadata": parent["metadata"], "distance": r["distance"]})
+        return widened
+
+    def _search_legacy(self, query, query_embedding, where_clause, top_k) -> List[Dict[str, Any]]:
+        """Collections without index-time flags: over-fetch and filter in Python."""
         # Fetch more to allow filtering (Aggressive to handle noise)
         fetch_k = max(20, top_k * 6)
         
-        results = self._collection.query(
+        results = self._search_index.query(
             query_embeddings=[query_embedding],
             n_results=fetch_k,
-            where=where_clause if where_clause else None,
+            where=_and([_condition(k, v) for k, v in where_clause.items()]),
             include=["documents", "metadatas", "distances"]
         )
         
@@ -59,15 +357,7 @@ class LegalVectorService:
                 doc_text = results["documents"][0][i]
                 
                 # NOISE FILTERING
-                chapter = str(metadata.get("chapter", "")).lower()
-                article = str(metadata.get("article", "")).lower()
-                article_title = str(metadata.get("article_title", "")).lower()
-                
-                # Skip noise patterns (expanded to check article too)
-                if "dẫn nhập" in article or "phần mở đầu" in chapter:
-                    continue
-                if ("hiệu lực thi hành" in article_title or "điều khoản thi hành" in article_title
-                    or "hiệu lực thi hành" in article or "điều khoản thi hành" in article):
+                if is_boilerplate(metadata):
                     continue
                 
                 # Keyword gating for warranty queries
@@ -89,10 +379,319 @@ class LegalVectorService:
         
         return formatted_results
 
-_legal_vector_service = None
+    # --- Ingestion ---
+
+    def embed_chunks(self, chunks: List[Dict[str, Any]], batch_size: int = 32) -> List[Dict[str, Any]]:
+        """Attach an `embedding` to each chunk (encoded from text_for_embedding)."""
+        texts = [chunk_document(c) for c in chunks]
+        embeddings, stats = encode_texts_cached(texts, batch_size=batch_size, encoder=self._model)
+        logger.info(f"Embedded {len(texts)} chunks ({stats['encoded']} encoded, {stats['hits']} from cache)")
+        return [{**c, "embedding": e} for c, e in zip(chunks, embeddings)]
+
+    def upsert_chunks(self, chunks: List[Dict[str, Any]], batch_size: int = 100) -> int:
+        """Write embedded chunks with index-time flags to their law shards, then mark the schema."""
+        # Per-law shards, created on first use
+        by_source = defaultdict(list)
+        for c in chunks:
+            by_source[str(c.get("metadata", {}).get("source_id") or "unknown")].append(c)
+        for source_id, shard_chunks in by_source.items():
+            shard = self._shard_collection(source_id, shard_chunks[0])
+            for start in range(0, len(shard_chunks), batch_size):
+                batch = shard_chunks[start:start + batch_size]
+                shard.upsert(
+                    ids=[c["id"] for c in batch],
+                    embeddings=[c["embedding"] for c in batch],
+                    documents=[chunk_document(c) for c in batch],
+                    metadatas=[build_chunk_metadata(c) for c in batch]
+                )
+        logger.info(f"Upserted {len(chunks)} chunks into {len(by_source)} law shards")
+        
+        # Chunks left in the main collection were ingested without flags; they keep the legacy path
+        if self._collection.count() == 0 or self.flags_indexed:
+            self._mark_flagged()
+        else:
+            logger.warning("Collection holds chunks ingested without flags; keeping legacy search. Re-run with --clear.")
+        self._shards = self._open_shards()
+        _invalidate_caches()
+        return len(chunks)
+
+    def sync_chunks(
+        self,
+        chunks: List[Dict[str, Any]],
+        embedding_batch_size: Optional[int] = None,
+        batch_size: int = 100,
+        workers: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Make the law shards match the FULL corpus `chunks`:
+        only new or changed chunks are embedded (through the embedding cache)
+        and upserted, chunks no longer in the corpus are deleted.
+        
+        Embeddings stream in as batches finish (in-process, or a pool of
+        `workers` encoder processes); this process is the only writer.
+        embedding_batch_size=None sizes batches from text length.
+        """
+        return self.sync_chunk_stream(
+            chunks, embedding_batch_size=embedding_batch_size, batch_size=batch_size, workers=workers
+        )
+
+    def sync_chunk_stream(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        embedding_batch_size: Optional[int] = None,
+        batch_size: int = 100,
+        workers: Optional[int] = None,
+        window: Optional[int] = None,
+        checkpoint: Optional[IngestCheckpoint] = None
+    ) -> Dict[str, int]:
+        """
+        sync_chunks over a stream of the FULL corpus, `window` chunks at a
+        time: memory is bounded by the window plus the set of corpus ids
+        (needed to delete chunks that left the corpus at the end).
+        
+        With a checkpoint, the position after each finished window is saved;
+        a re-run of the same corpus skips those chunks (only their ids are
+        collected) and the checkpoint is cleared once the sync completes.
+        """
+        window = window or settings.LEGAL_INGEST_WINDOW
+        start = checkpoint.load() if checkpoint else 0
+        if start:
+            logger.info(f"Resuming chunk sync after {start} chunks (checkpoint {checkpoint.path})")
+        started = time.perf_counter()
+        totals = {"changed": 0, "encoded": 0, "cache_hits": 0}
+        seen = defaultdict(set)  # source_id -> corpus ids
+        first_chunks: Dict[str, Dict[str, Any]] = {}
+        pending: List[Dict[str, Any]] = []
+        position = 0
+
+        def flush():
+            result = self._sync_window(pending, embedding_batch_size, batch_size, workers)
+            for key in totals:
+                totals[key] += result[key]
+            pending.clear()
+            if checkpoint:
+                checkpoint.save(position)
+
+        for chunk in chunks:
+            source_id = str(chunk.get("metadata", {}).get("source_id") or "unknown")
+            seen[source_id].add(chunk["id"])
+            first_chunks.setdefault(source_id, chunk)
+            position += 1
+            if position <= start:
+                continue
+            pending.append(chunk)
+            if len(pending) >= window:
+                flush()
+        if pending:
+            flush()
+
+        # Chunks, then shards of laws, that left the corpus
+        deleted = 0
+        for source_id, ids in seen.items():
+            deleted += self._delete_missing(self._shard_collection(source_id, first_chunks[source_id]), ids)
+        wanted = {shard_collection_name(source_id) for source_id in seen}
+        for entry in self._client.list_collections():
+            name = getattr(entry, "name", entry)
+            if name.startswith(SHARD_PREFIX) and name not in wanted:
+                deleted += self._client.get_collection(name).count()
+                self._client.delete_collection(name)
+        # Stores built before sharding kept every chunk in the main collection too
+        moved = self._delete_missing(self._collection, set())
+        if moved:
+            logger.info(f"Dropped {moved} chunk copies from the main collection (served from the law shards)")
+
+        self._mark_flagged()
+        self._shards = self._open_shards()
+        _invalidate_caches()
+        if checkpoint:
+            checkpoint.clear()
+        result = {
+            "chunks": position,
+            "resumed_at": start,
+            **totals,
+            "deleted": deleted,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        logger.info(f"Synced chunks: {result}")
+        return result
+
+    def _sync_window(
+        self,
+        chunks: List[Dict[str, Any]],
+        embedding_batch_size: Optional[int],
+        batch_size: int,
+        workers: Optional[int]
+    ) -> Dict[str, int]:
+        """Embed and upsert the new or changed chunks of one window into their law shards."""
+        ids = [c["id"] for c in chunks]
+        documents = [chunk_document(c) for c in chunks]
+        metadatas = [build_chunk_metadata(c) for c in chunks]
+
+        by_source = defaultdict(list)
+        for n, c in enumerate(chunks):
+            by_source[str(c.get("metadata", {}).get("source_id") or "unknown")].append(n)
+        targets = [
+            (self._shard_collection(source_id, chunks[rows[0]]), rows) for source_id, rows in by_source.items()
+        ]
+
+        plans, to_embed = [], set()
+        for collection, rows in targets:
+            changed = changed_positions(
+                collection, [ids[n] for n in rows], [documents[n] for n in rows], [metadatas[n] for n in rows]
+            )
+            plans.append((collection, {rows[n] for n in changed}))
+            to_embed.update(rows[n] for n in changed)
+
+        order = sorted(to_embed)
+        progress = Throughput(len(order))
+        for positions, vectors, encoded in iter_encoded(
+            [documents[n] for n in order],
+            encoder=self._model,
+            cache=get_embedding_cache(),
+            workers=workers or settings.EMBEDDING_WORKERS,
+            batch_size=embedding_batch_size,
+        ):
+            rows = [order[p] for p in positions]
+            for collection, changed in plans:
+                mine = [(n, v) for n, v in zip(rows, vectors) if n in changed]
+                for start in range(0, len(mine), batch_size):
+                    batch = mine[start:start + batch_size]
+                    collection.upsert(
+                        ids=[ids[n] for n, _ in batch],
+                        embeddings=[v for _, v in batch],
+                        documents=[documents[n] for n, _ in batch],
+                        metadatas=[metadatas[n] for n, _ in batch]
+                    )
+            logger.info(progress.add(len(positions), encoded))
+        return {"changed": len(order), "encoded": progress.encoded, "cache_hits": progress.done - progress.encoded}
+
+    @staticmethod
+    def _delete_missing(collection, keep: set) -> int:
+        stale = [i for i in collection.get(include=[])["ids"] if i not in keep]
+        for start in range(0, len(stale), 1000):
+            collection.delete(ids=stale[start:start + 1000])
+        return len(stale)
+
+    def _shard_collection(self, source_id: str, first_chunk: Dict[str, Any]):
+        return self._client.get_or_create_collection(
+            shard_collection_name(source_id),
+            metadata={
+                "source_id": source_id,
+                "doc_name": first_chunk.get("metadata", {}).get("doc_name", ""),
+                LEGAL_SCHEMA_KEY: LEGAL_SCHEMA_VERSION
+            }
+        )
+
+    def _mark_flagged(self):
+        meta = {k: v for k, v in (self._collection.metadata or {}).items() if not k.startswith("hnsw:")}
+        self._collection.modify(metadata={**meta, LEGAL_SCHEMA_KEY: LEGAL_SCHEMA_VERSION})
+
+    def upsert_articles(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        batch_size: int = 100,
+        load_text: Optional[Callable[[str], str]] = None,
+        window: Optional[int] = None
+    ) -> int:
+        """
+        Rebuild the article level from a stream of the FULL chunk corpus (not
+        a partial batch), `window` articles at a time. With `load_text`
+        article texts are re-read by chunk id (see iter_article_records).
+        """
+        window = window or settings.LEGAL_INGEST_WINDOW
+        collection = self._client.get_or_create_collection(
+            ARTICLE_COLLECTION,
+            metadata={"description": "Article-level legal index", LEGAL_SCHEMA_KEY: LEGAL_SCHEMA_VERSION}
+        )
+        keys, upserted = set(), 0
+        records = iter_article_records(chunks, summary_chars=settings.LEGAL_ARTICLE_SUMMARY_CHARS, load_text=load_text)
+        while True:
+            batch_records = list(islice(records, window))
+            if not batch_records:
+                break
+            for r in batch_records:
+                # The vector comes from the summary, which the stored document doesn't show
+                r["metadata"]["summary_hash"] = text_hash(r["text_for_embedding"])[:16]
+                keys.add(r["id"])
+            changed = [batch_records[n] for n in changed_positions(
+                collection, [r["id"] for r in batch_records], [r["text"] for r in batch_records],
+                [r["metadata"] for r in batch_records]
+            )]
+            embeddings, _ = encode_texts_cached([r["text_for_embedding"] for r in changed], encoder=self._model)
+            for start in range(0, len(changed), batch_size):
+                batch = changed[start:start + batch_size]
+                collection.upsert(
+                    ids=[r["id"] for r in batch],
+                    embeddings=embeddings[start:start + batch_size],
+                    documents=[r["text"] for r in batch],
+                    metadatas=[r["metadata"] for r in batch]
+                )
+            upserted += len(changed)
+        stale = self._delete_missing(collection, keys)
+        logger.info(f"Articles: {upserted}/{len(keys)} upserted, {stale} stale removed")
+        self._load_articles()
+        _invalidate_caches()
+        return len(keys)
+
+    def build_lexical_index(self, chunks: Iterable[Dict[str, Any]]) -> int:
+        """Rebuild the BM25 index from a stream of the FULL chunk corpus (one pass) and serve it."""
+        index = LegalBM25Index.build(chunks)
+        index.save(bm25_path(str(self.chroma_path)))
+        self._lexical = index
+        _invalidate_caches()
+        logger.info(f"Built BM25 index: {len(index)} chunks, {len(index.vocab)} terms")
+        return len(index)
+
+    def clear(self) -> int:
+        """Delete every chunk and drop the per-law shards. Returns chunks deleted."""
+        deleted = self._delete_missing(self._collection, set())
+        for entry in self._client.list_collections():
+            name = getattr(entry, "name", entry)
+            if name.startswith(SHARD_PREFIX):
+                deleted += self._client.get_collection(name).count()
+            if name.startswith(SHARD_PREFIX) or name == ARTICLE_COLLECTION:
+                self._client.delete_collection(name)
+        self._shards = {}
+        self._load_articles()
+        bm25_path(str(self.chroma_path)).unlink(missing_ok=True)
+        self._lexical = None
+        _invalidate_caches()
+        return deleted
+
+    def get_collection_stats(self) -> Dict[str, Any]:
+        return {
+            "total_chunks": self._collection.count() + sum(
+                self._client.get_collection(shard_collection_name(source_id)).count() for source_id in self._shards
+            ),
+            "collection": self._collection.name,
+            "path": str(self.chroma_path),
+            "flags_indexed": self.flags_indexed,
+            "shards": sorted(self._shards),
+            "articles": len(self._parents),
+            "bm25_chunks": len(self._lexical) if self._lexical is not None else 0
+        }
+
+    def close(self):
+        """Drop Chroma handles of a retired snapshot."""
+        self._search_index = None
+        self._shards = {}
+        self._article_index = None
+        self._parents = {}
+        self._lexical = None
+        self._collection = None
+        self._client = None
+
+def _warmup(service: LegalVectorService):
+    for q in WARMUP_QUERIES:
+        service.search(q, top_k=3)
+
+legal_index = IndexRegistry(
+    "legal",
+    settings.CHROMA_LEGAL_DIR,
+    factory=lambda path: LegalVectorService(path=path),
+    warmup=_warmup,
+    on_swap=_invalidate_caches
+)
 
 def get_legal_vector_service():
-    global _legal_vector_service
-    if _legal_vector_service is None:
-        _legal_vector_service = LegalVectorService()
-    return _legal_vector_service
+    return legal_index.current()
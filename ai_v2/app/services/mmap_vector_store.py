@@ -0,0 +1,436 @@
+"""
+Read-only memory-mapped vector store.
+
+A Chroma collection is exported once to a directory of flat files:
+
+    manifest.json            count, dim, dtype, distance space, column schema
+    vectors.npy              (count, dim) float32, float16 or int8
+    scales.npy               int8 only: per-row dequantization scale
+    vectors.f32.npy          quantized dtypes only: float32 originals
+    norms.npy                squared L2 norm per row of the originals
+    ids.bin / ids.off.npy    UTF-8 blob + int64 offsets
+    documents.bin / ...off   same layout
+    meta.<key>.npy           numeric / bool metadata column (NaN = missing)
+    meta.<key>.codes.npy     low-cardinality string column: int32 codes
+                             (-1 = missing), values listed in the manifest
+    meta.<key>.bin / .off    other string columns
+
+Every array is opened with `np.load(mmap_mode="r")`, so N uvicorn workers
+share one copy through the OS page cache. Files are never rewritten in
+place (truncating a mapped file kills its readers with SIGBUS): an export
+is written to a fresh directory and renamed over the previous one, whose
+files stay readable by open stores until they are reopened. `query()` mirrors
+`collection.query()` (same `where` operators and result layout), so a
+service can swap the store in for the Chroma collection when searching.
+
+Quantized exports search in two stages: an approximate scan over the
+compressed matrix picks `n_results * rescore_factor` candidates, which are
+then rescored exactly against the float32 originals. Only those candidate
+rows of `vectors.f32.npy` are read, so the originals stay mostly on disk.
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+MMAP_DIRNAME = "mmap"
+FORMAT_VERSION = 1
+# String columns with few distinct values (absolute and relative to row count)
+# are dictionary-encoded; the dictionary lives in the manifest
+MAX_CATEGORY_VALUES = 1024
+MAX_CATEGORY_RATIO = 0.5
+EXPORT_BATCH = 1000
+SCAN_BLOCK = 8192
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+
+def mmap_store_path(base_dir: str, collection_name: str) -> Path:
+    """Export location inside a Chroma (snapshot) directory."""
+    return Path(base_dir) / MMAP_DIRNAME / collection_name
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _write_strings(out_dir: Path, stem: str, values: Sequence[str]):
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    (out_dir / f"{stem}.bin").write_bytes(b"".join(encoded))
+    np.save(out_dir / f"{stem}.off.npy", offsets)
+
+
+def _column_kind(values: List[Any]) -> str:
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, bool) for v in present):
+        return "bool"
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return "number"
+    distinct = len(set(map(str, present)))
+    if distinct <= MAX_CATEGORY_VALUES and distinct <= MAX_CATEGORY_RATIO * len(present):
+        return "category"
+    return "string"
+
+
+def _replace_dir(new_dir: Path, out_dir: Path):
+    """Move `new_dir` to `out_dir`; the previous export is unlinked, not truncated."""
+    old_dir = out_dir.with_name(f".{out_dir.name}.old-{os.getpid()}-{time.time_ns()}")
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(new_dir, out_dir)
+    # Stores that mapped the old files keep their pages until they are closed
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def export_collection(collection, out_dir: Path, dtype: str = "float32") -> Dict[str, Any]:
+    """
+    Dump a Chroma collection (vectors, documents, metadata) to `out_dir`,
+    built in a sibling temp directory and swapped in when complete.
+    """
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unsupported vector dtype: {dtype}")
+    out_dir = Path(out_dir)
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = out_dir.with_name(f".{out_dir.name}.tmp-{os.getpid()}-{time.time_ns()}")
+    try:
+        manifest = _write_export(collection, tmp_dir, dtype)
+        _replace_dir(tmp_dir, out_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    logger.info(f"Exported {manifest['count']} vectors of '{collection.name}' to {out_dir} ({dtype})")
+    return manifest
+
+
+def _write_export(collection, out_dir: Path, dtype: str) -> Dict[str, Any]:
+
+    ids, documents, metadatas, vectors = [], [], [], []
+    total = collection.count()
+    for offset in range(0, total, EXPORT_BATCH):
+        batch = collection.get(
+            limit=EXPORT_BATCH, offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        ids.extend(batch["ids"])
+        documents.extend(batch["documents"] or [""] * len(batch["ids"]))
+        metadatas.extend(m or {} for m in batch["metadatas"])
+        vectors.extend(batch["embeddings"])
+
+    out_dir.mkdir(parents=True)
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+    if dtype == "int8":
+        # Symmetric per-row scalar quantization
+        scales = np.abs(matrix).max(axis=1) / 127.0 if len(ids) else np.zeros(0, np.float32)
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        np.save(out_dir / "vectors.npy", quantized)
+        np.save(out_dir / "scales.npy", scales)
+    else:
+        np.save(out_dir / "vectors.npy", matrix.astype(dtype))
+    if dtype != "float32":
+        np.save(out_dir / "vectors.f32.npy", matrix)
+    np.save(out_dir / "norms.npy", np.einsum("ij,ij->i", matrix, matrix))
+    _write_strings(out_dir, "ids", ids)
+    _write_strings(out_dir, "documents", documents)
+
+    columns: Dict[str, Dict[str, Any]] = {}
+    keys = sorted({k for m in metadatas for k in m})
+    for key in keys:
+        values = [m.get(key) for m in metadatas]
+        kind = _column_kind(values)
+        spec: Dict[str, Any] = {"kind": kind}
+        if kind in ("number", "bool"):
+            is_int = kind == "bool" or all(isinstance(v, int) for v in values if v is not None)
+            spec["int"] = is_int
+            column = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+            np.save(out_dir / f"meta.{key}.npy", column)
+        elif kind == "category":
+            categories = sorted({str(v) for v in values if v is not None})
+            lookup = {v: i for i, v in enumerate(categories)}
+            codes = np.array([-1 if v is None else lookup[str(v)] for v in values], dtype=np.int32)
+            np.save(out_dir / f"meta.{key}.codes.npy", codes)
+            spec["values"] = categories
+        else:
+            _write_strings(out_dir, f"meta.{key}", [None if v is None else str(v) for v in values])
+        columns[key] = spec
+
+    space = (getattr(collection, "metadata", None) or {}).get("hnsw:space", "l2")
+    manifest = {
+        "format": FORMAT_VERSION,
+        "collection": collection.name,
+        "count": len(ids),
+        "dim": int(matrix.shape[1]) if len(ids) else 0,
+        "dtype": dtype,
+        "space": space,
+        "columns": columns,
+    }
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return manifest
+
+
+# ---------------------------------------------------------------------------
+# Read side
+# ---------------------------------------------------------------------------
+
+def _top_k(dist: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k smallest distances, sorted ascending."""
+    top = np.argpartition(dist, k - 1)[:k] if k < len(dist) else np.arange(len(dist))
+    return top[np.argsort(dist[top], kind="stable")]
+
+
+class _StringColumn:
+    """UTF-8 blob + offsets, decoded per row on access."""
+
+    def __init__(self, out_dir: Path, stem: str):
+        blob_path = out_dir / f"{stem}.bin"
+        self._offsets = np.load(out_dir / f"{stem}.off.npy", mmap_mode="r")
+        size = blob_path.stat().st_size
+        self._blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if size else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def all(self) -> np.ndarray:
+        return np.array([self[i] for i in range(len(self))], dtype=object)
+
+
+class MmapVectorStore:
+    """Brute-force search over a memory-mapped export (see module docstring)."""
+
+    def __init__(self, path: Path, rescore_factor: int = 4):
+        self.path = Path(path)
+        self.rescore_factor = max(1, rescore_factor)
+        self.manifest = json.loads((self.path / "manifest.json").read_text(encoding="utf-8"))
+        if self.manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported mmap store format in {self.path}")
+        self.name = self.manifest["collection"]
+        self.space = self.manifest["space"]
+        self._vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self._norms = np.load(self.path / "norms.npy", mmap_mode="r")
+        # The manifest, not whichever files happen to exist, says how vectors are stored
+        dtype = self.manifest["dtype"]
+        if dtype not in VECTOR_DTYPES or self._vectors.dtype != np.dtype(dtype):
+            raise ValueError(f"mmap store {self.path}: vectors.npy is {self._vectors.dtype}, manifest says {dtype}")
+        self._scales = np.load(self.path / "scales.npy", mmap_mode="r") if dtype == "int8" else None
+        self._originals = np.load(self.path / "vectors.f32.npy", mmap_mode="r") if dtype != "float32" else None
+        self._ids = _StringColumn(self.path, "ids")
+        self._documents = _StringColumn(self.path, "documents")
+        self._columns: Dict[str, Any] = {}
+        for key, spec in self.manifest["columns"].items():
+            if spec["kind"] in ("number", "bool"):
+                self._columns[key] = np.load(self.path / f"meta.{key}.npy", mmap_mode="r")
+            elif spec["kind"] == "category":
+                self._columns[key] = np.load(self.path / f"meta.{key}.codes.npy", mmap_mode="r")
+            else:
+                self._columns[key] = _StringColumn(self.path, f"meta.{key}")
+        self._decoded: Dict[str, np.ndarray] = {}
+        self._id_rows: Optional[Dict[str, int]] = None
+        self._manifest_inode = (self.path / "manifest.json").stat().st_ino
+
+    def count(self) -> int:
+        return self.manifest["count"]
+
+    def superseded(self) -> bool:
+        """A newer export has been swapped into this store's directory."""
+        try:
+            return (self.path / "manifest.json").stat().st_ino != self._manifest_inode
+        except FileNotFoundError:
+            # Mid-swap: keep serving the mapped export
+            return False
+
+    # -- metadata ---------------------------------------------------------
+
+    def _metadata(self, row: int) -> Dict[str, Any]:
+        meta = {}
+        for key, spec in self.manifest["columns"].items():
+            column = self._columns[key]
+            if spec["kind"] in ("number", "bool"):
+                value = column[row]
+                if np.isnan(value):
+                    continue
+                if spec["kind"] == "bool":
+                    meta[key] = bool(value)
+                else:
+                    meta[key] = int(value) if spec["int"] else float(value)
+            elif spec["kind"] == "category":
+                code = int(column[row])
+                if code >= 0:
+                    meta[key] = spec["values"][code]
+            else:
+                meta[key] = column[row]
+        return meta
+
+    def _compare(self, key: str, op: str, operand: Any) -> np.ndarray:
+        n = self.count()
+        spec = self.manifest["columns"].get(key)
+        if spec is None:
+            # Chroma semantics: a missing key only satisfies negative operators
+            return np.full(n, op in ("$ne", "$nin"))
+
+        if spec["kind"] == "category":
+            codes = np.asarray(self._columns[key])
+            lookup = {v: i for i, v in enumerate(spec["values"])}
+            if op in ("$eq", "$ne"):
+                hit = codes == lookup.get(str(operand), -2)
+                return hit if op == "$eq" else (codes >= 0) & ~hit
+            if op in ("$in", "$nin"):
+                wanted = [lookup[str(v)] for v in operand if str(v) in lookup]
+                hit = np.isin(codes, wanted)
+                return hit if op == "$in" else (codes >= 0) & ~hit
+            raise ValueError(f"Operator {op} not supported on string field '{key}'")
+
+        if spec["kind"] == "string":
+            if key not in self._decoded:
+                self._decoded[key] = self._columns[key].all()
+            values = self._decoded[key]
+            if op == "$eq":
+                return values == str(operand)
+            if op == "$ne":
+                return values != str(operand)
+            if op in ("$in", "$nin"):
+                hit = np.isin(values, [str(v) for v in operand])
+                return hit if op == "$in" else ~hit
+            raise ValueError(f"Operator {op} not supported on string field '{key}'")
+
+        values = np.asarray(self._columns[key])
+        present = ~np.isnan(values)
+        if op == "$eq":
+            return values == float(operand)
+        if op == "$ne":
+            return present & (values != float(operand))
+        if op == "$gt":
+            return values > float(operand)
+        if op == "$gte":
+            return values >= float(operand)
+        if op == "$lt":
+            return values < float(operand)
+        if op == "$lte":
+            return values <= float(operand)
+        if op in ("$in", "$nin"):
+            hit = np.isin(values, [float(v) for v in operand])
+            return hit if op == "$in" else present & ~hit
+        raise ValueError(f"Unsupported where operator: {op}")
+
+    def _mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Evaluate a Chroma `where` clause to a boolean row mask."""
+        if not where:
+            return None
+        mask = np.ones(self.count(), dtype=bool)
+        for key, cond in where.items():
+            if key == "$and":
+                for sub in cond:
+                    mask &= self._mask(sub)
+            elif key == "$or":
+                any_mask = np.zeros(self.count(), dtype=bool)
+                for sub in cond:
+                    any_mask |= self._mask(sub)
+                mask &= any_mask
+            elif isinstance(cond, dict):
+                for op, operand in cond.items():
+                    mask &= self._compare(key, op, operand)
+            else:
+                mask &= self._compare(key, "$eq", cond)
+        return mask
+
+    # -- search -----------------------------------------------------------
+
+    def _dots(self, vectors: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        if vectors.dtype == np.float32:
+            return vectors @ query
+        # Upcast compressed rows in bounded blocks: no full-size float32 copy
+        dots = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), SCAN_BLOCK):
+            block = np.asarray(vectors[start:start + SCAN_BLOCK], dtype=np.float32)
+            dots[start:start + SCAN_BLOCK] = block @ query
+        if scales is not None:
+            dots *= scales
+        return dots
+
+    def _distances(self, query: np.ndarray, rows: Optional[np.ndarray], exact: bool = False) -> np.ndarray:
+        source = self._originals if exact and self._originals is not None else self._vectors
+        scales = None if source is self._originals else self._scales
+        vectors = source if rows is None else source[rows]
+        if scales is not None and rows is not None:
+            scales = scales[rows]
+        norms = self._norms if rows is None else self._norms[rows]
+        dots = self._dots(vectors, scales, query)
+        if self.space == "ip":
+            return 1.0 - dots
+        if self.space == "cosine":
+            denom = np.sqrt(np.maximum(norms, 1e-12)) * max(float(np.linalg.norm(query)), 1e-12)
+            return 1.0 - dots / denom
+        return np.maximum(norms + float(query @ query) - 2.0 * dots, 0.0)
+
+    def query(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Sequence[str] = ("documents", "metadatas", "distances"),
+    ) -> Dict[str, Any]:
+        """Same call and result shape as `chromadb.Collection.query`."""
+        mask = self._mask(where)
+        rows = np.flatnonzero(mask) if mask is not None else None
+
+        out: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for q in np.asarray(query_embeddings, dtype=np.float32):
+            candidates = self.count() if rows is None else len(rows)
+            k = min(n_results, candidates)
+            if k <= 0:
+                for field in out:
+                    out[field].append([])
+                continue
+            dist = self._distances(q, rows)
+            hits = rows if rows is not None else np.arange(len(dist))
+            if self._originals is not None:
+                # Stage 1 shortlist over compressed vectors, stage 2 exact rescoring
+                shortlist = _top_k(dist, k * self.rescore_factor)
+                hits = hits[shortlist]
+                dist = self._distances(q, hits, exact=True)
+            top = _top_k(dist, k)
+            hits = hits[top]
+            out["ids"].append([self._ids[int(r)] for r in hits])
+            out["distances"].append([float(d) for d in dist[top]])
+            out["documents"].append([self._documents[int(r)] for r in hits] if "documents" in include else None)
+            out["metadatas"].append([self._metadata(int(r)) for r in hits] if "metadatas" in include else None)
+        return out
+
+    def get_by_ids(self, ids: Sequence[str]) -> Dict[str, Any]:
+        """Documents and metadata for known ids (missing ids are skipped)."""
+        if self._id_rows is None:
+            self._id_rows = {self._ids[i]: i for i in range(self.count())}
+        rows = [self._id_rows[i] for i in ids if i in self._id_rows]
+        return {
+            "ids": [self._ids[r] for r in rows],
+            "documents": [self._documents[r] for r in rows],
+            "metadatas": [self._metadata(r) for r in rows],
+        }
+
+
+def open_search_index(base_dir: str, collection, backend: str):
+    """
+    Object to run `.query()` against: the mmap export when `backend` is
+    "mmap" and an export exists for this snapshot, else the Chroma collection.
+    """
+    if backend != "mmap":
+        return collection
+    path = mmap_store_path(base_dir, collection.name)
+    if not (path / "manifest.json").exists():
+        logger.warning(f"VECTOR_BACKEND=mmap but no export at {path}; serving from ChromaDB")
+        return collection
+    store = MmapVectorStore(path, rescore_factor=settings.VECTOR_RESCORE_FACTOR)
+    logger.info(f"Serving '{collection.name}' from mmap store ({store.count()} vectors, {store.manifest['dtype']})")
+    return store
@@ -0,0 +1,106 @@
+"""
+Personal income tax (PIT) on monthly salaries, 2025 rule estimate.
+
+Pure numpy, no I/O: compute_pit works on whole arrays of salaries, so one
+employee (calculate_pit tool) and a full payroll (POST /api/v2/tax/pit/batch)
+go through the same arithmetic.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# --- PIT tables (monthly VND) ---
+BASE_SALARY = 1800000
+REGION_MIN_WAGE = 4680000 # Region I
+SELF_DEDUCTION = 11000000
+DEPENDENT_DEDUCTION = 4400000
+# Employee insurance: (rate, salary cap) - BHXH/BHYT capped at 20x base salary, BHTN at 20x regional minimum
+INSURANCE_RATES = {
+    "bhxh": (0.08, 20 * BASE_SALARY),
+    "bhyt": (0.015, 20 * BASE_SALARY),
+    "bhtn": (0.01, 20 * REGION_MIN_WAGE),
+}
+# Progressive brackets on taxable income: (upper bound, rate); None = no upper bound
+PIT_BRACKETS = [
+    (5000000, 0.05),
+    (10000000, 0.10),
+    (18000000, 0.15),
+    (32000000, 0.20),
+    (52000000, 0.25),
+    (80000000, 0.30),
+    (None, 0.35),
+]
+
+def _bracket_table(brackets):
+    """(upper bounds of all but the last bracket, lower bound, rate, tax due at the lower bound) arrays."""
+    uppers = np.array([upper for upper, _ in brackets[:-1]], dtype=np.float64)
+    lowers = np.concatenate([[0.0], uppers])
+    rates = np.array([rate for _, rate in brackets], dtype=np.float64)
+    base_tax = np.concatenate([[0.0], np.cumsum(np.diff(lowers) * rates[:-1])])
+    return uppers, lowers, rates, base_tax
+
+_PIT_TABLE = _bracket_table(PIT_BRACKETS)
+
+def compute_pit(gross_salary, dependents) -> Dict[str, np.ndarray]:
+    """Vectorized PIT over arrays of gross salaries and dependent counts (no per-row Python)."""
+    gross = np.asarray(gross_salary, dtype=np.float64)
+    dependents = np.broadcast_to(np.asarray(dependents, dtype=np.float64), gross.shape)
+    insurance = {name: np.minimum(gross, cap) * rate for name, (rate, cap) in INSURANCE_RATES.items()}
+    total_insurance = sum(insurance.values())
+    
+    taxable = np.maximum(gross - SELF_DEDUCTION - dependents * DEPENDENT_DEDUCTION - total_insurance, 0.0)
+    uppers, lowers, rates, base_tax = _PIT_TABLE
+    bracket = np.searchsorted(uppers, taxable, side="left")
+    tax = np.maximum(base_tax[bracket] + (taxable - lowers[bracket]) * rates[bracket], 0.0)
+    return {
+        "gross_salary": gross,
+        "dependents": dependents,
+        **insurance,
+        "insurance": total_insurance,
+        "taxable_income": taxable,
+        "bracket": bracket + 1,
+        "pit": tax,
+        "net_salary": gross - total_insurance - tax,
+    }
+
+
+PIT_BATCH_AMOUNTS = ["gross_salary", "bhxh", "bhyt", "bhtn", "insurance", "taxable_income", "pit", "net_salary"]
+
+def pit_batch(
+    gross_salaries: List[float],
+    dependents: Optional[List[int]] = None,
+    employee_ids: Optional[List[Any]] = None
+) -> Dict[str, Any]:
+    """
+    PIT for a whole payroll in one vectorized pass: per-row results (whole VND)
+    and totals. Raises ValueError on missing/negative amounts, fractional
+    dependents or mismatched lengths.
+    """
+    gross = np.asarray(gross_salaries, dtype=np.float64)
+    deps = np.zeros(len(gross)) if dependents is None else np.asarray(dependents, dtype=np.float64)
+    if gross.ndim != 1 or deps.shape != gross.shape:
+        raise ValueError("gross_salaries and dependents must be lists of the same length")
+    if employee_ids is not None and len(employee_ids) != len(gross):
+        raise ValueError("employee_ids must have one entry per salary")
+    for name, values in (("gross_salary", gross), ("dependents", deps)):
+        bad = np.flatnonzero(~np.isfinite(values) | (values < 0))
+        if len(bad):
+            raise ValueError(f"Row {bad[0] + 1}: {name} must be a non-negative number")
+    fractional = np.flatnonzero(deps != np.floor(deps))
+    if len(fractional):
+        raise ValueError(f"Row {fractional[0] + 1}: dependents must be a whole number")
+    
+    result = compute_pit(gross, deps)
+    amounts = {name: np.round(result[name]).astype(np.int64) for name in PIT_BATCH_AMOUNTS}
+    columns = {
+        "employee_id": employee_ids if employee_ids is not None else list(range(1, len(gross) + 1)),
+        "dependents": deps.astype(np.int64).tolist(),
+        "bracket": np.where(result["taxable_income"] > 0, result["bracket"], 0).tolist(),
+        **{name: values.tolist() for name, values in amounts.items()},
+    }
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    return {
+        "count": len(rows),
+        "results": rows,
+        "totals": {name: int(values.sum()) for name, values in amounts.items()},
+    }
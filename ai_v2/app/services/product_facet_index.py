@@ -0,0 +1,155 @@
+"""
+Variant facet index for exact attribute filtering.
+
+Built from `product_variants`: one bitmap (Python int, bit = variant ordinal)
+per color / material / warranty value, plus sorted numeric columns for
+width, depth, height (converted to cm: variant rows mix mm and cm) and
+weight_capacity (kg). A filter is a handful of bitmask
+intersections; the surviving variants map to the product ids that vector
+search is allowed to rank, so filtered search needs no over-fetch.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import aiomysql
+
+from app.core.db import get_db_conn, release_conn
+from app.core.logger import get_logger
+from app.services.product_indexing import dimensions_in_cm
+
+logger = get_logger(__name__)
+
+CATEGORICAL_FACETS = ("color", "material", "warranty")
+NUMERIC_FACETS = ("width", "depth", "height", "weight_capacity")
+
+# Requested term -> extra stored spellings
+FACET_SYNONYMS = {
+    "đen": ["black"],
+    "trắng": ["white"],
+    "xám": ["grey", "gray", "ghi"],
+    "nâu": ["brown"],
+}
+
+
+def _iter_bits(bitmap: int):
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class ProductFacetIndex:
+    """Per-value variant bitmaps plus sorted numeric columns."""
+
+    def __init__(self):
+        self._variant_product: List[int] = []
+        self._values: Dict[str, Dict[str, int]] = {f: defaultdict(int) for f in CATEGORICAL_FACETS}
+        self._numeric: Dict[str, Tuple[List[float], List[int]]] = {f: ([], []) for f in NUMERIC_FACETS}
+        self._term_cache: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._variant_product)
+
+    @property
+    def all_bits(self) -> int:
+        return (1 << len(self._variant_product)) - 1
+
+    def build(self, variants: Iterable[Dict]):
+        """Rebuild from variant rows (product_id + facet columns)."""
+        fresh = ProductFacetIndex()
+        columns: Dict[str, List[Tuple[float, int]]] = {f: [] for f in NUMERIC_FACETS}
+        for ordinal, v in enumerate(variants):
+            fresh._variant_product.append(v["product_id"])
+            bit = 1 << ordinal
+            for facet in CATEGORICAL_FACETS:
+                value = (v.get(facet) or "").strip().lower()
+                if value:
+                    fresh._values[facet][value] |= bit
+            numeric = {**v, **dimensions_in_cm(v)}
+            for facet in NUMERIC_FACETS:
+                if numeric.get(facet) is not None:
+                    columns[facet].append((float(numeric[facet]), ordinal))
+        for facet, pairs in columns.items():
+            pairs.sort()
+            fresh._numeric[facet] = ([p[0] for p in pairs], [p[1] for p in pairs])
+        self.__dict__.update(fresh.__dict__)
+
+    def term_bitmap(self, facet: str, term: str) -> int:
+        """Variants whose `facet` value contains `term` (e.g. "đen" matches "Nâu-Đen")."""
+        term = term.strip().lower()
+        key = (facet, term)
+        if key not in self._term_cache:
+            needles = [term] + FACET_SYNONYMS.get(term, [])
+            bitmap = 0
+            for value, bits in self._values[facet].items():
+                if any(n in value for n in needles):
+                    bitmap |= bits
+            self._term_cache[key] = bitmap
+        return self._term_cache[key]
+
+    def range_bitmap(self, facet: str, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """Variants with low <= `facet` <= high (sizes in cm, weight_capacity in kg)."""
+        values, ordinals = self._numeric[facet]
+        start = bisect_left(values, low) if low is not None else 0
+        end = bisect_right(values, high) if high is not None else len(values)
+        bitmap = 0
+        for ordinal in ordinals[start:end]:
+            bitmap |= 1 << ordinal
+        return bitmap
+
+    def filter(
+        self,
+        terms: Optional[Dict[str, str]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> Optional[Set[int]]:
+        """
+        Product ids having at least one variant that satisfies ALL filters.
+        Returns None when no filter is given (no constraint).
+        """
+        terms = {k: v for k, v in (terms or {}).items() if v}
+        ranges = ranges or {}
+        if not terms and not ranges:
+            return None
+
+        bitmap = self.all_bits
+        for facet, term in terms.items():
+            bitmap &= self.term_bitmap(facet, term)
+            if not bitmap:
+                return set()
+        for facet, (low, high) in ranges.items():
+            bitmap &= self.range_bitmap(facet, low, high)
+            if not bitmap:
+                return set()
+        return {self._variant_product[o] for o in _iter_bits(bitmap)}
+
+
+_index: Optional[ProductFacetIndex] = None
+
+
+def get_product_facet_index() -> ProductFacetIndex:
+    global _index
+    if _index is None:
+        _index = ProductFacetIndex()
+    return _index
+
+
+async def refresh_product_facet_index() -> int:
+    """Reload facet bitmaps from active variants of active products."""
+    conn = await get_db_conn()
+    try:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute("""
+                SELECT pv.product_id, pv.color, pv.material, pv.warranty,
+                       pv.width, pv.depth, pv.height, pv.weight_capacity
+                FROM product_variants pv
+                JOIN products p ON p.id = pv.product_id
+                WHERE pv.is_active = 1 AND p.status = 'ACTIVE'
+                ORDER BY pv.product_id, pv.id
+            """)
+            rows = await cursor.fetchall()
+        get_product_facet_index().build(rows)
+        logger.info(f"Product facet index refreshed: {len(rows)} variants")
+        return len(rows)
+    finally:
+        await release_conn(conn)
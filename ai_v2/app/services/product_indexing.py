@@ -0,0 +1,245 @@
+"""
+Product indexing helpers shared by the ingestion scripts and the service.
+
+Only stable descriptive content (name, brand, category, description, specs)
+goes into the embedded text. Volatile fields (price, sale price, rating,
+stock) live in separately updatable metadata columns, so a price change or a
+new review is a metadata-only update instead of a re-embed.
+"""
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiomysql
+
+from app.core.db import get_db_conn, release_conn
+
+DIMENSION_KEYS = ("width", "depth", "height", "height_max")
+# product_variants sizes are entered in mm for some rows and cm for others;
+# no piece in the catalogue reaches 4 m, so a row whose largest size is at
+# least this many units is in mm
+MM_DIMENSION_THRESHOLD = 400
+
+
+def dimensions_in_cm(dims: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """width / depth / height / height_max of one variant, converted to cm."""
+    values = {k: float(dims[k]) if dims.get(k) is not None else None for k in DIMENSION_KEYS}
+    largest = max((v for v in values.values() if v is not None), default=0.0)
+    scale = 0.1 if largest >= MM_DIMENSION_THRESHOLD else 1.0
+    return {k: round(v * scale, 1) if v is not None else None for k, v in values.items()}
+
+
+def create_rich_text_for_product(product: dict) -> str:
+    """Create rich text for embedding (stable fields only)"""
+
+    # Basic info
+    text = f"{product['name']} - {product['brand']}\n\n"
+    text += f"Danh mục: {product['category']}\n\n"
+
+    # Description
+    if product.get('description'):
+        text += f"Mô tả:\n{product['description']}\n\n"
+
+    # Specs from first variant
+    if product.get('variants') and len(product['variants']) > 0:
+        variant = product['variants'][0]
+        text += "Thông số kỹ thuật:\n"
+
+        dims = dimensions_in_cm(variant.get('dimensions', {}))
+        if dims['width'] and dims['depth'] and dims['height']:
+            text += f"- Kích thước: {dims['width']:g}x{dims['depth']:g}x{dims['height']:g}cm"
+
+            # Infer suitable space
+            width = dims['width']
+            if width < 120:
+                text += " (Nhỏ gọn, phù hợp văn phòng nhỏ)\n"
+            elif width < 160:
+                text += " (Vừa phải, phù hợp văn phòng trung bình)\n"
+            else:
+                text += " (Rộng rãi, phù hợp văn phòng lớn)\n"
+
+        if variant.get('material'):
+            text += f"- Chất liệu: {variant['material']}\n"
+
+        if variant.get('color'):
+            text += f"- Màu sắc: {variant['color']}\n"
+
+        if variant.get('weight_capacity'):
+            text += f"- Tải trọng: {variant['weight_capacity']}kg\n"
+
+        if variant.get('warranty'):
+            text += f"- Bảo hành: {variant['warranty']}\n"
+
+    # Infer use cases from category only (price-based segments are ranked at query time)
+    category = product['category'].lower()
+    use_cases = ""
+
+    if 'bàn' in category:
+        if 'giám đốc' in category:
+            use_cases = "- Giám đốc, quản lý\n- Phòng làm việc riêng\n"
+        elif 'họp' in category:
+            use_cases = "- Phòng họp\n- Văn phòng công ty\n"
+        else:
+            use_cases = "- Nhân viên văn phòng\n- Làm việc tại nhà (WFH)\n"
+
+    elif 'ghế' in category:
+        if 'gaming' in category:
+            use_cases = "- Game thủ\n- Streamer\n- Làm việc nhiều giờ\n"
+        elif 'công thái học' in category or 'ergonomic' in category:
+            use_cases = "- Lập trình viên\n- Nhân viên văn phòng\n- Ngồi 8+ giờ/ngày\n"
+        elif 'họp' in category:
+            use_cases = "- Phòng họp\n"
+        else:
+            use_cases = "- Nhân viên văn phòng\n- Sử dụng lâu dài\n"
+
+    if use_cases:
+        text += f"\nPhù hợp:\n{use_cases}"
+
+    return text.strip()
+
+
+def build_stable_metadata(product: dict) -> Dict[str, Any]:
+    """Metadata that only changes when the embedded text changes."""
+    return {
+        "product_id": product['id'],
+        "name": product['name'],
+        "category": product['category'],
+        "brand": product['brand'],
+        "slug": product['slug'],
+    }
+
+
+def build_volatile_metadata(product: dict) -> Dict[str, Any]:
+    """
+    Price / rating / stock columns, refreshed without touching vectors.
+    `price` is the final (sale) price used by filters and ranking.
+    """
+    return {
+        "price": float(product['final_price']),
+        "list_price": float(product['price']),
+        "sale_price": float(product['sale_price']) if product.get('sale_price') else 0.0,
+        "rating": float(product.get('rating') or 0.0),
+        "review_count": int(product.get('review_count') or 0),
+        "stock": int(sum((v.get('stock') or 0) for v in product.get('variants', []))),
+    }
+
+
+def build_product_metadata(product: dict) -> Dict[str, Any]:
+    return {**build_stable_metadata(product), **build_volatile_metadata(product)}
+
+
+def product_doc_id(product_id: int) -> str:
+    return f"product_{product_id}"
+
+
+def build_volatile_updates(products: List[dict]) -> Dict[int, Dict[str, Any]]:
+    """product_id -> volatile metadata, for ProductVectorService.update_product_metadata."""
+    return {p['id']: build_volatile_metadata(p) for p in products}
+
+
+async def fetch_products_for_indexing(product_ids: Optional[List[int]] = None) -> List[dict]:
+    """
+    Load ACTIVE products in the export format (`products_for_embedding.json`).
+    product_ids=None loads the whole catalog. Ids that are missing or not
+    ACTIVE are simply absent from the result.
+    """
+    if product_ids is not None and not product_ids:
+        return []
+
+    where = "p.status = 'ACTIVE'"
+    args: tuple = ()
+    if product_ids is not None:
+        where += f" AND p.id IN ({','.join(['%s'] * len(product_ids))})"
+        args = tuple(product_ids)
+    return await _load_products(where, args)
+
+
+async def fetch_product_page(after_id: int, limit: int) -> List[dict]:
+    """Next `limit` ACTIVE products with id > after_id (keyset pagination)."""
+    return await _load_products("p.status = 'ACTIVE' AND p.id > %s", (after_id,), limit)
+
+
+async def iter_product_pages(page_size: int) -> AsyncIterator[List[dict]]:
+    """The ACTIVE catalog page by page; a DB connection is held only while a page loads."""
+    after_id = 0
+    while True:
+        page = await fetch_product_page(after_id, page_size)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after_id = page[-1]['id']
+
+
+async def _load_products(where: str, args: tuple, limit: Optional[int] = None) -> List[dict]:
+    conn = await get_db_conn()
+    try:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(f"""
+                SELECT p.id, p.name, p.slug, p.description, p.price, p.sale_price,
+                       c.name AS category, b.name AS brand, p.is_featured
+                FROM products p
+                INNER JOIN categories c ON p.category_id = c.id
+                INNER JOIN brands b ON p.brand_id = b.id
+                WHERE {where}
+                ORDER BY p.id
+            """ + (f" LIMIT {int(limit)}" if limit else ""), args)
+            rows = await cur.fetchall()
+            if not rows:
+                return []
+
+            ids = tuple(r['id'] for r in rows)
+            placeholders = ','.join(['%s'] * len(ids))
+
+            await cur.execute(f"""
+                SELECT product_id, width, depth, height, height_max,
+                       material, color, weight_capacity, warranty, stock_quantity
+                FROM product_variants
+                WHERE product_id IN ({placeholders}) AND is_active = 1
+                ORDER BY product_id, id
+            """, ids)
+            variants = defaultdict(list)
+            for v in await cur.fetchall():
+                variants[v['product_id']].append({
+                    "dimensions": {
+                        "width": v['width'],
+                        "depth": v['depth'],
+                        "height": v['height'],
+                        "height_max": v['height_max']
+                    },
+                    "material": v['material'],
+                    "color": v['color'],
+                    "weight_capacity": float(v['weight_capacity']) if v['weight_capacity'] else None,
+                    "warranty": v['warranty'],
+                    "stock": v['stock_quantity']
+                })
+
+            await cur.execute(f"""
+                SELECT product_id, AVG(rating) AS avg_rating, COUNT(*) AS review_count
+                FROM product_reviews
+                WHERE product_id IN ({placeholders}) AND is_approved = 1
+                GROUP BY product_id
+            """, ids)
+            ratings = {r['product_id']: r for r in await cur.fetchall()}
+    finally:
+        await release_conn(conn)
+
+    products = []
+    for r in rows:
+        rating = ratings.get(r['id'], {})
+        sale_price = float(r['sale_price']) if r['sale_price'] else None
+        products.append({
+            "id": r['id'],
+            "name": r['name'],
+            "slug": r['slug'],
+            "description": r['description'] or "",
+            "category": r['category'],
+            "brand": r['brand'],
+            "price": float(r['price']),
+            "sale_price": sale_price,
+            "final_price": sale_price if sale_price else float(r['price']),
+            "is_featured": bool(r['is_featured']),
+            "rating": round(float(rating['avg_rating']), 1) if rating.get('avg_rating') else 0,
+            "review_count": rating.get('review_count', 0),
+            "variants": variants.get(r['id'], [])
+        })
+    return products
@@ -0,0 +1,211 @@
+"""
+Catalog-wide product name index.
+
+Resolves model codes ("EC06", "FM-812", "ve02b gr") and product names to
+product ids with plain dict lookups, so exact-product queries skip the
+embedding model and ChromaDB entirely. Built from MySQL at startup and
+refreshed together with the catalog.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import aiomysql
+
+from app.core.db import get_db_conn, release_conn
+from app.core.logger import get_logger
+from app.core.utils import normalize_text
+
+logger = get_logger(__name__)
+
+NGRAM = 3
+FUZZY_CODE_MIN_DICE = 0.8
+NAME_MIN_CONTAINMENT = 0.85
+
+
+def _is_code(token: str) -> bool:
+    # Model codes start with letters and carry digits ("ec06", "mth05a"); units like "10tr" do not
+    return len(token) >= 3 and re.match(r"[a-z]+\d", token) is not None
+
+
+def extract_codes(text: str) -> List[str]:
+    """
+    Extract normalized model codes from free text.
+    "Eos EU03-1206" -> ["eu031206", "eu03"]; "fm 812" -> ["fm812"].
+    """
+    tokens = normalize_text(text).split()
+    codes: List[str] = []
+    for i, token in enumerate(tokens):
+        joined = token.replace("-", "")
+        if _is_code(joined):
+            codes.append(joined)
+        # Hyphenated parts: "eu03-1206" also indexes "eu03"
+        if "-" in token:
+            for part in token.split("-"):
+                if _is_code(part):
+                    codes.append(part)
+        # Split codes typed with a space: "fm 812"
+        if i + 1 < len(tokens) and token.isalpha() and len(token) <= 3:
+            nxt = tokens[i + 1].replace("-", "")
+            if nxt[:1].isdigit() and _is_code(token + nxt):
+                codes.append(token + nxt)
+    # Unique, order preserved
+    seen = set()
+    return [c for c in codes if not (c in seen or seen.add(c))]
+
+
+def _grams(text: str, n: int = NGRAM) -> Set[str]:
+    compact = f" {normalize_text(text).replace('-', ' ')} "
+    return {compact[i:i + n] for i in range(len(compact) - n + 1)}
+
+
+class ProductNameIndex:
+    """In-memory model-code dictionary plus character n-gram inverted index over product names."""
+
+    def __init__(self):
+        self._names: Dict[int, str] = {}
+        self._codes: Dict[str, Set[int]] = defaultdict(set)
+        self._code_grams: Dict[str, Set[str]] = defaultdict(set)  # bigram -> codes
+        self._name_grams: Dict[str, Set[int]] = defaultdict(set)  # trigram -> product ids
+        self._gram_counts: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def build(self, products: Iterable[Dict]):
+        """Rebuild the whole index from rows with `id` and `name`."""
+        fresh = ProductNameIndex()
+        for p in products:
+            fresh.upsert(p["id"], p.get("name") or "")
+        # Swap internals in one step so concurrent readers never see a half-built index
+        self.__dict__.update(fresh.__dict__)
+
+    def upsert(self, product_id: int, name: str):
+        if product_id in self._names:
+            self.remove(product_id)
+        self._names[product_id] = name
+        for code in extract_codes(name):
+            self._codes[code].add(product_id)
+            for i in range(len(code) - 1):
+                self._code_grams[code[i:i + 2]].add(code)
+        grams = _grams(name)
+        for g in grams:
+            self._name_grams[g].add(product_id)
+        self._gram_counts[product_id] = len(grams)
+
+    def remove(self, product_id: int):
+        name = self._names.pop(product_id, None)
+        if name is None:
+            return
+        for code in extract_codes(name):
+            ids = self._codes.get(code)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self._codes[code]
+                    self._drop_code_grams(code)
+        for g in _grams(name):
+            ids = self._name_grams.get(g)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self._name_grams[g]
+        self._gram_counts.pop(product_id, None)
+
+    def _drop_code_grams(self, code: str):
+        """Unlink a code no product carries any more from the bigram index."""
+        for i in range(len(code) - 1):
+            codes = self._code_grams.get(code[i:i + 2])
+            if codes is not None:
+                codes.discard(code)
+                if not codes:
+                    del self._code_grams[code[i:i + 2]]
+
+    def _fuzzy_code(self, code: str) -> Set[int]:
+        """Bigram Dice match for near-miss codes like "mth05" vs "mth05a"."""
+        q = {code[i:i + 2] for i in range(len(code) - 1)}
+        if not q:
+            return set()
+        shared: Dict[str, int] = defaultdict(int)
+        for g in q:
+            for cand in self._code_grams.get(g, ()):
+                shared[cand] += 1
+        best: Set[int] = set()
+        best_score = FUZZY_CODE_MIN_DICE
+        for cand, n in shared.items():
+            ids = self._codes.get(cand, ())
+            if not ids:
+                continue
+            score = 2 * n / (len(q) + len(cand) - 1)
+            if score > best_score:
+                best_score, best = score, set(ids)
+            elif score == best_score and best:
+                best |= ids
+        return best
+
+    def name_scores(self, text: str) -> Dict[int, float]:
+        """Fraction of each product name's n-grams that appear in `text`."""
+        shared: Dict[int, int] = defaultdict(int)
+        for g in _grams(text):
+            for pid in self._name_grams.get(g, ()):
+                shared[pid] += 1
+        return {pid: n / self._gram_counts[pid] for pid, n in shared.items()}
+
+    def lookup_codes(self, text: str, fuzzy: bool = True) -> List[int]:
+        """
+        Product ids whose model code appears in `text`, best name match first.
+        Returns [] when the text carries no known code.
+        """
+        ids: Set[int] = set()
+        for code in extract_codes(text):
+            if code in self._codes:
+                ids |= self._codes[code]
+        if not ids and fuzzy:
+            for code in extract_codes(text):
+                ids |= self._fuzzy_code(code)
+        if not ids:
+            return []
+        scores = self.name_scores(text)
+        return sorted(ids, key=lambda pid: (-scores.get(pid, 0.0), pid))
+
+    def lookup_name(self, text: str, min_score: float = NAME_MIN_CONTAINMENT) -> Optional[int]:
+        """Single product whose full name is (almost) contained in `text`."""
+        ranked: List[Tuple[int, float]] = sorted(
+            self.name_scores(text).items(), key=lambda kv: kv[1], reverse=True
+        )
+        if not ranked or ranked[0][1] < min_score:
+            return None
+        if len(ranked) > 1 and ranked[1][1] >= ranked[0][1]:
+            return None  # Ambiguous
+        return ranked[0][0]
+
+    def resolve(self, text: str) -> Optional[int]:
+        """Best single product id for `text` (model code first, then name)."""
+        ids = self.lookup_codes(text)
+        if ids:
+            return ids[0]
+        return self.lookup_name(text)
+
+
+_index: Optional[ProductNameIndex] = None
+
+
+def get_product_name_index() -> ProductNameIndex:
+    global _index
+    if _index is None:
+        _index = ProductNameIndex()
+    return _index
+
+
+async def refresh_product_name_index() -> int:
+    """Reload the index from the active catalog. Returns the number of products indexed."""
+    conn = await get_db_conn()
+    try:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute("SELECT id, name FROM products WHERE status = 'ACTIVE'")
+            rows = await cursor.fetchall()
+        get_product_name_index().build(rows)
+        logger.info(f"Product name index refreshed: {len(rows)} products")
+        return len(rows)
+    finally:
+        await release_conn(conn)
@@ -0,0 +1,131 @@
+"""
+Streaming product ingestion: MySQL -> rich text -> encoder -> vector store.
+
+Each stage is an asyncio task connected to the next by a bounded queue, so
+a slow stage makes the ones before it wait (backpressure) and at most
+`queue_size` batches are in flight between two stages. Blocking work (the
+Chroma diff, encoding, upserts) runs in threads; the encoder releases the
+GIL, so fetching the next page, encoding this one and writing the previous
+one overlap. Nothing is materialized for the whole catalog except the set of
+ids seen (to delete products that left it at the end).
+
+Like embed_products_to_vectordb.py, only new or changed products are encoded
+(embedding cache) and upserted.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.core.embedding_cache import changed_positions, encode_with_cache, get_embedding_cache
+from app.core.logger import get_logger
+from app.services.product_indexing import (
+    build_product_metadata,
+    create_rich_text_for_product,
+    iter_product_pages,
+    product_doc_id,
+)
+
+logger = get_logger(__name__)
+
+_DONE = object()
+
+Encode = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+async def _stage(name: str, source: asyncio.Queue, sink: Optional[asyncio.Queue], work, busy: Dict[str, float]):
+    """Apply `work` to each item of `source` until the end marker, forwarding results to `sink`."""
+    while True:
+        item = await source.get()
+        if item is _DONE:
+            if sink is not None:
+                await sink.put(_DONE)
+            return
+        started = time.perf_counter()
+        result = await work(item)
+        busy[name] += time.perf_counter() - started
+        if sink is not None and result is not None:
+            await sink.put(result)
+
+
+async def run_product_pipeline(
+    collection,
+    encode: Encode,
+    batch_size: int = 64,
+    queue_size: int = 4,
+    upsert_batch_size: int = 100,
+) -> Dict[str, Any]:
+    """
+    Sync `collection` with the ACTIVE catalog. Returns counts plus the busy
+    seconds of each stage; their sum exceeding `seconds` is the overlap.
+    """
+    pages: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    texts: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    encoded: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    cache = get_embedding_cache()
+    seen: set = set()
+    stats = {"products": 0, "changed": 0, "encoded": 0, "cache_hits": 0, "upserted": 0, "deleted": 0}
+    busy = {"fetch": 0.0, "text": 0.0, "encode": 0.0, "write": 0.0}
+    started = time.perf_counter()
+
+    async def fetch():
+        page_started = time.perf_counter()
+        async for page in iter_product_pages(batch_size):
+            busy["fetch"] += time.perf_counter() - page_started
+            await pages.put(page)
+            page_started = time.perf_counter()
+        await pages.put(_DONE)
+
+    async def to_text(page: List[dict]):
+        ids = [product_doc_id(p['id']) for p in page]
+        documents = [create_rich_text_for_product(p) for p in page]
+        metadatas = [build_product_metadata(p) for p in page]
+        seen.update(ids)
+        stats["products"] += len(page)
+        changed = await asyncio.to_thread(changed_positions, collection, ids, documents, metadatas)
+        if not changed:
+            return None
+        stats["changed"] += len(changed)
+        return [ids[n] for n in changed], [documents[n] for n in changed], [metadatas[n] for n in changed]
+
+    async def to_vectors(batch):
+        ids, documents, metadatas = batch
+        vectors, cached = await asyncio.to_thread(encode_with_cache, documents, encode, cache)
+        stats["encoded"] += cached["encoded"]
+        stats["cache_hits"] += cached["hits"]
+        return ids, vectors, documents, metadatas
+
+    async def write(batch):
+        ids, vectors, documents, metadatas = batch
+        for start in range(0, len(ids), upsert_batch_size):
+            end = start + upsert_batch_size
+            await asyncio.to_thread(
+                collection.upsert,
+                ids=ids[start:end], embeddings=vectors[start:end],
+                documents=documents[start:end], metadatas=metadatas[start:end],
+            )
+        stats["upserted"] += len(ids)
+        logger.info(f"Product pipeline: {stats['products']} read, {stats['upserted']} upserted "
+                    f"({stats['encoded']} encoded, {stats['cache_hits']} from cache)")
+
+    tasks = [
+        asyncio.create_task(fetch()),
+        asyncio.create_task(_stage("text", pages, texts, to_text, busy)),
+        asyncio.create_task(_stage("encode", texts, encoded, to_vectors, busy)),
+        asyncio.create_task(_stage("write", encoded, None, write, busy)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # A failed stage would leave the others blocked on their queues
+        for task in tasks:
+            task.cancel()
+
+    stored = await asyncio.to_thread(lambda: collection.get(include=[])["ids"])
+    stale = [i for i in stored if i not in seen]
+    if stale:
+        await asyncio.to_thread(collection.delete, ids=stale)
+    stats["deleted"] = len(stale)
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    stats["busy_seconds"] = {k: round(v, 2) for k, v in busy.items()}
+    logger.info(f"Product pipeline done: {stats}")
+    return stats
@@ -0,0 +1,196 @@
+"""
+Near-real-time product reindex queue.
+
+The Node backend posts product ids after admin edits. Requests are coalesced
+per product id (latest operation wins) and processed in debounced batches by
+one background task: only affected products are re-fetched, re-embedded with
+the shared encoder and written to ChromaDB, then the in-memory catalog
+indexes are updated in one step.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from app.core.config import settings
+from app.core.embeddings import encode_texts
+from app.core.logger import get_logger
+from app.services.product_indexing import (
+    build_product_metadata,
+    create_rich_text_for_product,
+    fetch_products_for_indexing,
+    product_doc_id,
+)
+from app.services.product_name_index import get_product_name_index
+from app.services.product_facet_index import refresh_product_facet_index
+from app.services.product_vector_service import get_product_vector_service, invalidate_search_caches, product_index
+
+logger = get_logger(__name__)
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+class ProductReindexQueue:
+    def __init__(
+        self, debounce_seconds: float, max_batch: int, retry_seconds: float = 5.0, retry_max_seconds: float = 300.0
+    ):
+        self.debounce_seconds = debounce_seconds
+        self.max_batch = max_batch
+        self.retry_seconds = retry_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._failures = 0
+        self._pending: Dict[int, str] = {}
+        self._enqueued_at: Dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "processed_total": 0,
+            "batches_total": 0,
+            "last_batch_size": 0,
+            "last_batch_seconds": 0.0,
+            "last_batch_lag_seconds": 0.0,
+            "last_processed_at": None,
+            "last_error": None,
+            "consecutive_failures": 0,
+        }
+
+    def submit(self, upsert: Iterable[int] = (), delete: Iterable[int] = ()) -> Dict[str, Any]:
+        now = time.time()
+        for pid, op in [(p, UPSERT) for p in upsert] + [(p, DELETE) for p in delete]:
+            self._pending[int(pid)] = op
+            self._enqueued_at.setdefault(int(pid), now)
+        if self._pending:
+            self._wakeup.set()
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        oldest = min(self._enqueued_at.values()) if self._enqueued_at else None
+        return {
+            "queue_depth": len(self._pending),
+            "lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            "running": bool(self._task and not self._task.done()),
+            **self._stats,
+        }
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # Debounce: let a burst of admin edits settle into one batch
+            await asyncio.sleep(self.debounce_seconds)
+            self._wakeup.clear()
+
+            while self._pending:
+                batch = dict(list(self._pending.items())[:self.max_batch])
+                enqueued = {pid: self._enqueued_at[pid] for pid in batch}
+                for pid in batch:
+                    self._pending.pop(pid, None)
+                    self._enqueued_at.pop(pid, None)
+                try:
+                    await self._process(batch, enqueued)
+                    self._failures = 0
+                except Exception as e:
+                    self._failures += 1
+                    delay = min(self.retry_seconds * 2 ** (self._failures - 1), self.retry_max_seconds)
+                    logger.error(f"Product reindex batch failed ({self._failures}x), retrying in {delay:.0f}s: {e}")
+                    self._stats["last_error"] = str(e)
+                    self._stats["consecutive_failures"] = self._failures
+                    # Requeue unless a newer request for the same id already arrived
+                    for pid, op in batch.items():
+                        if pid not in self._pending:
+                            self._pending[pid] = op
+                            self._enqueued_at[pid] = enqueued[pid]
+                    # The wakeup was consumed above: without a new submit() the
+                    # requeued batch would wait forever
+                    await asyncio.sleep(delay)
+                    self._wakeup.set()
+                    break
+
+    async def _process(self, batch: Dict[int, str], enqueued: Dict[int, float]):
+        started = time.time()
+        if get_product_vector_service() is None:
+            raise RuntimeError("Product vector service unavailable")
+        with product_index.acquire() as vector_service:
+            await self._apply(vector_service, batch)
+
+        done = time.time()
+        self._stats.update({
+            "processed_total": self._stats["processed_total"] + len(batch),
+            "batches_total": self._stats["batches_total"] + 1,
+            "last_batch_size": len(batch),
+            "last_batch_seconds": round(done - started, 3),
+            "last_batch_lag_seconds": round(done - min(enqueued.values()), 3),
+            "last_processed_at": done,
+            "last_error": None,
+            "consecutive_failures": 0,
+        })
+
+    async def _apply(self, vector_service, batch: Dict[int, str]):
+        """Write one batch into the pinned snapshot and the in-memory indexes."""
+        started = time.time()
+        upsert_ids = [pid for pid, op in batch.items() if op == UPSERT]
+        products = await fetch_products_for_indexing(upsert_ids)
+        found = {p['id'] for p in products}
+        # Upserts for products that are gone or no longer ACTIVE become deletes
+        delete_ids = [pid for pid, op in batch.items() if op == DELETE or pid not in found]
+
+        # Prepare everything before touching any store
+        documents = [create_rich_text_for_product(p) for p in products]
+        embeddings = await asyncio.to_thread(encode_texts, documents, 32, vector_service.model)
+
+        collection = vector_service.collection
+        if products:
+            await asyncio.to_thread(
+                collection.upsert,
+                ids=[product_doc_id(p['id']) for p in products],
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=[build_product_metadata(p) for p in products],
+            )
+        if delete_ids:
+            await asyncio.to_thread(collection.delete, ids=[product_doc_id(pid) for pid in delete_ids])
+        if products or delete_ids:
+            await asyncio.to_thread(vector_service.refresh_search_index)
+
+        # In-memory caches: no await between these, so requests never see a half-applied batch
+        name_index = get_product_name_index()
+        for p in products:
+            name_index.upsert(p['id'], p['name'])
+        for pid in delete_ids:
+            name_index.remove(pid)
+        invalidate_search_caches()
+
+        # Facet bitmaps are positional; rebuild them (single query) rather than patching
+        await refresh_product_facet_index()
+
+        logger.info(
+            f"Product reindex: {len(products)} upserted, {len(delete_ids)} deleted "
+            f"in {time.time() - started:.2f}s"
+        )
+
+
+_queue: Optional[ProductReindexQueue] = None
+
+
+def get_product_reindex_queue() -> ProductReindexQueue:
+    global _queue
+    if _queue is None:
+        _queue = ProductReindexQueue(
+            debounce_seconds=settings.PRODUCT_REINDEX_DEBOUNCE_SECONDS,
+            max_batch=settings.PRODUCT_REINDEX_MAX_BATCH,
+            retry_seconds=settings.PRODUCT_REINDEX_RETRY_SECONDS,
+            retry_max_seconds=settings.PRODUCT_REINDEX_RETRY_MAX_SECONDS,
+        )
+    return _queue
@@ -1,32 +1,53 @@
 
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 import logging
+import re
 from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.embeddings import get_encoder
+from app.core.cache import SearchCache, make_cache_key, normalize_query
+from app.services.product_indexing import product_doc_id
+from app.services.index_registry import IndexRegistry
+from app.services.mmap_vector_store import MmapVectorStore, export_collection, mmap_store_path, open_search_index
 
 logger = get_logger(__name__)
 
-# Singleton
-_service = None
+# Query-time price segments (formerly baked into the embedded text as "Phù hợp" buckets)
+BUDGET_PATTERN = r"(sinh viên|học sinh|giá rẻ|rẻ|tiết kiệm|bình dân|giá tốt)"
+PREMIUM_PATTERN = r"(giám đốc|cao cấp|sang trọng|quản lý|hạng sang)"
+
+WARMUP_QUERIES = ["bàn làm việc", "ghế văn phòng"]
+
+# Final ranked results per (query, filters, top_k); bumped on reindex / reload
+search_cache = SearchCache("product_search", settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL_SECONDS)
+# Searches (query + every filter) that came back empty, incl. after hydration
+negative_cache = SearchCache("product_negative", settings.NEGATIVE_CACHE_SIZE, settings.NEGATIVE_CACHE_TTL_SECONDS)
+
+def invalidate_search_caches():
+    """Product index changed: drop cached results and known-empty searches."""
+    search_cache.bump_version()
+    negative_cache.bump_version()
 
 class ProductVectorService:
-    def __init__(self):
+    def __init__(self, load_model: bool = True, path: Optional[str] = None):
         try:
-            from sentence_transformers import SentenceTransformer
             import chromadb
             
-            # Use path from settings
-            self.chroma_path = Path(settings.CHROMA_PRODUCT_DIR)
+            # Use path from settings (or a specific index snapshot)
+            self.chroma_path = Path(path or settings.CHROMA_PRODUCT_DIR)
             if not self.chroma_path.exists():
                 raise FileNotFoundError(f"ChromaDB path not found: {self.chroma_path}")
             
             self.client = chromadb.PersistentClient(path=str(self.chroma_path))
             self.collection = self.client.get_collection("product_catalog")
+            # Searches may be served from the shared mmap export; writes go to Chroma and are re-exported
+            self.search_index = open_search_index(str(self.chroma_path), self.collection, settings.VECTOR_BACKEND)
             
-            # Load model
-            logger.info(f"Loading embedding model: {settings.EMBEDDING_MODEL}")
-            self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
+            # Load model (metadata-only maintenance does not need it)
+            self.model = None
+            if load_model:
+                self.model = get_encoder()
             logger.info("ProductVectorService initialized")
             
         except Exception as e:
@@ -39,32 +60,115 @@ class ProductVectorService:
         top_k: int = 5,
         price_min: Optional[float] = None,
         price_max: Optional[float] = None,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        product_ids: Optional[List[int]] = None
     ) -> List[Dict]:
+        """
+        product_ids: restrict ranking to these products (facet pre-filter).
+        None means no restriction; an empty list means nothing can match.
+        """
         if not query.strip(): return []
+        if product_ids is not None and not product_ids: return []
+        
+        cache_key = make_cache_key(
+            q=normalize_query(query), top_k=top_k, price_min=price_min, price_max=price_max,
+            category=category, product_ids=sorted(product_ids) if product_ids is not None else None
+        )
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        version = search_cache.version
         
         try:
             # e5 prefix
             embedding = self.model.encode([f"query: {query}"], normalize_embeddings=True)
             
-            where = self._build_filter(price_min, price_max, category)
+            where = self._build_filter(price_min, price_max, category, product_ids)
+            n_results = min(top_k, len(product_ids)) if product_ids is not None else top_k
             
-            results = self.collection.query(
+            results = self._current_search_index().query(
                 query_embeddings=embedding.tolist(),
-                n_results=top_k,
+                n_results=n_results,
                 where=where
             )
             
-            return self._format_results(results)
+            ranked = self._price_aware_rerank(query, self._format_results(results))
+            if ranked:
+                search_cache.set(cache_key, ranked, version)
+            return ranked
         except Exception as e:
             logger.error(f"Search error: {e}")
             return []
 
-    def _build_filter(self, min_p, max_p, cat):
+    def _price_aware_rerank(self, query: str, products: List[Dict]) -> List[Dict]:
+        """
+        Blend vector rank with price rank when the query implies a budget or
+        premium segment. Prices come from the metadata of the searched index
+        (refreshed by reindex and metadata updates, see refresh_search_index).
+        """
+        q = query.lower()
+        if re.search(PREMIUM_PATTERN, q):
+            descending = True
+        elif re.search(BUDGET_PATTERN, q):
+            descending = False
+        else:
+            return products
+        
+        by_price = sorted(range(len(products)), key=lambda i: products[i].get('price') or 0, reverse=descending)
+        price_rank = {idx: rank for rank, idx in enumerate(by_price)}
+        weight = settings.PRODUCT_PRICE_RANK_WEIGHT
+        order = sorted(range(len(products)), key=lambda i: i + weight * price_rank[i])
+        return [products[i] for i in order]
+
+    def update_product_metadata(self, updates: Dict[int, Dict[str, Any]]) -> int:
+        """
+        Metadata-only refresh for volatile fields (price, rating, stock).
+        Vectors and documents are left untouched. Returns number of products updated.
+        """
+        if not updates:
+            return 0
+        ids = [product_doc_id(pid) for pid in updates]
+        existing = self.collection.get(ids=ids, include=["metadatas"])
+        
+        found_ids, metadatas = [], []
+        for doc_id, meta in zip(existing["ids"], existing["metadatas"]):
+            pid = (meta or {}).get("product_id")
+            if pid in updates:
+                found_ids.append(doc_id)
+                metadatas.append({**meta, **updates[pid]})
+        
+        if found_ids:
+            self.collection.update(ids=found_ids, metadatas=metadatas)
+            self.refresh_search_index()
+            invalidate_search_caches()
+        logger.info(f"Updated metadata for {len(found_ids)}/{len(ids)} products")
+        return len(found_ids)
+
+    def refresh_search_index(self):
+        """
+        Re-export the collection after a write when searches are served from
+        the mmap store (same dtype, swapped in), so upserts, deletes and new
+        prices reach search. No-op on the Chroma backend.
+        """
+        if not isinstance(self.search_index, MmapVectorStore):
+            return
+        path = mmap_store_path(str(self.chroma_path), self.collection.name)
+        export_collection(self.collection, path, dtype=self.search_index.manifest["dtype"])
+        self.search_index = MmapVectorStore(path, rescore_factor=settings.VECTOR_RESCORE_FACTOR)
+
+    def _current_search_index(self):
+        """The search index, reopened if another process swapped in a newer export."""
+        if isinstance(self.search_index, MmapVectorStore) and self.search_index.superseded():
+            logger.info(f"Reopening re-exported mmap store {self.search_index.path}")
+            self.search_index = MmapVectorStore(self.search_index.path, rescore_factor=settings.VECTOR_RESCORE_FACTOR)
+        return self.search_index
+
+    def _build_filter(self, min_p, max_p, cat, product_ids=None):
         conditions = []
         if min_p is not None: conditions.append({"price": {"$gte": min_p}})
         if max_p is not None: conditions.append({"price": {"$lte": max_p}})
         if cat: conditions.append({"category": {"$eq": cat}})
+        if product_ids is not None: conditions.append({"product_id": {"$in": list(product_ids)}})
         
         if not conditions: return None
         if len(conditions) == 1: return conditions[0]
@@ -88,11 +192,27 @@ class ProductVectorService:
             except: continue
         return products
 
+    def close(self):
+        """Drop Chroma handles of a retired snapshot."""
+        self.search_index = None
+        self.collection = None
+        self.client = None
+
+def _warmup(service: ProductVectorService):
+    for q in WARMUP_QUERIES:
+        service.search_products(q, top_k=3)
+
+product_index = IndexRegistry(
+    "product",
+    settings.CHROMA_PRODUCT_DIR,
+    factory=lambda path: ProductVectorService(path=path),
+    warmup=_warmup,
+    on_swap=invalidate_search_caches
+)
+
 def get_product_vector_service():
-    global _service
-    if _service is None:
-        try:
-            _service = ProductVectorService()
-        except:
-            return None
-    return _service
+    """Current product snapshot, or None if no index is available."""
+    try:
+        return product_index.current()
+    except Exception:
+        return None
@@ -0,0 +1,113 @@
+"""
+Retrieval confidence gate: abstain before any LLM call when the best hits
+are too far from the query.
+
+Signals per result list (`retrieval_signals`):
+
+    top_distance   smallest vector distance among the hits
+    margin         second smallest minus smallest (ambiguity between top hits)
+    top_rerank     best cross-encoder score, when the rerank stage ran
+    top_coverage   best IDF-weighted share of query terms found in a hit
+                   (LegalBM25Index.coverage; needs the lexical index)
+
+BM25-only hits carry distance None and are ignored for the distance
+signals; when no hit has a distance the gate falls back to the rerank
+score. Coverage never rejects on its own: colloquial questions share few
+terms with statutory wording, so it only counts when the top distance is
+also weak (beyond weak_distance). A signal that is missing is not judged.
+
+Thresholds are per collection and come from the calibration artifact
+written by scripts/calibrate_legal_abstention.py (RETRIEVAL_CALIBRATION_PATH)
+on top of the LEGAL_ABSTAIN_* settings (None there disables that check).
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+LEGAL_COLLECTION = "legal_documents"
+
+
+def retrieval_signals(hits: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+    distances = sorted(h["distance"] for h in hits if h.get("distance") is not None)
+    rerank = [h["rerank_score"] for h in hits if h.get("rerank_score") is not None]
+    coverage = [h["lexical_coverage"] for h in hits if h.get("lexical_coverage") is not None]
+    return {
+        "top_distance": distances[0] if distances else None,
+        "margin": distances[1] - distances[0] if len(distances) > 1 else None,
+        "top_rerank": max(rerank) if rerank else None,
+        "top_coverage": max(coverage) if coverage else None,
+    }
+
+
+def abstain_reason(signals: Dict[str, Optional[float]], limits: Dict[str, Optional[float]]) -> Optional[str]:
+    top, margin, rerank = signals["top_distance"], signals["margin"], signals["top_rerank"]
+    coverage = signals.get("top_coverage")
+    if top is not None:
+        if limits.get("max_distance") is not None and top > limits["max_distance"]:
+            return f"top distance {top:.3f} > {limits['max_distance']:.3f}"
+        if (
+            limits.get("weak_distance") is not None and top > limits["weak_distance"]
+            and limits.get("min_coverage") is not None and coverage is not None and coverage < limits["min_coverage"]
+        ):
+            return (f"weak match (top distance {top:.3f} > {limits['weak_distance']:.3f}) "
+                    f"and query term coverage {coverage:.3f} < {limits['min_coverage']:.3f}")
+        if limits.get("min_margin") is not None and margin is not None and margin < limits["min_margin"]:
+            return f"margin {margin:.3f} < {limits['min_margin']:.3f}"
+    elif rerank is not None and limits.get("min_rerank") is not None and rerank < limits["min_rerank"]:
+        # Lexical-only hits: no distance to judge by
+        return f"top rerank score {rerank:.3f} < {limits['min_rerank']:.3f}"
+    return None
+
+
+class RetrievalGate:
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.RETRIEVAL_CALIBRATION_PATH)
+        self.calibration: Dict[str, Any] = {}
+        try:
+            self.calibration = json.loads(self.path.read_text(encoding="utf-8"))
+            logger.info(f"Retrieval calibration loaded: {self.path} ({self.calibration.get('created_at')})")
+        except FileNotFoundError:
+            logger.info(f"No retrieval calibration at {self.path}; using LEGAL_ABSTAIN_* settings")
+        except (OSError, ValueError) as e:
+            logger.error(f"Unreadable retrieval calibration {self.path}: {e}")
+
+    def thresholds(self, collection: str) -> Dict[str, Optional[float]]:
+        calibrated = self.calibration.get("collections", {}).get(collection, {})
+        return {
+            "max_distance": settings.LEGAL_ABSTAIN_MAX_DISTANCE,
+            "min_margin": settings.LEGAL_ABSTAIN_MIN_MARGIN,
+            "min_rerank": settings.LEGAL_ABSTAIN_MIN_RERANK,
+            "weak_distance": settings.LEGAL_ABSTAIN_WEAK_DISTANCE,
+            "min_coverage": settings.LEGAL_ABSTAIN_MIN_COVERAGE,
+            **{k: v for k, v in calibrated.get("thresholds", {}).items() if v is not None},
+        }
+
+    def check(self, collection: str, hits: List[Dict[str, Any]]) -> Optional[str]:
+        """Why retrieval is not confident enough to answer from, or None to go ahead."""
+        if not hits:
+            return "no hits"
+        if not settings.LEGAL_ABSTAIN_ENABLED:
+            return None
+        return abstain_reason(retrieval_signals(hits), self.thresholds(collection))
+
+
+_gate: Optional[RetrievalGate] = None
+
+
+def get_retrieval_gate() -> RetrievalGate:
+    global _gate
+    if _gate is None:
+        _gate = RetrievalGate()
+    return _gate
+
+
+def reload_retrieval_gate() -> RetrievalGate:
+    """Re-read the calibration artifact (after recalibrating)."""
+    global _gate
+    _gate = RetrievalGate()
+    return _gate
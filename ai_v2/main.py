@@ -1,15 +1,30 @@
 
+import asyncio
 import uvicorn
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.logger import get_logger
 from app.core.db import init_db_pool, close_db_pool
-from app.routers import chat
+from app.routers import chat, index, tax
 from app.services.product_vector_service import get_product_vector_service
+from app.services.product_name_index import refresh_product_name_index
+from app.services.product_facet_index import refresh_product_facet_index
+from app.services.product_reindex_queue import get_product_reindex_queue
+from app.services.legal_citation_index import get_legal_citation_index
 
 logger = get_logger(__name__)
 
+async def _refresh_catalog_indexes_periodically():
+    """Keep in-memory catalog indexes in sync with MySQL."""
+    while True:
+        await asyncio.sleep(settings.PRODUCT_INDEX_REFRESH_SECONDS)
+        try:
+            await refresh_product_name_index()
+            await refresh_product_facet_index()
+        except Exception as e:
+            logger.warning(f"Catalog index refresh failed: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -22,11 +37,39 @@ async def lifespan(app: FastAPI):
         logger.info("Vector Service preloaded")
     except Exception as e:
         logger.warning(f"Vector Service preload failed: {e}")
+    
+    # Catalog name/model-code index (fast path for exact product lookups)
+    try:
+        await refresh_product_name_index()
+    except Exception as e:
+        logger.warning(f"Product name index build failed: {e}")
+    
+    # Variant facet bitmaps (color/material/size pre-filter for vector search)
+    try:
+        await refresh_product_facet_index()
+    except Exception as e:
+        logger.warning(f"Product facet index build failed: {e}")
+    
+    # Article/clause lookup for citation-style legal questions
+    try:
+        get_legal_citation_index()
+    except Exception as e:
+        logger.warning(f"Legal citation index build failed: {e}")
+    
+    refresh_task = None
+    if settings.PRODUCT_INDEX_REFRESH_SECONDS > 0:
+        refresh_task = asyncio.create_task(_refresh_catalog_indexes_periodically())
+    
+    # Background worker for admin-triggered product reindexing
+    get_product_reindex_queue().start()
         
     yield
     
     # Shutdown
     logger.info("Shutting down...")
+    if refresh_task:
+        refresh_task.cancel()
+    await get_product_reindex_queue().stop()
     await close_db_pool()
 
 app = FastAPI(title="E-commerce AI Service v2", lifespan=lifespan)
@@ -41,6 +84,8 @@ app.add_middleware(
 )
 
 app.include_router(chat.router, prefix="/api/v2")
+app.include_router(index.router, prefix="/api/v2")
+app.include_router(tax.router, prefix="/api/v2")
 
 @app.get("/health")
 def health_check():
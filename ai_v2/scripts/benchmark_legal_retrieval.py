@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark legal retrieval modes on scripts/legal_eval_queries.json:
+
+    vector   dense e5 search only (shards / article level as configured)
+    bm25     lexical index only
+    hybrid   both, merged by reciprocal rank fusion
+
+Reports recall@k (share of questions with an expected article among the
+top-k chunks) and p50 / p95 search latency. The search cache is bypassed;
+query embeddings are precomputed and their cost reported separately.
+
+    python scripts/benchmark_legal_retrieval.py --k 5 --repeat 5
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.index_registry import snapshot_path
+from app.services.legal_vector_service import LegalVectorService
+
+BASE_CONDITIONS = [{"is_boilerplate": {"$eq": False}}]
+
+
+def run_mode(search, questions: list, k: int, repeat: int) -> dict:
+    latencies, hits, misses = [], 0, []
+    for q in questions:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            keys = search(q, k)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if set(keys[:k]) & set(q["expected"]):
+            hits += 1
+        else:
+            misses.append(q["query"])
+    return {
+        "recall": hits / max(len(questions), 1),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "misses": misses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector / BM25 / hybrid legal retrieval")
+    parser.add_argument("--queries", default=str(Path(__file__).parent / "legal_eval_queries.json"))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per question")
+    parser.add_argument("--version", default=None, help="Legal snapshot (default: current)")
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        questions = json.load(f)["queries"]
+    version, path = snapshot_path(settings.CHROMA_LEGAL_DIR, args.version)
+    service = LegalVectorService(path=path)
+    if service._lexical is None:
+        print("❌ No BM25 index in this snapshot; run scripts/build_legal_bm25.py first")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    embeddings = {
+        q["query"]: e for q, e in zip(questions, service._model.encode(
+            [f"query: {q['query']}" for q in questions], normalize_embeddings=True
+        ).tolist())
+    }
+    encode_ms = (time.perf_counter() - started) * 1000 / max(len(questions), 1)
+    article_of = dict(zip(service._lexical.ids.tolist(), service._lexical.columns["article_key"].tolist()))
+
+    def dense_or_hybrid(hybrid: bool):
+        def search(q, k):
+            settings.LEGAL_HYBRID_SEARCH = hybrid
+            hits = service._search_flagged(q["query"], embeddings[q["query"]], {}, k)
+            return [h["metadata"].get("article_key") for h in hits]
+        return search
+
+    def bm25(q, k):
+        return [article_of[i] for i, _ in service._lexical.search(q["query"], k, BASE_CONDITIONS)]
+
+    configured = settings.LEGAL_HYBRID_SEARCH
+    rows = [
+        ("vector", run_mode(dense_or_hybrid(False), questions, args.k, args.repeat)),
+        ("bm25", run_mode(bm25, questions, args.k, args.repeat)),
+        ("hybrid", run_mode(dense_or_hybrid(True), questions, args.k, args.repeat)),
+    ]
+    settings.LEGAL_HYBRID_SEARCH = configured
+
+    print(f"\nSnapshot '{version}': {len(questions)} questions, k={args.k}, "
+          f"hybrid depth={settings.LEGAL_HYBRID_DEPTH}, rrf k={settings.LEGAL_RRF_K}")
+    print(f"Query embedding: {encode_ms:.2f} ms/question (not included below)\n")
+    print(f"{'mode':<10}{f'recall@{args.k}':>11}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, stats in rows:
+        print(f"{name:<10}{stats['recall']:>11.3f}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}")
+    if args.show_misses:
+        for name, stats in rows:
+            for query in stats["misses"]:
+                print(f"  [{name}] miss: {query}")
+
+
+if __name__ == "__main__":
+    main()
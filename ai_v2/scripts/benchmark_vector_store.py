@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark vector search backends: ChromaDB (HNSW) vs the mmap store in
+float32 / float16 / int8 (two-stage rescoring).
+
+For each collection the script samples real-looking queries from the
+stored metadata (article titles for legal chunks, product names and
+categories for products), computes the exact float32 top-k as ground truth
+and reports, per backend:
+
+    - vector bytes on disk scanned per query, and RSS growth after opening + querying
+    - p50 / p95 latency (vector search only, the query embedding is precomputed)
+    - recall@k against the exact top-k
+
+    python scripts/benchmark_vector_store.py --store legal --queries 200 --k 5
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.core.embeddings import get_encoder
+from app.services.index_registry import snapshot_path
+from app.services.legal_indexing import SHARD_PREFIX
+from app.services.mmap_vector_store import VECTOR_DTYPES, MmapVectorStore, export_collection
+
+STORES = {
+    "product": (settings.CHROMA_PRODUCT_DIR, "product_catalog"),
+    "legal": (settings.CHROMA_LEGAL_DIR, "legal_documents"),
+}
+
+
+def rss_bytes() -> int:
+    """Resident set size (Linux); 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * (1 << 12)
+    except OSError:
+        return 0
+
+
+def sample_queries(store: str, metadatas: list, n: int, seed: int) -> list:
+    rng = random.Random(seed)
+    texts = []
+    for meta in metadatas:
+        if store == "legal":
+            title = meta.get("article_title") or meta.get("article")
+            if title:
+                texts.append(str(title))
+        else:
+            texts.append(f"{meta.get('category', '')} {meta.get('name', '')}".strip())
+    texts = sorted(set(t for t in texts if t))
+    return rng.sample(texts, min(n, len(texts)))
+
+
+def exact_top_k(matrix: np.ndarray, queries: np.ndarray, k: int) -> list:
+    norms = np.einsum("ij,ij->i", matrix, matrix)
+    truth = []
+    for q in queries:
+        dist = norms - 2.0 * (matrix @ q)
+        truth.append(set(np.argsort(dist, kind="stable")[:k].tolist()))
+    return truth
+
+
+def run_backend(search, ids: list, queries: np.ndarray, truth: list, k: int) -> dict:
+    row_of = {doc_id: i for i, doc_id in enumerate(ids)}
+    latencies, recalls = [], []
+    for q, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = search(q, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        got = {row_of[doc_id] for doc_id in result["ids"][0]}
+        recalls.append(len(got & expected) / max(len(expected), 1))
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "recall": float(np.mean(recalls)),
+    }
+
+
+def benchmark_store(store: str, n_queries: int, k: int, seed: int):
+    base_dir, collection_name = STORES[store]
+    version, path = snapshot_path(base_dir)
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_collection(collection_name)
+    if store == "legal" and collection.count() == 0:
+        # Chunks live in the per-law shards: benchmark the largest one
+        shards = [client.get_collection(getattr(c, "name", c)) for c in client.list_collections()
+                  if getattr(c, "name", c).startswith(SHARD_PREFIX)]
+        collection = max(shards, key=lambda c: c.count())
+        print(f"Legal chunks are sharded per law; benchmarking {collection.name}")
+    everything = collection.get(include=["embeddings", "metadatas"])
+    ids = everything["ids"]
+    matrix = np.asarray(everything["embeddings"], dtype=np.float32)
+    print(f"\n=== {store} (snapshot '{version}'): {len(ids)} vectors x {matrix.shape[1]} ===")
+
+    texts = sample_queries(store, everything["metadatas"], n_queries, seed)
+    encoder = get_encoder()
+    queries = encoder.encode([f"query: {t}" for t in texts], normalize_embeddings=True).astype(np.float32)
+    truth = exact_top_k(matrix, queries, k)
+    print(f"{len(texts)} queries, k={k}, rescore factor={settings.VECTOR_RESCORE_FACTOR}")
+
+    rows = []
+    before = rss_bytes()
+    chroma_stats = run_backend(
+        lambda q, n: collection.query(query_embeddings=[q.tolist()], n_results=n, include=["distances"]),
+        ids, queries, truth, k,
+    )
+    rows.append(("chroma (hnsw)", matrix.nbytes, rss_bytes() - before, chroma_stats))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in VECTOR_DTYPES:
+            out_dir = Path(tmp) / dtype
+            export_collection(collection, out_dir, dtype=dtype)
+            before = rss_bytes()
+            mmap_store = MmapVectorStore(out_dir, rescore_factor=settings.VECTOR_RESCORE_FACTOR)
+            stats = run_backend(
+                lambda q, n: mmap_store.query([q], n_results=n, include=["distances"]),
+                ids, queries, truth, k,
+            )
+            scanned = (out_dir / "vectors.npy").stat().st_size
+            rows.append((f"mmap {dtype}", scanned, rss_bytes() - before, stats))
+            del mmap_store
+
+    print(f"\n{'backend':<16}{'vectors MB':>12}{'RSS +MB':>10}{'p50 ms':>9}{'p95 ms':>9}{f'recall@{k}':>11}")
+    for name, scanned, rss, stats in rows:
+        print(f"{name:<16}{scanned / 1e6:>12.2f}{rss / 1e6:>10.1f}{stats['p50_ms']:>9.2f}"
+              f"{stats['p95_ms']:>9.2f}{stats['recall']:>11.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector search backends")
+    parser.add_argument("--store", choices=[*STORES, "all"], default="all")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for store in (STORES if args.store == "all" else [args.store]):
+        benchmark_store(store, args.queries, args.k, args.seed)
+
+
+if __name__ == "__main__":
+    main()
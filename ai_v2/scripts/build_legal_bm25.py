@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Build the BM25 index for hybrid legal retrieval from the chunk corpus
+(no embedding, no ChromaDB access).
+
+    python scripts/build_legal_bm25.py
+    python scripts/build_legal_bm25.py --version 20250101-120000
+
+The index lands in <snapshot>/bm25/ of the legal snapshot currently served
+(or --version); POST /api/v2/index/reload {"store": "legal"} to load it.
+embed_from_json.py builds it as part of a full ingestion.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.legal_ingest.corpus import default_corpus_path, open_corpus
+from app.services.index_registry import snapshot_path
+from app.services.legal_bm25 import LegalBM25Index, bm25_path
+from app.services.legal_dedup import apply_plan, plan_for_ingestion
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the legal BM25 index")
+    parser.add_argument("--json-file", default=str(default_corpus_path()), help="Corpus directory or legacy JSON")
+    parser.add_argument("--version", default=None, help="Snapshot to write into (default: current)")
+    args = parser.parse_args()
+
+    corpus = open_corpus(args.json_file)
+    if not len(corpus):
+        print(f"❌ No chunks in {args.json_file}")
+        sys.exit(1)
+
+    # Same chunk set as the vector collections (embed_from_json dedups too); both passes streamed
+    plan = plan_for_ingestion(
+        corpus.iter_chunks(), load_text=lambda chunk_id: corpus.get(chunk_id).get("original_text", "")
+    )
+    version, path = snapshot_path(settings.CHROMA_LEGAL_DIR, args.version)
+    started = time.time()
+    index = LegalBM25Index.build(apply_plan(corpus.iter_chunks(), plan))
+    out = bm25_path(path)
+    index.save(out)
+
+    print(f"✅ BM25 (snapshot '{version}'): {len(index)} chunks, {len(index.vocab)} terms, "
+          f"{len(index.docs)} postings in {time.time() - started:.1f}s")
+    print(f"   → {out} ({out.stat().st_size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
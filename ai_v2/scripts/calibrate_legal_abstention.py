@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Calibrate the legal abstention gate on scripts/legal_eval_queries.json.
+
+Every labelled question goes through the production search path (top-k);
+"queries" whose expected article is retrieved are the ones to keep
+answering, "negatives" are the ones to abstain on. The answerable set
+mixes statutory wording with colloquial questions ("Lương 20 triệu thì
+đóng thuế bao nhiêu?"), which share few terms with the law text. For each
+signal the bound that keeps --keep of the answerable questions is found
+first (max_distance: top-hit distance; min_margin with --margin;
+min_rerank when the rerank stage ran), then moved halfway towards the
+nearest off-topic value beyond it, so the threshold sits in the gap
+between the two groups rather than on the weakest answerable question.
+
+Query term coverage (BM25 index) is calibrated only for weak vector
+matches: weak_distance is the median answerable top distance, and
+min_coverage keeps --keep of the answerable questions beyond it. The
+thresholds and the resulting keep / reject rates are written to
+RETRIEVAL_CALIBRATION_PATH, which the gate reads at start and on
+POST /api/v2/index/reload {"store": "legal"}.
+
+--lexical-only builds the BM25 index from the deduplicated corpus and
+reports how coverage alone separates the groups, without ChromaDB or the
+embedding model. It sets no threshold: with no distance, coverage is
+never judged (scripts/legal_abstention_calibration.json).
+
+    python scripts/calibrate_legal_abstention.py --keep 0.95
+    python scripts/calibrate_legal_abstention.py --lexical-only --output scripts/legal_abstention_calibration.json
+"""
+import argparse
+import json
+import math
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.legal_ingest.corpus import default_corpus_path, open_corpus
+from app.services.index_registry import snapshot_path
+from app.services.legal_bm25 import LegalBM25Index
+from app.services.legal_dedup import apply_plan, plan_for_ingestion
+from app.services.legal_indexing import build_chunk_metadata
+from app.services.retrieval_gate import LEGAL_COLLECTION, abstain_reason, retrieval_signals
+
+
+# Answerable top distances above this quantile count as weak matches
+WEAK_DISTANCE_QUANTILE = 0.5
+
+
+def keep_threshold(values: list, keep: float, upper: bool, rejected: list = ()) -> float:
+    """
+    Bound passed by `keep` of `values`: an upper bound (distances) or a
+    lower bound (margins, scores), moved halfway to the closest `rejected`
+    value beyond it.
+    """
+    ordered = sorted(values, reverse=not upper)
+    bound = ordered[max(math.ceil(keep * len(ordered)) - 1, 0)]
+    beyond = [v for v in rejected if (v > bound if upper else v < bound)]
+    if beyond:
+        nearest = min(beyond) if upper else max(beyond)
+        bound = (bound + nearest) / 2
+    return round(bound, 4)
+
+
+class LexicalSearch:
+    """BM25 over the deduplicated corpus, hits shaped like LegalVectorService.search results."""
+
+    def __init__(self, corpus_path: str):
+        corpus = open_corpus(corpus_path)
+        plan = plan_for_ingestion(
+            corpus.iter_chunks(), load_text=lambda chunk_id: corpus.get(chunk_id).get("original_text", "")
+        )
+        chunks = list(apply_plan(corpus.iter_chunks(), plan))
+        self.metadata = {chunk["id"]: build_chunk_metadata(chunk) for chunk in chunks}
+        self.index = LegalBM25Index.build(chunks)
+
+    def search(self, query: str, top_k: int):
+        ids = [chunk_id for chunk_id, _ in self.index.search(query, top_k) or []]
+        coverage = self.index.coverage(query, ids)
+        return [
+            {"id": i, "metadata": self.metadata[i], "distance": None, "lexical_coverage": c}
+            for i, c in zip(ids, coverage)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate legal retrieval abstention thresholds")
+    parser.add_argument("--queries", default=str(Path(__file__).parent / "legal_eval_queries.json"))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--keep", type=float, default=0.95, help="Share of answerable questions that must pass")
+    parser.add_argument("--margin", action="store_true", help="Also calibrate a top-1/top-2 margin threshold")
+    parser.add_argument("--version", default=None, help="Legal snapshot (default: current)")
+    parser.add_argument("--lexical-only", action="store_true",
+                        help="BM25 over the corpus only (no ChromaDB / embedding model); coverage report, no thresholds")
+    parser.add_argument("--corpus", default=None, help="Corpus for --lexical-only (default: LEGAL_CORPUS_DIR)")
+    parser.add_argument("--output", default=settings.RETRIEVAL_CALIBRATION_PATH)
+    args = parser.parse_args()
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not data.get("negatives"):
+        print("❌ No \"negatives\" in the query set; abstention needs off-topic examples")
+        sys.exit(1)
+    if args.lexical_only:
+        version = "lexical"
+        service = LexicalSearch(args.corpus or str(default_corpus_path()))
+    else:
+        # Imported here: loads the embedding model
+        from app.services.legal_vector_service import LegalVectorService
+        version, path = snapshot_path(settings.CHROMA_LEGAL_DIR, args.version)
+        service = LegalVectorService(path=path)
+
+    print(f"🔍 Searching {len(data['queries'])} answerable + {len(data['negatives'])} off-topic questions "
+          f"(snapshot '{version}', k={args.k})...")
+    answerable, missed, negatives = [], [], []
+    for q in data["queries"]:
+        hits = service.search(q["query"], top_k=args.k)
+        found = {h["metadata"].get("article_key") for h in hits} & set(q["expected"])
+        (answerable if found else missed).append(retrieval_signals(hits))
+    for q in data["negatives"]:
+        negatives.append(retrieval_signals(service.search(q["query"], top_k=args.k)))
+
+    def values(rows, name):
+        return [r[name] for r in rows if r[name] is not None]
+
+    thresholds = {
+        "max_distance": None, "min_margin": None, "min_rerank": None, "weak_distance": None, "min_coverage": None
+    }
+    for name, signal, upper in (
+        ("max_distance", "top_distance", True),
+        ("min_margin", "margin", False),
+        ("min_rerank", "top_rerank", False),
+    ):
+        if name == "min_margin" and not args.margin:
+            continue
+        if values(answerable, signal):
+            thresholds[name] = keep_threshold(
+                values(answerable, signal), args.keep, upper, rejected=values(negatives, signal)
+            )
+
+    # Coverage only counts against weak vector matches
+    if values(answerable, "top_distance"):
+        weak = keep_threshold(values(answerable, "top_distance"), WEAK_DISTANCE_QUANTILE, upper=True)
+
+        def weak_coverage(rows):
+            return [
+                r["top_coverage"] for r in rows
+                if r["top_coverage"] is not None and r["top_distance"] is not None and r["top_distance"] > weak
+            ]
+
+        if weak_coverage(answerable):
+            thresholds["weak_distance"] = weak
+            thresholds["min_coverage"] = keep_threshold(
+                weak_coverage(answerable), args.keep, upper=False, rejected=weak_coverage(negatives)
+            )
+
+    def rate(rows, accepted):
+        return sum((abstain_reason(r, thresholds) is None) == accepted for r in rows) / max(len(rows), 1)
+
+    report = {
+        "answerable": len(answerable),
+        "retrieval_misses": len(missed),
+        "negatives": len(negatives),
+        "answerable_kept": rate(answerable, True),
+        "misses_kept": rate(missed, True),
+        "negatives_rejected": rate(negatives, False),
+    }
+    for signal in ("top_distance", "top_coverage"):
+        if values(answerable, signal):
+            report[signal] = {
+                "answerable": sorted(round(v, 4) for v in values(answerable, signal)),
+                "misses": sorted(round(v, 4) for v in values(missed, signal)),
+                "negatives": sorted(round(v, 4) for v in values(negatives, signal)),
+            }
+    if args.lexical_only and values(answerable, "top_coverage"):
+        # What coverage would do as a gate of its own (why it is only judged with a distance)
+        alone = keep_threshold(values(answerable, "top_coverage"), args.keep, upper=False)
+        report["coverage_alone"] = {
+            "min_coverage": alone,
+            "answerable_kept": sum(v >= alone for v in values(answerable, "top_coverage")) / len(answerable),
+            "negatives_rejected": sum(v < alone for v in values(negatives, "top_coverage")) / max(len(negatives), 1),
+        }
+    artifact = {}
+    output = Path(args.output)
+    if output.exists():
+        artifact = json.loads(output.read_text(encoding="utf-8"))
+    artifact.setdefault("collections", {})[LEGAL_COLLECTION] = {
+        "thresholds": thresholds,
+        "keep_target": args.keep,
+        "k": args.k,
+        "snapshot": version,
+        "embedding_model": None if args.lexical_only else settings.EMBEDDING_MODEL,
+        "rerank": settings.LEGAL_RERANK_ENABLED and not args.lexical_only,
+        "queries": Path(args.queries).name,
+        "report": report,
+    }
+    artifact["created_at"] = datetime.now().isoformat()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(artifact, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"\n📏 Thresholds ({LEGAL_COLLECTION}):")
+    for name, value in thresholds.items():
+        print(f"  - {name}: {'off' if value is None else f'{value:.4f}'}")
+    print(f"\n📊 Answerable kept: {report['answerable_kept']:.1%} of {len(answerable)}"
+          f" | off-topic rejected: {report['negatives_rejected']:.1%} of {len(negatives)}"
+          f" | retrieval misses kept: {report['misses_kept']:.1%} of {len(missed)}")
+    print(f"\n💾 Saved: {output}")
+    print(f"🎯 Next: POST /api/v2/index/reload {{\"store\": \"legal\"}} (or restart) to apply")
+
+
+if __name__ == "__main__":
+    main()
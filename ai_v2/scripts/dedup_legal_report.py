@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Report what near-duplicate merging (LEGAL_DEDUP_*) does to the legal corpus,
+without touching any index:
+
+    - chunks before / after and the estimated index size (vectors + documents)
+    - canonical chunks (one per law in a cluster) with the citations they keep
+    - retrieval candidate sets on scripts/legal_eval_queries.json: BM25
+      matches per question and copies of one provision inside the top-k
+
+    python scripts/dedup_legal_report.py --threshold 0.85 --show 20
+    python scripts/dedup_legal_report.py --json-out dedup_report.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.legal_ingest.corpus import default_corpus_path, load_chunks
+from app.services.legal_bm25 import LegalBM25Index
+from app.services.legal_dedup import deduplicate_chunks
+from app.services.legal_indexing import chunk_document
+
+EMBEDDING_DIM = 384  # multilingual-e5-small
+BASE_CONDITIONS = [{"is_boilerplate": {"$eq": False}}]
+
+
+def index_bytes(chunks: list) -> int:
+    """float32 vectors plus stored documents, per collection copy."""
+    return len(chunks) * EMBEDDING_DIM * 4 + sum(len(chunk_document(c).encode("utf-8")) for c in chunks)
+
+
+def candidate_stats(chunks: list, questions: list, k: int, duplicate_of: dict) -> dict:
+    index = LegalBM25Index.build(chunks)
+    matches, copies = [], []
+    for q in questions:
+        hits = index.search(q["query"], len(index), BASE_CONDITIONS) or []
+        matches.append(len(hits))
+        top = [duplicate_of.get(i, i) for i, _ in hits[:k]]
+        copies.append(len(top) - len(set(top)))
+    return {"matches": float(np.mean(matches)), "copies": float(np.mean(copies))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate merging report for the legal corpus")
+    parser.add_argument("--json-file", default=str(default_corpus_path()), help="Corpus directory or legacy JSON")
+    parser.add_argument("--queries", default=str(Path(__file__).parent / "legal_eval_queries.json"))
+    parser.add_argument("--threshold", type=float, default=settings.LEGAL_DEDUP_THRESHOLD)
+    parser.add_argument("--num-perm", type=int, default=settings.LEGAL_DEDUP_NUM_PERM)
+    parser.add_argument("--bands", type=int, default=settings.LEGAL_DEDUP_BANDS)
+    parser.add_argument("--min-chars", type=int, default=settings.LEGAL_DEDUP_MIN_CHARS)
+    parser.add_argument("--k", type=int, default=settings.LEGAL_HYBRID_DEPTH, help="Top-k inspected for copies")
+    parser.add_argument("--show", type=int, default=10, help="Clusters to print")
+    parser.add_argument("--json-out", default=None)
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.json_file)
+    kept, report = deduplicate_chunks(
+        chunks, threshold=args.threshold, num_perm=args.num_perm, bands=args.bands, min_chars=args.min_chars
+    )
+
+    before, after = index_bytes(chunks), index_bytes(kept)
+    print(f"Threshold {args.threshold}, {args.num_perm} permutations / {args.bands} bands, "
+          f"{report['candidate_pairs']} LSH candidate pairs checked")
+    print(f"Chunks:      {len(chunks):>7} -> {len(kept):>7}  (-{report['removed']}, "
+          f"{100 * report['removed'] / max(len(chunks), 1):.1f}%)")
+    print(f"Index size:  {before / 1e6:>6.2f}MB -> {after / 1e6:>6.2f}MB  "
+          f"(-{100 * (before - after) / max(before, 1):.1f}%, vectors + documents, per collection copy)")
+    cross = sum(c["cross_law"] for c in report["clusters"])
+    print(f"Clusters:    {len(report['clusters'])} canonical chunks ({cross} also cite copies in other laws)")
+
+    questions_path = Path(args.queries)
+    if questions_path.exists():
+        with open(questions_path, "r", encoding="utf-8") as f:
+            questions = json.load(f)["queries"]
+        duplicate_of = {d: c["canonical"] for c in report["clusters"] for d in c["duplicates"]}
+        old, new = candidate_stats(chunks, questions, args.k, duplicate_of), candidate_stats(kept, questions, args.k, {})
+        print(f"\nRetrieval candidates over {len(questions)} eval questions (BM25, non-boilerplate):")
+        print(f"  matching chunks / question: {old['matches']:.1f} -> {new['matches']:.1f}")
+        print(f"  duplicate copies in top-{args.k}: {old['copies']:.2f} -> {new['copies']:.2f}")
+
+    for cluster in report["clusters"][:args.show]:
+        print(f"\n  keep {cluster['canonical']}  (drop {', '.join(cluster['duplicates']) or 'none'})")
+        for cite in cluster["citations"]:
+            print(f"    · {cite}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nReport written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,27 @@
 """
 Script để embed chunks từ JSON vào VectorDB
-Đọc từ legal_documents.json và upsert vào ChromaDB
+Đọc corpus NDJSON (LEGAL_CORPUS_DIR, hoặc legal_documents.json cũ) và upsert vào ChromaDB
+
+    python scripts/embed_from_json.py
+    python scripts/embed_from_json.py --window 500 --no-resume
+    python scripts/embed_from_json.py --snapshot 2026-10-19   # snapshots/<name>, then /index/reload
+
+Chunks được embed theo từng window; sau mỗi window vị trí được lưu vào
+<chroma_db_legal>/ingest_checkpoint.json, chạy lại sau khi bị dừng sẽ tiếp tục từ đó.
 """
 import sys
-import json
+import time
 import logging
 from pathlib import Path
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from services.legal.vector_service import LegalVectorService
+from app.core.config import settings
+from app.legal_ingest.corpus import IngestCheckpoint, default_corpus_path, open_corpus
+from app.services.index_registry import publish_snapshot, snapshot_dir
+from app.services.legal_vector_service import LegalVectorService
+from app.services.legal_dedup import apply_plan, plan_for_ingestion
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,60 +34,104 @@ def embed_from_json(
     json_file: Path,
     clear_existing: bool = False,
     batch_size: int = 100,
-    embedding_batch_size: int = 20
+    embedding_batch_size: int = None,
+    workers: int = None,
+    window: int = None,
+    resume: bool = True,
+    snapshot: str = None
 ):
     """
-    Embed chunks từ JSON vào VectorDB
+    Embed chunks từ corpus vào VectorDB
     
     Args:
-        json_file: Path to JSON file
+        json_file: Corpus directory (NDJSON) or legacy legal_documents.json
         clear_existing: If True, clear existing data before embedding
         batch_size: Batch size for ChromaDB upsert
-        embedding_batch_size: Batch size for embedding
+        embedding_batch_size: Batch size for embedding (None: sized from text length)
+        workers: Encoder processes (None: settings.EMBEDDING_WORKERS)
+        snapshot: Build into CHROMA_LEGAL_DIR/snapshots/<snapshot> and publish it (None: the base directory)
+        window: Chunks embedded per window / checkpoint (None: settings.LEGAL_INGEST_WINDOW)
+        resume: Continue from the checkpoint of an interrupted run of the same corpus
     """
-    # Load JSON
-    logger.info(f"Loading JSON from {json_file}...")
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    metadata = data.get("metadata", {})
-    chunks = data.get("chunks", [])
+    # Open corpus (streamed; legacy JSON is loaded whole)
+    logger.info(f"Opening corpus {json_file}...")
+    corpus = open_corpus(json_file)
+    metadata = corpus.manifest.get("metadata", {})
     
-    logger.info(f"Loaded {len(chunks)} chunks from JSON")
+    logger.info(f"Corpus has {len(corpus)} chunks ({corpus.manifest.get('format')})")
     logger.info(f"Metadata:")
     logger.info(f"  - Created at: {metadata.get('created_at')}")
     logger.info(f"  - Total files: {metadata.get('total_files')}")
     logger.info(f"  - Processed files: {metadata.get('processed_files')}")
     
-    if not chunks:
-        logger.error("No chunks found in JSON!")
+    if not len(corpus):
+        logger.error("No chunks found in corpus!")
         return
     
-    # Initialize vector service
-    vector_service = LegalVectorService()
+    # Merge near-duplicate provisions within a law (canonical chunk keeps every citation);
+    # one streamed pass, candidate pairs re-read by id
+    dedup_plan = plan_for_ingestion(
+        corpus.iter_chunks(), load_text=lambda chunk_id: corpus.get(chunk_id).get("original_text", "")
+    )
+    dedup_report = dedup_plan["report"]
+    logger.info(f"Dedup: {dedup_report['input_chunks']} -> {dedup_report['output_chunks']} chunks "
+                f"({dedup_report['removed']} near-duplicates dropped, {len(dedup_report['clusters'])} canonical chunks with merged citations)")
+    
+    # Initialize vector service (a snapshot is built next to the live index; the server serves the old one until reload)
+    vector_service = LegalVectorService(
+        path=str(snapshot_dir(settings.CHROMA_LEGAL_DIR, snapshot)) if snapshot else None
+    )
+    checkpoint = IngestCheckpoint(
+        vector_service.chroma_path / "ingest_checkpoint.json",
+        corpus.version,
+        params={"model": settings.EMBEDDING_MODEL, "dedup": {k: dedup_report.get(k) for k in ("threshold", "num_perm", "bands", "min_chars")}}
+    )
     
     # Clear existing data if requested
     if clear_existing:
         logger.info("⚠️  CLEARING EXISTING DATA...")
+        checkpoint.clear()
         try:
-            all_results = vector_service._collection.get()
-            if all_results["ids"]:
-                total = len(all_results["ids"])
-                vector_service._collection.delete(ids=all_results["ids"])
-                logger.info(f"✓ Deleted {total} existing chunks")
+            total = vector_service.clear()
+            if total:
+                logger.info(f"✓ Deleted {total} existing chunks (and law shards)")
             else:
                 logger.info("Collection is already empty")
         except Exception as e:
             logger.error(f"Error clearing collection: {e}")
             raise
+    elif not resume:
+        checkpoint.clear()
+    
+    # Embed new/changed chunks only (embedding cache), window by window with a checkpoint, drop removed ones
+    logger.info(f"\nSyncing {dedup_report['output_chunks']} chunks to ChromaDB...")
+    started = time.time()
+    sync = vector_service.sync_chunk_stream(
+        apply_plan(corpus.iter_chunks(), dedup_plan),
+        embedding_batch_size=embedding_batch_size,
+        batch_size=batch_size,
+        workers=workers,
+        window=window,
+        checkpoint=checkpoint
+    )
+    elapsed = time.time() - started
+    logger.info(f"✓ {sync['changed']} changed ({sync['encoded']} encoded, {sync['cache_hits']} from cache), "
+                f"{sync['deleted']} deleted in {elapsed:.1f}s ({sync['changed'] / max(elapsed, 1e-9):.1f} chunks/s)"
+                + (f", resumed after {sync['resumed_at']} chunks" if sync['resumed_at'] else ""))
     
-    # Embed chunks
-    logger.info(f"\nEmbedding {len(chunks)} chunks...")
-    embedded_chunks = vector_service.embed_chunks(chunks, batch_size=embedding_batch_size)
+    # Corpus-wide indexes (article summaries, BM25 statistics): one more streamed pass each,
+    # article texts re-read by id rather than holding the corpus
+    logger.info(f"\nBuilding article-level index...")
+    vector_service.upsert_articles(
+        apply_plan(corpus.iter_chunks(), dedup_plan),
+        batch_size=batch_size,
+        load_text=lambda chunk_id: corpus.get(chunk_id).get("original_text", ""),
+        window=window
+    )
     
-    # Upsert to ChromaDB
-    logger.info(f"\nUpserting to ChromaDB...")
-    vector_service.upsert_chunks(embedded_chunks, batch_size=batch_size)
+    # Lexical side of hybrid retrieval (BM25), also from the full corpus
+    logger.info(f"\nBuilding BM25 index...")
+    vector_service.build_lexical_index(apply_plan(corpus.iter_chunks(), dedup_plan))
     
     # Print stats
     stats = vector_service.get_collection_stats()
@@ -100,9 +155,15 @@ def embed_from_json(
             logger.info(f"  Top result:")
             logger.info(f"    Doc: {metadata.get('doc_name')}")
             logger.info(f"    Article: {metadata.get('article')}")
-            logger.info(f"    Distance: {top_result.get('distance', 0):.4f}")
+            if top_result.get("distance") is not None:
+                logger.info(f"    Distance: {top_result['distance']:.4f}")
         else:
             logger.warning(f"  No results found!")
+    
+    if snapshot:
+        publish_snapshot(settings.CHROMA_LEGAL_DIR, snapshot)
+        logger.info(f"\nPublished snapshot '{snapshot}' (CURRENT)")
+        logger.info(f"🎯 Next: POST /api/v2/index/reload {{\"store\": \"legal\"}}")
 
 
 def main():
@@ -117,14 +178,48 @@ def main():
         action="store_true",
         help="Clear existing data before embedding"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Encoder processes, each pinned to a share of the CPUs (default: EMBEDDING_WORKERS)"
+    )
+    parser.add_argument(
+        "--embedding-batch-size",
+        type=int,
+        default=None,
+        help="Fixed encode batch size (default: auto from text length, EMBEDDING_BATCH_TOKENS)"
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=None,
+        help="Chunks per embed/upsert window and checkpoint (default: LEGAL_INGEST_WINDOW)"
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore the checkpoint of an interrupted run"
+    )
+    parser.add_argument(
+        "--snapshot",
+        default=None,
+        help="Build into snapshots/<name> and publish it, for hot reload via /index/reload"
+    )
     parser.add_argument(
         "--json-file",
         type=str,
-        default="scripts/legal_documents.json",
-        help="Path to JSON file (default: scripts/legal_documents.json)"
+        default=str(default_corpus_path()),
+        help="Corpus directory or legacy JSON file (default: LEGAL_CORPUS_DIR if parsed, else scripts/legal_documents.json)"
     )
     
     args = parser.parse_args()
+    if args.snapshot:
+        try:
+            snapshot_dir(settings.CHROMA_LEGAL_DIR, args.snapshot)
+        except ValueError as e:
+            logger.error(str(e))
+            return
     
     # Get JSON file path
     script_dir = Path(__file__).parent
@@ -136,7 +231,7 @@ def main():
         json_file = Path(args.json_file)
     
     if not json_file.exists():
-        logger.error(f"JSON file not found: {json_file}")
+        logger.error(f"Corpus not found: {json_file}")
         return
     
     logger.info("="*80)
@@ -157,7 +252,11 @@ def main():
         json_file=json_file,
         clear_existing=args.clear,
         batch_size=100,
-        embedding_batch_size=20
+        embedding_batch_size=args.embedding_batch_size,
+        workers=args.workers,
+        window=args.window,
+        resume=not args.no_resume,
+        snapshot=args.snapshot
     )
     
     logger.info("\n" + "="*80)
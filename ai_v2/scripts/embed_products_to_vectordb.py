@@ -1,193 +1,207 @@
 #!/usr/bin/env python3
 """
 Embed products into VectorDB for semantic search
+
+    python scripts/embed_products_to_vectordb.py              # from products_for_embedding.json
+    python scripts/embed_products_to_vectordb.py --from-db    # streamed from MySQL, stages overlap
+    python scripts/embed_products_to_vectordb.py --metadata-only    # price/rating/stock via the running server
 """
+import argparse
 import asyncio
 import json
 import sys
+import urllib.error
+import urllib.request
 from pathlib import Path
 from sentence_transformers import SentenceTransformer
 import chromadb
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from app.core.config import settings
+from app.core.db import close_db_pool
+from app.core.embedding_cache import changed_rows, encode_with_cache, get_embedding_cache
+from app.services.index_registry import publish_snapshot, snapshot_dir, snapshot_path
+from app.services.mmap_vector_store import export_collection, mmap_store_path
+from app.services.product_pipeline import run_product_pipeline
+from app.services.product_indexing import (
+    create_rich_text_for_product,
+    build_product_metadata,
+    build_volatile_updates,
+    product_doc_id
+)
 
-def create_rich_text_for_product(product: dict) -> str:
-    """Create rich text for embedding"""
-    
-    # Basic info
-    text = f"{product['name']} - {product['brand']}\n\n"
-    text += f"Danh mục: {product['category']}\n"
-    text += f"Giá: {product['final_price']:,.0f}đ"
-    
-    if product.get('sale_price'):
-        text += f" (Giảm giá từ {product['price']:,.0f}đ)"
-    
-    text += "\n\n"
-    
-    # Description
-    if product.get('description'):
-        text += f"Mô tả:\n{product['description']}\n\n"
+
+def open_collection(snapshot: str = None):
+    """(path, product_catalog collection) of the live index or of snapshots/<snapshot>."""
+    print(f"\n🔧 Initializing ChromaDB...")
     
-    # Specs from first variant
-    if product.get('variants') and len(product['variants']) > 0:
-        variant = product['variants'][0]
-        text += "Thông số kỹ thuật:\n"
-        
-        dims = variant.get('dimensions', {})
-        if dims.get('width') and dims.get('depth') and dims.get('height'):
-            text += f"- Kích thước: {dims['width']}x{dims['depth']}x{dims['height']}cm"
-            
-            # Infer suitable space
-            width = dims['width']
-            if width < 120:
-                text += " (Nhỏ gọn, phù hợp văn phòng nhỏ)\n"
-            elif width < 160:
-                text += " (Vừa phải, phù hợp văn phòng trung bình)\n"
-            else:
-                text += " (Rộng rãi, phù hợp văn phòng lớn)\n"
-        
-        if variant.get('material'):
-            text += f"- Chất liệu: {variant['material']}\n"
-        
-        if variant.get('color'):
-            text += f"- Màu sắc: {variant['color']}\n"
-        
-        if variant.get('weight_capacity'):
-            text += f"- Tải trọng: {variant['weight_capacity']}kg\n"
-        
-        if variant.get('warranty'):
-            text += f"- Bảo hành: {variant['warranty']}\n"
-    
-    # Infer use cases based on category and price
-    text += "\nPhù hợp:\n"
-    
-    category = product['category'].lower()
-    price = product['final_price']
-    
-    if 'bàn' in category:
-        if price < 3000000:
-            text += "- Học sinh, sinh viên\n- Làm việc tại nhà (WFH)\n- Văn phòng nhỏ\n"
-        elif price < 7000000:
-            text += "- Nhân viên văn phòng\n- Freelancer\n- Văn phòng vừa và nhỏ\n"
-        else:
-            text += "- Giám đốc, quản lý\n- Văn phòng cao cấp\n- Phòng làm việc riêng\n"
-    
-    elif 'ghế' in category:
-        if 'gaming' in category:
-            text += "- Game thủ\n- Streamer\n- Làm việc nhiều giờ\n"
-        elif 'công thái học' in category or 'ergonomic' in category:
-            text += "- Lập trình viên\n- Nhân viên văn phòng\n- Ngồi 8+ giờ/ngày\n"
-        elif price < 2000000:
-            text += "- Học sinh, sinh viên\n- Văn phòng tiết kiệm\n"
-        else:
-            text += "- Nhân viên văn phòng\n- Phòng họp\n- Sử dụng lâu dài\n"
-    
-    # Rating if available
-    if product.get('rating') and product['rating'] > 0:
-        text += f"\nĐánh giá: {product['rating']}/5"
-        if product.get('review_count'):
-            text += f" ({product['review_count']} đánh giá)"
-    
-    return text.strip()
-
-
-def embed_products():
-    """Embed products into VectorDB"""
-    print("="*80)
-    print("🔄 EMBEDDING PRODUCTS TO VECTORDB")
-    print("="*80)
+    chroma_path = Path(settings.CHROMA_PRODUCT_DIR)
+    if snapshot:
+        # Build next to the live index; the server keeps serving until reload
+        chroma_path = snapshot_dir(settings.CHROMA_PRODUCT_DIR, snapshot)
+    chroma_path.mkdir(parents=True, exist_ok=True)
     
-    # 1. Load products
+    client = chromadb.PersistentClient(path=str(chroma_path))
+    collection = client.get_or_create_collection(
+        name="product_catalog",
+        metadata={"description": "Product catalog for semantic search"}
+    )
+    print(f"  ✅ product_catalog collection ready ({collection.count()} documents)")
+    return chroma_path, collection
+
+
+def lazy_encoder(show_progress_bar: bool = False):
+    """encode(texts) that loads the model on first use (not at all when nothing changed)."""
+    model = None
+    
+    def encode(texts):
+        nonlocal model
+        if model is None:
+            print(f"\n🤖 Loading embedding model...")
+            model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        return model.encode(texts, show_progress_bar=show_progress_bar).tolist()
+    
+    return encode
+
+
+def load_products() -> list:
     json_file = Path(__file__).parent / "products_for_embedding.json"
     
     if not json_file.exists():
         print(f"\n❌ Error: {json_file} not found!")
         print("Run: python scripts/export_products_for_embedding.py first")
-        return
+        return None
     
     with open(json_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
     
-    products = data['products']
-    print(f"\n📊 Loaded {len(products)} products")
+    return data['products']
+
+
+def request_metadata_refresh() -> bool:
+    """
+    Ask the running server to refresh price/rating/stock from MySQL
+    (POST /api/v2/index/products/metadata), so its search caches are
+    invalidated in the same process that serves them.
+    """
+    print("="*80)
+    print("🔄 REFRESHING PRODUCT METADATA (price, rating, stock) VIA SERVER")
+    print("="*80)
     
-    # 2. Initialize ChromaDB
-    print(f"\n🔧 Initializing ChromaDB...")
+    url = f"{settings.APP_BASE_URL.rstrip('/')}/api/v2/index/products/metadata"
+    request = urllib.request.Request(
+        url,
+        data=b"{}",
+        headers={"Content-Type": "application/json", "X-API-Key": settings.ADMIN_API_KEY or ""},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            result = json.load(response)
+    except urllib.error.HTTPError as e:
+        print(f"\n❌ {url} answered {e.code}: {e.read().decode('utf-8', 'replace')[:200]}")
+        return False
+    except urllib.error.URLError as e:
+        print(f"\n❌ Server not reachable at {url}: {e.reason}")
+        print("   Start it, or use --metadata-only --local when no server is running")
+        return False
+    print(f"\n✅ Updated metadata for {result['updated']}/{result['products']} products")
+    return True
+
+
+def refresh_product_metadata():
+    """
+    Refresh price/rating/stock metadata in this process - no model load, no
+    re-embedding. A running server keeps its cached results until
+    SEARCH_CACHE_TTL_SECONDS; use request_metadata_refresh() when one is up.
+    """
+    print("="*80)
+    print("🔄 REFRESHING PRODUCT METADATA (price, rating, stock)")
+    print("="*80)
     
-    chroma_path = Path(__file__).parent.parent / "chroma_db"
-    chroma_path.mkdir(exist_ok=True)
+    products = load_products()
+    if products is None:
+        return
     
-    client = chromadb.PersistentClient(path=str(chroma_path))
+    from app.services.product_vector_service import ProductVectorService
     
-    # Delete old collection if exists
-    try:
-        client.delete_collection("product_catalog")
-        print(f"  ✅ Deleted old product_catalog collection")
-    except:
-        pass
+    # Only the Chroma collection is needed; skip loading the embedding model.
+    # Update the snapshot currently being served.
+    _, path = snapshot_path(settings.CHROMA_PRODUCT_DIR)
+    service = ProductVectorService(load_model=False, path=path)
     
-    collection = client.create_collection(
-        name="product_catalog",
-        metadata={"description": "Product catalog for semantic search"}
-    )
+    updated = service.update_product_metadata(build_volatile_updates(products))
+    print(f"\n✅ Updated metadata for {updated}/{len(products)} products")
+    print(f"⚠️  A running server serves cached results for up to {settings.SEARCH_CACHE_TTL_SECONDS}s")
+
+
+def embed_products(snapshot: str = None):
+    """Embed products into VectorDB"""
+    print("="*80)
+    print("🔄 EMBEDDING PRODUCTS TO VECTORDB")
+    print("="*80)
+    
+    # 1. Load products
+    products = load_products()
+    if products is None:
+        return
     
-    print(f"  ✅ Created new product_catalog collection")
+    print(f"\n📊 Loaded {len(products)} products")
     
-    # 3. Load embedding model
-    print(f"\n🤖 Loading embedding model...")
-    model = SentenceTransformer("intfloat/multilingual-e5-small")
-    print(f"  ✅ Model loaded")
+    # 2. Initialize ChromaDB
+    chroma_path, collection = open_collection(snapshot)
     
-    # 4. Create embeddings
-    print(f"\n📝 Creating rich text and embeddings...")
+    # 3. Build rich texts
+    print(f"\n📝 Creating rich texts...")
     
     documents = []
     metadatas = []
     ids = []
     
     for i, product in enumerate(products):
-        # Create rich text
+        # Create rich text (stable content only; price/rating/stock are metadata)
         rich_text = create_rich_text_for_product(product)
         
         documents.append(rich_text)
-        metadatas.append({
-            "product_id": product['id'],
-            "name": product['name'],
-            "category": product['category'],
-            "brand": product['brand'],
-            "price": float(product['final_price']),
-            "slug": product['slug']
-        })
-        ids.append(f"product_{product['id']}")
-        
-        if (i + 1) % 20 == 0:
-            print(f"  ✅ Processed {i + 1}/{len(products)} products...")
+        metadatas.append(build_product_metadata(product))
+        ids.append(product_doc_id(product['id']))
     
     print(f"  ✅ Created {len(documents)} rich texts")
     
-    # 5. Generate embeddings
+    # 4. Diff against the collection: only new/changed products are written
+    changed, stale = changed_rows(collection, ids, documents, metadatas)
+    print(f"  ✅ {len(changed)} new or changed, {len(ids) - len(changed)} unchanged, {len(stale)} removed")
+    
+    # 5. Embeddings through the persistent cache (unchanged texts are not re-encoded)
+    encode = lazy_encoder(show_progress_bar=True)
+    
     print(f"\n🔢 Generating embeddings...")
-    embeddings = model.encode(documents, show_progress_bar=True)
-    print(f"  ✅ Generated {len(embeddings)} embeddings")
+    embeddings, stats = encode_with_cache([documents[n] for n in changed], encode, get_embedding_cache())
+    print(f"  ✅ {stats['encoded']} encoded, {stats['hits']} from cache")
     
-    # 6. Add to ChromaDB
-    print(f"\n💾 Adding to ChromaDB...")
+    # 6. Write changes to ChromaDB
+    print(f"\n💾 Writing to ChromaDB...")
+    if stale:
+        collection.delete(ids=stale)
+        print(f"  ✅ Deleted {len(stale)} removed products")
     
-    # Add in batches
     batch_size = 100
-    for i in range(0, len(documents), batch_size):
-        end_idx = min(i + batch_size, len(documents))
-        
-        collection.add(
-            embeddings=embeddings[i:end_idx].tolist(),
-            documents=documents[i:end_idx],
-            metadatas=metadatas[i:end_idx],
-            ids=ids[i:end_idx]
+    for i in range(0, len(changed), batch_size):
+        batch = changed[i:i + batch_size]
+        collection.upsert(
+            embeddings=embeddings[i:i + batch_size],
+            documents=[documents[n] for n in batch],
+            metadatas=[metadatas[n] for n in batch],
+            ids=[ids[n] for n in batch]
         )
-        
-        print(f"  ✅ Added batch {i//batch_size + 1}/{(len(documents)-1)//batch_size + 1}")
+        print(f"  ✅ Upserted batch {i//batch_size + 1}/{(len(changed)-1)//batch_size + 1}")
     
+    finish(collection, chroma_path, encode, len(changed), snapshot)
+
+
+def finish(collection, chroma_path: Path, encode, written: int, snapshot: str = None):
+    """Verify with a test search, export mmap, publish the snapshot."""
     # 7. Verify
     print(f"\n🔍 Verifying...")
     count = collection.count()
@@ -195,10 +209,11 @@ def embed_products():
     
     # Test search
     test_query = "bàn làm việc cho văn phòng nhỏ"
-    test_embedding = model.encode([test_query])
+    # Encoded directly: a one-off query doesn't belong in the document embedding cache
+    test_embedding = encode([test_query])
     
     results = collection.query(
-        query_embeddings=test_embedding.tolist(),
+        query_embeddings=test_embedding,
         n_results=3
     )
     
@@ -214,14 +229,92 @@ def embed_products():
     print(f"✅ EMBEDDING COMPLETE!")
     print(f"="*80)
     print(f"\n📊 Summary:")
-    print(f"  - Total products embedded: {count}")
+    print(f"  - Total products embedded: {count} ({written} written this run)")
     print(f"  - Collection: product_catalog")
     print(f"  - Location: {chroma_path}/product_catalog")
-    print(f"\n🎯 Next: Create ProductVectorService")
+    if settings.VECTOR_BACKEND == "mmap":
+        export_collection(collection, mmap_store_path(str(chroma_path), collection.name))
+        print(f"  - mmap export: {mmap_store_path(str(chroma_path), collection.name)}")
+    if snapshot:
+        publish_snapshot(settings.CHROMA_PRODUCT_DIR, snapshot)
+        print(f"  - Published snapshot '{snapshot}' (CURRENT)")
+        print(f"\n🎯 Next: POST /api/v2/index/reload {{\"store\": \"product\"}}")
+    else:
+        print(f"\n🎯 Next: Create ProductVectorService")
+
+
+def embed_products_streaming(snapshot: str = None, batch_size: int = None, queue_size: int = None):
+    """MySQL -> rich text -> encode -> upsert as overlapping stages, no intermediate JSON"""
+    print("="*80)
+    print("🔄 STREAMING PRODUCTS FROM MYSQL TO VECTORDB")
+    print("="*80)
+    
+    chroma_path, collection = open_collection(snapshot)
+    encode = lazy_encoder()
+    
+    async def run():
+        try:
+            return await run_product_pipeline(
+                collection,
+                encode,
+                batch_size=batch_size or settings.PRODUCT_PIPELINE_BATCH_SIZE,
+                queue_size=queue_size or settings.PRODUCT_PIPELINE_QUEUE_SIZE
+            )
+        finally:
+            await close_db_pool()
+    
+    print(f"\n🚰 Running pipeline (fetch → text → encode → write)...")
+    stats = asyncio.run(run())
+    busy = stats["busy_seconds"]
+    print(f"  ✅ {stats['products']} products read, {stats['changed']} new or changed, "
+          f"{stats['deleted']} removed")
+    print(f"  ✅ {stats['encoded']} encoded, {stats['cache_hits']} from cache")
+    print(f"  ⏱️  {stats['seconds']:.1f}s wall; busy fetch {busy['fetch']:.1f}s, text {busy['text']:.1f}s, "
+          f"encode {busy['encode']:.1f}s, write {busy['write']:.1f}s")
+    
+    finish(collection, chroma_path, encode, stats["upserted"], snapshot)
 
 
 def main():
-    embed_products()
+    parser = argparse.ArgumentParser(description="Embed products into VectorDB")
+    parser.add_argument(
+        "--metadata-only",
+        action="store_true",
+        help="Only refresh price/rating/stock metadata of already embedded products (through the running server)"
+    )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="With --metadata-only: write from products_for_embedding.json in this process (no server running)"
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Build into snapshots/<name> and publish it, for hot reload via /index/reload"
+    )
+    parser.add_argument(
+        "--from-db",
+        action="store_true",
+        help="Stream products straight from MySQL (no products_for_embedding.json)"
+    )
+    parser.add_argument("--batch-size", type=int, default=None, help="Products per pipeline batch (--from-db)")
+    parser.add_argument("--queue-size", type=int, default=None, help="Batches buffered between stages (--from-db)")
+    args = parser.parse_args()
+    if args.snapshot:
+        try:
+            snapshot_dir(settings.CHROMA_PRODUCT_DIR, args.snapshot)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    
+    if args.metadata_only and args.local:
+        refresh_product_metadata()
+    elif args.metadata_only:
+        if not request_metadata_refresh():
+            sys.exit(1)
+    elif args.from_db:
+        embed_products_streaming(snapshot=args.snapshot, batch_size=args.batch_size, queue_size=args.queue_size)
+    else:
+        embed_products(snapshot=args.snapshot)
 
 
 if __name__ == "__main__":
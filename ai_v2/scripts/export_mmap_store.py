@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Export ChromaDB collections to the read-only mmap format served with
+VECTOR_BACKEND=mmap (one page-cache copy shared by all uvicorn workers).
+
+    python scripts/export_mmap_store.py --store product
+    python scripts/export_mmap_store.py --store legal --dtype int8
+
+Each export is built in a temp directory next to <snapshot>/mmap/<collection>/
+and renamed into place, so exporting into the snapshot currently served is
+safe: running workers keep reading the previous export (its files are
+unlinked, never overwritten) until POST /api/v2/index/reload reopens it.
+Run it after every full (re)embed.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import chromadb
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.index_registry import snapshot_path
+from app.services.legal_indexing import ARTICLE_COLLECTION, SHARD_PREFIX
+from app.services.mmap_vector_store import VECTOR_DTYPES, export_collection, mmap_store_path
+
+STORES = {
+    "product": (settings.CHROMA_PRODUCT_DIR, "product_catalog"),
+    "legal": (settings.CHROMA_LEGAL_DIR, "legal_documents"),
+}
+
+
+def export_store(store: str, dtype: str, version: str = None):
+    base_dir, collection_name = STORES[store]
+    version, path = snapshot_path(base_dir, version)
+    client = chromadb.PersistentClient(path=path)
+    names = [collection_name]
+    if store == "legal":
+        # Per-law shards and the article level are searched on their own
+        names += sorted(
+            n for n in (getattr(c, "name", c) for c in client.list_collections())
+            if n.startswith(SHARD_PREFIX) or n == ARTICLE_COLLECTION
+        )
+
+    for name in names:
+        collection = client.get_collection(name)
+        if store == "legal" and name == collection_name and collection.count() == 0:
+            print(f"⏭️  {name}: empty, chunks are served from the law shards")
+            continue
+        out_dir = mmap_store_path(path, name)
+        started = time.time()
+        manifest = export_collection(collection, out_dir, dtype=dtype)
+        size = sum(f.stat().st_size for f in out_dir.iterdir())
+
+        print(f"✅ {name} (snapshot '{version}'): {manifest['count']} vectors x {manifest['dim']} "
+              f"{dtype}, {size / 1e6:.1f} MB in {time.time() - started:.1f}s")
+        print(f"   → {out_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export vector collections to mmap files")
+    parser.add_argument("--store", choices=[*STORES, "all"], default="all")
+    parser.add_argument("--dtype", choices=VECTOR_DTYPES, default="float32",
+                        help="float16/int8 store compressed vectors plus float32 originals for rescoring")
+    parser.add_argument("--version", help="Snapshot to export (default: CURRENT)")
+    args = parser.parse_args()
+
+    for store in (STORES if args.store == "all" else [args.store]):
+        export_store(store, args.dtype, args.version)
+
+
+if __name__ == "__main__":
+    main()
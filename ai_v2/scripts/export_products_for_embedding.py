@@ -10,7 +10,7 @@ from decimal import Decimal
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.db import get_conn, release_conn
+from app.core.db import get_db_conn, release_conn
 
 
 class DecimalEncoder(json.JSONEncoder):
@@ -27,7 +27,7 @@ async def export_products():
     print("📤 EXPORTING PRODUCTS FOR EMBEDDING")
     print("="*80)
     
-    conn = await get_conn()
+    conn = await get_db_conn()
     
     try:
         async with conn.cursor() as cur:
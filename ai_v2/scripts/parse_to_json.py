@@ -2,20 +2,34 @@
 Script để parse tất cả văn bản pháp luật ra JSON
 Bước 1: Parse và chunk
 Bước 2: Validate JSON
-Bước 3: Export ra file JSON để review
+Bước 3: Export ra corpus NDJSON (LEGAL_CORPUS_DIR: manifest.json, chunks.ndjson, chunks.idx)
+
+    python scripts/parse_to_json.py --workers 8
+    python scripts/parse_to_json.py --no-cache
+    python scripts/parse_to_json.py --json-out scripts/legal_documents.json   # thêm bản JSON cũ để review
+
+Chunks được ghi ra từng file một (không giữ cả corpus trong bộ nhớ).
+Text và chunks được cache theo hash nội dung file (LEGAL_PARSE_CACHE_DIR);
+thời gian parse/chunk từng file nằm trong metadata.file_timings.
 """
 import sys
 import json
+import time
 import logging
+import argparse
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from services.legal.parser import LegalDocumentParser
-from services.legal.chunker import LegalDocumentChunker
+from app.core.config import settings
+from app.legal_ingest.cache import ParseCache
+from app.legal_ingest.chunker import LegalDocumentChunker
+from app.legal_ingest.corpus import CorpusWriter, load_chunks, open_corpus
+from app.legal_ingest.parser import LegalDocumentParser
+from app.legal_ingest.pipeline import process_file
 
 logging.basicConfig(
     level=logging.INFO,
@@ -26,120 +40,100 @@ logger = logging.getLogger(__name__)
 
 def parse_to_json(
     input_dir: Path,
-    output_file: Path,
+    output_dir: Path,
     max_article_length: int = 2000,
-    max_clause_length: int = 1000
+    max_clause_length: int = 1000,
+    workers: int = 1,
+    use_cache: bool = True,
+    json_out: Optional[Path] = None
 ) -> Dict[str, Any]:
     """
-    Parse tất cả văn bản pháp luật và export ra JSON
+    Parse tất cả văn bản pháp luật và export ra corpus NDJSON (output_dir).
+    File PDF lớn được parse song song theo trang (workers process);
+    text và chunks được cache theo hash nội dung file, chỉ file mới/đã đổi mới parse lại.
+    json_out: ghi thêm legal_documents.json kiểu cũ.
     
     Returns:
-        Dictionary chứa metadata và chunks
+        Dictionary chứa metadata, documents, skipped_files và đường dẫn corpus
     """
-    parser = LegalDocumentParser()
     chunker = LegalDocumentChunker()
+    cache = ParseCache(settings.LEGAL_PARSE_CACHE_DIR) if use_cache else None
     
     # Get all PDF and DOC files
-    pdf_files = list(input_dir.glob("*.pdf"))
-    doc_files = list(input_dir.glob("*.doc")) + list(input_dir.glob("*.docx"))
+    pdf_files = sorted(input_dir.glob("*.pdf"))
+    doc_files = sorted(input_dir.glob("*.doc")) + sorted(input_dir.glob("*.docx"))
     all_files = pdf_files + doc_files
     
     if not all_files:
         logger.warning(f"No PDF or DOC files found in {input_dir}")
         return {"documents": [], "chunks": [], "stats": {}}
     
-    logger.info(f"Found {len(all_files)} files to process")
+    logger.info(f"Found {len(all_files)} files to process ({workers} parse workers, cache: {cache.root if cache else 'off'})")
     
-    all_chunks = []
+    writer = CorpusWriter(output_dir)
     documents_info = []
     skipped_files = []
-    
-    for file_path in all_files:
-        try:
-            logger.info(f"\n{'='*60}")
-            logger.info(f"Processing: {file_path.name}")
-            logger.info(f"{'='*60}")
-            
-            # Parse file
-            text = parser.parse_file(file_path)
-            logger.info(f"Parsed {len(text)} characters from {file_path.name}")
-            
-            # Skip if text is too short (likely scan or corrupted)
-            if len(text) < 100:
-                logger.warning(f"⚠️  Skipping {file_path.name}: Text too short ({len(text)} chars)")
+    file_timings = {}
+    started = time.perf_counter()
+    
+    with LegalDocumentParser(workers=workers) as parser:
+        for file_path in all_files:
+            try:
+                logger.info(f"\n{'='*60}")
+                logger.info(f"Processing: {file_path.name}")
+                logger.info(f"{'='*60}")
+                
+                result = process_file(file_path, parser, chunker, cache, max_article_length, max_clause_length)
+                chunks = result["chunks"]
+                timing = result["timing"]
+                file_timings[file_path.name] = {**timing, "cached": result["cached"]}
+                logger.info(
+                    f"{'♻️  Cached' if result['cached'] else '✓ Parsed'} {file_path.name}: "
+                    f"{result['text_length']} chars, {len(chunks)} chunks, doc_name '{result['doc_name']}' "
+                    f"(parse {timing['parse_seconds']:.2f}s, chunk {timing['chunk_seconds']:.2f}s)"
+                )
+                
+                writer.write_many(chunks)
+                
+                # Document info
+                documents_info.append({
+                    "filename": file_path.name,
+                    "doc_name": result["doc_name"],
+                    "source_id": result["source_id"],
+                    "text_length": result["text_length"],
+                    "num_chunks": len(chunks),
+                    "status": "success",
+                    "sha256": result["sha256"],
+                    "cached": result["cached"],
+                    "seconds": timing["total_seconds"]
+                })
+                
+            except ValueError as e:
+                # File is corrupted, invalid, or PDF scan - skip it
+                error_msg = str(e)
+                logger.warning(f"⚠️  Skipping {file_path.name}: {error_msg}")
+                skipped_files.append({
+                    "filename": file_path.name,
+                    "reason": error_msg,
+                    "status": "skipped"
+                })
+                continue
+            except Exception as e:
+                logger.error(f"Error processing {file_path.name}: {e}", exc_info=True)
                 skipped_files.append({
                     "filename": file_path.name,
-                    "reason": f"Text too short ({len(text)} chars)",
-                    "text_length": len(text)
+                    "reason": str(e),
+                    "status": "error"
                 })
                 continue
-            
-            # Extract doc name
-            doc_name = parser.extract_doc_name(text)
-            if not doc_name:
-                # Fallback to guess from filename
-                doc_name = parser.guess_law_name_from_filename(file_path.name)
-                logger.warning(f"⚠️  Could not extract doc_name, using guess: '{doc_name}'")
-            else:
-                logger.info(f"✓ Extracted doc_name: '{doc_name}'")
-            
-            # Extract metadata from filename
-            file_metadata = parser.extract_metadata_from_filename(file_path)
-            
-            # Chunk document
-            chunks = chunker.chunk_document(
-                text,
-                filename=file_path.name,
-                max_article_length=max_article_length,
-                max_clause_length=max_clause_length
-            )
-            
-            logger.info(f"Created {len(chunks)} chunks from {file_path.name}")
-            
-            # Update metadata with file info
-            for chunk in chunks:
-                if "source_id" not in chunk["metadata"] or not chunk["metadata"]["source_id"]:
-                    chunk["metadata"]["source_id"] = file_metadata.get("source_id", "")
-                # Add filename for traceability
-                chunk["metadata"]["filename"] = file_path.name
-            
-            all_chunks.extend(chunks)
-            
-            # Document info
-            documents_info.append({
-                "filename": file_path.name,
-                "doc_name": doc_name,
-                "source_id": file_metadata.get("source_id", ""),
-                "text_length": len(text),
-                "num_chunks": len(chunks),
-                "status": "success"
-            })
-            
-        except ValueError as e:
-            # File is corrupted, invalid, or PDF scan - skip it
-            error_msg = str(e)
-            logger.warning(f"⚠️  Skipping {file_path.name}: {error_msg}")
-            skipped_files.append({
-                "filename": file_path.name,
-                "reason": error_msg,
-                "status": "skipped"
-            })
-            continue
-        except Exception as e:
-            logger.error(f"Error processing {file_path.name}: {e}", exc_info=True)
-            skipped_files.append({
-                "filename": file_path.name,
-                "reason": str(e),
-                "status": "error"
-            })
-            continue
-    
-    if not all_chunks:
+    
+    if not writer.count:
+        writer.abort()
         logger.warning("No chunks created")
         return {"documents": [], "chunks": [], "stats": {}}
     
     logger.info(f"\n{'='*60}")
-    logger.info(f"Total chunks created: {len(all_chunks)}")
+    logger.info(f"Total chunks created: {writer.count}")
     logger.info(f"{'='*60}")
     
     # Create output structure
@@ -149,21 +143,31 @@ def parse_to_json(
             "total_files": len(all_files),
             "processed_files": len(documents_info),
             "skipped_files": len(skipped_files),
-            "total_chunks": len(all_chunks),
+            "total_chunks": writer.count,
             "max_article_length": max_article_length,
-            "max_clause_length": max_clause_length
+            "max_clause_length": max_clause_length,
+            "parse_workers": workers,
+            "cached_files": sum(1 for t in file_timings.values() if t["cached"]),
+            "total_seconds": round(time.perf_counter() - started, 3),
+            "file_timings": file_timings
         },
         "documents": documents_info,
         "skipped_files": skipped_files,
-        "chunks": all_chunks
+        "corpus": str(output_dir)
     }
     
-    # Save to JSON
-    logger.info(f"\nSaving to {output_file}...")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    # Publish the corpus (manifest last)
+    manifest = writer.close(
+        metadata=output_data["metadata"], documents=documents_info, skipped_files=skipped_files
+    )
+    logger.info(f"✅ Saved {manifest['chunks']} chunks to {output_dir} ({manifest['bytes'] / 1e6:.1f} MB NDJSON)")
     
-    logger.info(f"✅ Saved {len(all_chunks)} chunks to {output_file}")
+    if json_out:
+        legacy = {k: v for k, v in output_data.items() if k != "corpus"}
+        legacy["chunks"] = load_chunks(output_dir)
+        with open(json_out, 'w', encoding='utf-8') as f:
+            json.dump(legacy, f, ensure_ascii=False, indent=2)
+        logger.info(f"✅ Legacy JSON written to {json_out}")
     
     return output_data
 
@@ -225,27 +229,28 @@ def validate_json(data: Dict[str, Any]) -> Dict[str, Any]:
         if len(filenames) > 1:
             warnings.append(f"Duplicate doc_name '{doc_name}' in files: {filenames}")
     
-    # Check chunks
-    chunks = data.get("chunks", [])
-    logger.info(f"\n📦 Chunks ({len(chunks)}):")
+    # Check chunks (streamed from the corpus, one pass)
+    chunks = data["chunks"] if "chunks" in data else open_corpus(data["corpus"]).iter_chunks()
+    logger.info(f"\n📦 Chunks ({total_chunks}):")
     
     chunk_ids = set()
     doc_name_distribution = {}
     
-    # Sample first 5 chunks
-    logger.info(f"\n  Sample first 5 chunks:")
-    for i, chunk in enumerate(chunks[:5], 1):
+    logger.info(f"\n  Sample first 5 chunks, checking all for critical issues...")
+    for i, chunk in enumerate(chunks, 1):
         chunk_id = chunk.get("id", "")
         metadata = chunk.get("metadata", {})
         doc_name = metadata.get("doc_name", "")
         article = metadata.get("article", "")
         text_preview = chunk.get("text_for_embedding", "")[:100]
         
-        logger.info(f"\n    Chunk {i}:")
-        logger.info(f"      ID: {chunk_id}")
-        logger.info(f"      Doc: {doc_name}")
-        logger.info(f"      Article: {article}")
-        logger.info(f"      Text: {text_preview}...")
+        # Sample first 5 chunks
+        if i <= 5:
+            logger.info(f"\n    Chunk {i}:")
+            logger.info(f"      ID: {chunk_id}")
+            logger.info(f"      Doc: {doc_name}")
+            logger.info(f"      Article: {article}")
+            logger.info(f"      Text: {text_preview}...")
         
         # Check for duplicate IDs
         if chunk_id in chunk_ids:
@@ -265,13 +270,6 @@ def validate_json(data: Dict[str, Any]) -> Dict[str, Any]:
             doc_name_distribution[doc_name] += 1
         else:
             doc_name_distribution[doc_name] = 1
-    
-    # Check all chunks for critical issues
-    logger.info(f"\n  Checking all {len(chunks)} chunks for critical issues...")
-    for i, chunk in enumerate(chunks):
-        chunk_id = chunk.get("id", "")
-        metadata = chunk.get("metadata", {})
-        doc_name = metadata.get("doc_name", "")
         
         # Check for corrupt doc names (like "LUẬT\nD")
         if doc_name and ("\n" in doc_name or len(doc_name) < 5):
@@ -311,7 +309,7 @@ def validate_json(data: Dict[str, Any]) -> Dict[str, Any]:
         "issues": issues,
         "warnings": warnings,
         "stats": {
-            "total_chunks": len(chunks),
+            "total_chunks": len(chunk_ids),
             "unique_chunk_ids": len(chunk_ids),
             "unique_doc_names": len(doc_name_distribution),
             "doc_name_distribution": doc_name_distribution
@@ -321,11 +319,19 @@ def validate_json(data: Dict[str, Any]) -> Dict[str, Any]:
 
 def main():
     """Main function"""
-    # Get input directory
     script_dir = Path(__file__).parent
-    ai_dir = script_dir.parent
-    input_dir = ai_dir / "luat_VN"
-    output_file = script_dir / "legal_documents.json"
+    arg_parser = argparse.ArgumentParser(description="Parse legal documents to JSON")
+    arg_parser.add_argument("--input-dir", default=str(script_dir.parent / "luat_VN"))
+    arg_parser.add_argument("--output", default=settings.LEGAL_CORPUS_DIR, help="Corpus directory")
+    arg_parser.add_argument("--json-out", default=None, help="Also write the legacy single-file JSON here")
+    arg_parser.add_argument("--workers", type=int, default=settings.LEGAL_PARSE_WORKERS,
+                            help="Processes for page-parallel PDF parsing (1 = in-process)")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Re-parse every file")
+    args = arg_parser.parse_args()
+    
+    # Get input directory
+    input_dir = Path(args.input_dir)
+    output_dir = Path(args.output)
     
     if not input_dir.exists():
         logger.error(f"Input directory not found: {input_dir}")
@@ -335,15 +341,18 @@ def main():
     logger.info("PARSE LEGAL DOCUMENTS TO JSON")
     logger.info("="*80)
     logger.info(f"Input directory: {input_dir}")
-    logger.info(f"Output file: {output_file}")
+    logger.info(f"Output corpus: {output_dir}")
     logger.info("="*80 + "\n")
     
     # Step 1: Parse to JSON
     data = parse_to_json(
         input_dir=input_dir,
-        output_file=output_file,
+        output_dir=output_dir,
         max_article_length=2000,
-        max_clause_length=1000
+        max_clause_length=1000,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        json_out=Path(args.json_out) if args.json_out else None
     )
     
     # Step 2: Validate JSON
@@ -365,7 +374,7 @@ def main():
 ✅ JSON data is VALID and ready for embedding!
 
 Next steps:
-1. Review the JSON file: scripts/legal_documents.json
+1. Review the corpus: scripts/legal_corpus/manifest.json (chunks.ndjson: one chunk per line)
 2. If everything looks good, run embedding script:
    python scripts/embed_from_json.py
 """)
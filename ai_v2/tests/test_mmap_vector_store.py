@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from app.services.mmap_vector_store import VECTOR_DTYPES, MmapVectorStore, export_collection
+
+DIM = 16
+COLORS = ["đen", "trắng", "xám"]
+
+
+class FakeCollection:
+    """The slice of chromadb.Collection that export_collection reads."""
+
+    def __init__(self, n, seed=0, name="catalog", space="l2"):
+        rng = np.random.default_rng(seed)
+        self.name = name
+        self.metadata = {"hnsw:space": space}
+        self.vectors = rng.normal(size=(n, DIM)).astype(np.float32)
+        self.ids = [f"id{i}" for i in range(n)]
+        self.documents = [f"document {i}" for i in range(n)]
+        self.metadatas = [
+            {"product_id": i, "price": float(i * 1000), "color": COLORS[i % 3], "in_stock": i % 2 == 0,
+             "sku": f"SKU-{i:05d}", **({"rating": 4.5} if i % 5 == 0 else {})}
+            for i in range(n)
+        ]
+
+    def count(self):
+        return len(self.ids)
+
+    def get(self, limit, offset, include):
+        rows = slice(offset, offset + limit)
+        return {
+            "ids": self.ids[rows],
+            "documents": self.documents[rows],
+            "metadatas": self.metadatas[rows],
+            "embeddings": self.vectors[rows].tolist(),
+        }
+
+    def exact(self, query, k, rows=None):
+        """Brute-force float32 top-k ids (l2), optionally over a subset of rows."""
+        rows = np.arange(len(self.ids)) if rows is None else np.asarray(rows, dtype=np.int64)
+        dist = ((self.vectors[rows] - query) ** 2).sum(axis=1)
+        return [self.ids[r] for r in rows[np.argsort(dist, kind="stable")[:k]]]
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection(300)
+
+
+@pytest.mark.parametrize("dtype", VECTOR_DTYPES)
+def test_round_trip_matches_exact_search(tmp_path, collection, dtype):
+    export_collection(collection, tmp_path / "catalog", dtype=dtype)
+    store = MmapVectorStore(tmp_path / "catalog", rescore_factor=8)
+    assert store.count() == 300
+    for row in (0, 7, 151, 299):
+        result = store.query([collection.vectors[row]], n_results=5)
+        assert result["ids"][0][0] == collection.ids[row]
+        assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-4)
+        if dtype == "float32":
+            assert result["ids"][0] == collection.exact(collection.vectors[row], 5)
+        # Quantized exports rescore against the float32 originals
+        assert result["documents"][0][0] == collection.documents[row]
+        assert result["metadatas"][0][0] == collection.metadatas[row]
+
+
+def test_where_filters_match_python(tmp_path, collection):
+    export_collection(collection, tmp_path / "catalog")
+    store = MmapVectorStore(tmp_path / "catalog")
+    query = collection.vectors[10]
+    cases = [
+        ({"color": "đen"}, lambda m: m["color"] == "đen"),
+        ({"color": {"$in": ["trắng", "xám"]}}, lambda m: m["color"] in ("trắng", "xám")),
+        ({"price": {"$gte": 50_000}}, lambda m: m["price"] >= 50_000),
+        ({"in_stock": True}, lambda m: m["in_stock"]),
+        ({"sku": {"$eq": "SKU-00042"}}, lambda m: m["sku"] == "SKU-00042"),
+        ({"rating": {"$ne": 4.5}}, lambda m: "rating" in m and m["rating"] != 4.5),
+        ({"$and": [{"price": {"$lt": 100_000}}, {"color": {"$ne": "xám"}}]},
+         lambda m: m["price"] < 100_000 and m["color"] != "xám"),
+        ({"$or": [{"product_id": {"$in": [1, 2, 3]}}, {"sku": "SKU-00200"}]},
+         lambda m: m["product_id"] in (1, 2, 3) or m["sku"] == "SKU-00200"),
+    ]
+    for where, keep in cases:
+        rows = [i for i, m in enumerate(collection.metadatas) if keep(m)]
+        result = store.query([query], n_results=10, where=where)
+        assert result["ids"][0] == collection.exact(query, 10, rows), where
+
+
+def test_get_by_ids(tmp_path, collection):
+    export_collection(collection, tmp_path / "catalog")
+    store = MmapVectorStore(tmp_path / "catalog")
+    got = store.get_by_ids(["id3", "missing", "id250"])
+    assert got["ids"] == ["id3", "id250"]
+    assert got["documents"] == [collection.documents[3], collection.documents[250]]
+    assert got["metadatas"] == [collection.metadatas[3], collection.metadatas[250]]
+
+
+def test_reexport_to_another_dtype_leaves_no_stale_files(tmp_path):
+    out_dir = tmp_path / "catalog"
+    export_collection(FakeCollection(50, seed=1), out_dir, dtype="int8")
+    fresh = FakeCollection(50, seed=2)
+    export_collection(fresh, out_dir, dtype="float32")
+    assert not (out_dir / "scales.npy").exists()
+    assert not (out_dir / "vectors.f32.npy").exists()
+    result = MmapVectorStore(out_dir).query([fresh.vectors[7]], n_results=3)
+    assert result["ids"][0] == fresh.exact(fresh.vectors[7], 3)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["catalog"]
+
+
+def test_reexport_under_an_open_store(tmp_path):
+    out_dir = tmp_path / "catalog"
+    old = FakeCollection(2000, seed=1)
+    export_collection(old, out_dir)
+    store = MmapVectorStore(out_dir)
+    new = FakeCollection(10, seed=2)
+    export_collection(new, out_dir)
+    # The open store keeps reading its own (unlinked) files
+    assert store.query([old.vectors[1500]], n_results=1)["ids"][0] == ["id1500"]
+    assert store.superseded()
+    reopened = MmapVectorStore(out_dir)
+    assert reopened.count() == 10
+    assert not reopened.superseded()
+    assert reopened.query([new.vectors[3]], n_results=1)["ids"][0] == ["id3"]
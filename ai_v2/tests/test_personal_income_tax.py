@@ -0,0 +1,127 @@
+import math
+
+import pytest
+
+from app.services.personal_income_tax import (
+    BASE_SALARY,
+    DEPENDENT_DEDUCTION,
+    PIT_BATCH_AMOUNTS,
+    REGION_MIN_WAGE,
+    SELF_DEDUCTION,
+    compute_pit,
+    pit_batch,
+)
+
+# Employee insurance once both caps apply (gross above 20x regional minimum)
+CAPPED_INSURANCE = 20 * BASE_SALARY * 0.095 + 20 * REGION_MIN_WAGE * 0.01
+BRACKET_EDGES = [5_000_000, 10_000_000, 18_000_000, 32_000_000, 52_000_000, 80_000_000]
+
+
+def scalar_pit(gross_salary, dependents):
+    """The per-employee formula calculate_pit_impl used before the vectorized rewrite."""
+    insurance_base = min(gross_salary, 20 * BASE_SALARY)
+    bhxh = insurance_base * 0.08
+    bhyt = insurance_base * 0.015
+    bhtn = min(gross_salary, 20 * REGION_MIN_WAGE) * 0.01
+    total_insurance = bhxh + bhyt + bhtn
+    taxable_income = max(0, gross_salary - SELF_DEDUCTION - dependents * DEPENDENT_DEDUCTION - total_insurance)
+
+    income = taxable_income / 1000000
+    if income <= 5: tax = income * 0.05
+    elif income <= 10: tax = income * 0.10 - 0.25
+    elif income <= 18: tax = income * 0.15 - 0.75
+    elif income <= 32: tax = income * 0.20 - 1.65
+    elif income <= 52: tax = income * 0.25 - 3.25
+    elif income <= 80: tax = income * 0.30 - 5.85
+    else: tax = income * 0.35 - 9.85
+    tax_amount = max(0, tax * 1000000)
+    return {
+        "bhxh": bhxh,
+        "bhyt": bhyt,
+        "bhtn": bhtn,
+        "insurance": total_insurance,
+        "taxable_income": taxable_income,
+        "pit": tax_amount,
+        "net_salary": gross_salary - total_insurance - tax_amount,
+    }
+
+
+def edge_cases():
+    """(gross, dependents) with taxable income exactly on and 1 VND around every bracket edge."""
+    cases = []
+    for edge in BRACKET_EDGES:
+        # Enough dependents to put gross above both insurance caps, so taxable = gross - constants
+        dependents = max(0, math.ceil((20 * REGION_MIN_WAGE - edge - SELF_DEDUCTION - CAPPED_INSURANCE) / DEPENDENT_DEDUCTION))
+        gross = edge + SELF_DEDUCTION + CAPPED_INSURANCE + dependents * DEPENDENT_DEDUCTION
+        cases += [(gross - 1, dependents), (gross, dependents), (gross + 1, dependents)]
+    return cases
+
+
+def cap_cases():
+    """Salaries on and around the BHXH/BHYT and BHTN caps."""
+    return [(cap + delta, dependents)
+            for cap in (20 * BASE_SALARY, 20 * REGION_MIN_WAGE)
+            for delta in (-1, 0, 1)
+            for dependents in (0, 2)]
+
+
+def grid_cases():
+    return [(gross, dependents) for gross in range(0, 150_000_001, 250_000) for dependents in (0, 1, 3)]
+
+
+@pytest.mark.parametrize("cases", [edge_cases(), cap_cases(), grid_cases()], ids=["bracket_edges", "insurance_caps", "grid"])
+def test_batch_matches_scalar_formula(cases):
+    gross, dependents = zip(*cases)
+    batch = pit_batch(list(gross), list(dependents))
+    assert batch["count"] == len(cases)
+    for row, (g, d) in zip(batch["results"], cases):
+        expected = scalar_pit(g, d)
+        for name in ("bhxh", "bhyt", "bhtn", "insurance", "taxable_income", "pit", "net_salary"):
+            # Batch amounts are whole VND; the scalar formula works in millions
+            assert row[name] == pytest.approx(expected[name], abs=1), (g, d, name)
+        assert row["gross_salary"] == g
+        assert row["dependents"] == d
+
+
+def test_bracket_edges_belong_to_the_lower_bracket():
+    cases = edge_cases()
+    result = compute_pit([g for g, _ in cases], [d for _, d in cases])
+    for n, edge in enumerate(BRACKET_EDGES):
+        below, at, above = result["bracket"][3 * n:3 * n + 3]
+        assert result["taxable_income"][3 * n + 1] == pytest.approx(edge)
+        assert below == at == n + 1
+        assert above == n + 2
+
+
+def test_dependents_only_lower_taxable_income():
+    result = compute_pit([30_000_000] * 4, [0, 1, 2, 10])
+    assert list(result["taxable_income"]) == sorted(result["taxable_income"], reverse=True)
+    assert result["taxable_income"][3] == 0
+    assert result["pit"][3] == 0
+    assert (result["insurance"] == result["insurance"][0]).all()
+
+
+def test_totals_are_sums_of_rows():
+    batch = pit_batch([8_000_000, 25_000_000, 120_000_000], [0, 2, 1], employee_ids=["a", "b", "c"])
+    assert [row["employee_id"] for row in batch["results"]] == ["a", "b", "c"]
+    for name in PIT_BATCH_AMOUNTS:
+        assert batch["totals"][name] == sum(row[name] for row in batch["results"])
+
+
+def test_untaxed_rows_have_bracket_zero():
+    batch = pit_batch([5_000_000, 40_000_000])
+    assert [row["bracket"] for row in batch["results"]] == [0, 4]
+    assert batch["results"][0]["pit"] == 0
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"gross_salaries": [10_000_000, -1]}, "Row 2: gross_salary"),
+    ({"gross_salaries": [10_000_000, float("nan")]}, "Row 2: gross_salary"),
+    ({"gross_salaries": [10_000_000], "dependents": [-1]}, "Row 1: dependents"),
+    ({"gross_salaries": [10_000_000, 9_000_000], "dependents": [0, 1.5]}, "Row 2: dependents must be a whole number"),
+    ({"gross_salaries": [10_000_000, 9_000_000], "dependents": [0]}, "same length"),
+    ({"gross_salaries": [10_000_000], "employee_ids": ["a", "b"]}, "employee_ids"),
+])
+def test_invalid_rows_are_rejected(kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        pit_batch(**kwargs)
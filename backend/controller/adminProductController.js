@@ -5,6 +5,7 @@ import cloudinary from '../config/cloudinary.js'; // Cloudinary client để upl
 import { searchProductsWithFullText } from '../utils/fulltextSearch.js'; // FullText search utility
 import logger from '../utils/logger.js'; // Logger utility
 import { emitProductCreated, emitProductUpdated, emitProductDeleted } from '../config/socket.js';
+import { notifyProductIndex } from '../services/ai/aiIndexService.js'; // Đồng bộ vector index của chatbot
 
 // Cấu hình include cơ bản cho các query sản phẩm
 // Chỉ lấy thông tin cần thiết của category và brand để tối ưu performance
@@ -335,6 +336,7 @@ export const createProduct = async (req, res) => {
 
     // Gửi thông báo real-time đến tất cả client là tạo sản phẩm mới
     emitProductCreated(created);
+    notifyProductIndex({ upsert: [created.id] });
 
     return res.status(201).json(created);
   } catch (error) {
@@ -463,6 +465,7 @@ export const updateProduct = async (req, res) => {
 
     // Gửi thông báo real-time đến tất cả client là cập nhật sản phẩm
     emitProductUpdated(updated);
+    notifyProductIndex({ upsert: [updated.id] });
 
     return res.json(updated);
   } catch (error) {
@@ -572,6 +575,7 @@ export const deleteProduct = async (req, res) => {
 
     // Gửi thông báo real-time đến tất cả client là xóa sản phẩm
     emitProductDeleted(id);
+    notifyProductIndex({ delete: [id] });
 
     return res.json({ success: true, message: 'Xóa sản phẩm thành công' });
   } catch (error) {
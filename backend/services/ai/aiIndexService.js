@@ -0,0 +1,33 @@
+import axios from 'axios';
+import logger from '../../utils/logger.js';
+
+// Đồng bộ sản phẩm sang AI service (chatbot) ngay khi admin thay đổi
+// AI service tự gom (debounce) nhiều lần gọi liên tiếp nên có thể gọi thoải mái
+const AI_V2_URL = process.env.AI_V2_URL || 'http://localhost:8000';
+const AI_INDEX_TIMEOUT = 5000; // 5 giây - không để request admin phải chờ lâu
+
+/**
+ * Báo cho AI service re-index sản phẩm
+ * @param {Object} changes - { upsert: [productId], delete: [productId] }
+ *
+ * Fire-and-forget: lỗi chỉ được log, không làm hỏng request của admin
+ */
+export const notifyProductIndex = ({ upsert = [], delete: remove = [] } = {}) => {
+  if (!upsert.length && !remove.length) return;
+
+  axios.post(
+    `${AI_V2_URL}/api/v2/index/products`,
+    { upsert, delete: remove },
+    {
+      timeout: AI_INDEX_TIMEOUT,
+      headers: {
+        'Content-Type': 'application/json',
+        'X-API-Key': process.env.AI_ADMIN_API_KEY || ''
+      }
+    }
+  ).then(() => {
+    logger.debug('AI product index notified', { upsert, delete: remove });
+  }).catch((error) => {
+    logger.warn('AI product index notify failed', { upsert, delete: remove, error: error.message });
+  });
+};